@@ -27,9 +27,11 @@ export const createUser = async (userData) => {
     }
 }
 
-export const getAllLeaves = async () => {
+export const getLeavesPage = async (params = {}, cursorUrl = null) => {
     try {
-        const response = await axiosInstance.get(`manager/leaves/`);
+        const response = cursorUrl
+            ? await axiosInstance.get(cursorUrl)
+            : await axiosInstance.get(`manager/leaves/`, { params });
         return response.data
     } catch (error) {
         throw error.response ? error.response.data : error.message;
@@ -46,3 +48,23 @@ export const toggleLeaveStatus = async (userId,data) => {
 }
 
 
+
+// items: [{ id, status, reason_not_approved? }], answered with per-item results
+export const bulkUpdateLeaveStatus = async (items) => {
+    try {
+        const response = await axiosInstance.post(`manager/leaves/bulk-status/`, { items });
+        return response.data
+    } catch (error) {
+        throw error.response ? error.response.data : error.message;
+    }
+}
+
+// per status counts and other aggregates of the leaves in a date window (this year by default)
+export const getLeaveReport = async (params = {}) => {
+    try {
+        const response = await axiosInstance.get(`manager/reports/leaves/`, { params });
+        return response.data
+    } catch (error) {
+        throw error.response ? error.response.data : error.message;
+    }
+}
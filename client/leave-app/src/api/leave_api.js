@@ -16,4 +16,15 @@ export const getIUserLeaves = async () => {
     } catch (error) {
         throw error.response ? error.response.data : error.message
     }
-}
\ No newline at end of file
+}
+
+// month is "YYYY-MM"; admins get everyone's leaves, employees only their own
+export const getLeaveCalendar = async (month, isAdmin = false) => {
+    try {
+        const url = isAdmin ? 'manager/calendar/' : 'employee/calendar/';
+        const response = await axiosInstance.get(url, { params: { month } });
+        return response.data
+    } catch (error) {
+        throw error.response ? error.response.data : error.message
+    }
+}
@@ -1,7 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useAuth } from '../../context/AuthContext';
-import { getAllLeaves } from '../../api/admin_api';
-import { getIUserLeaves } from '../../api/leave_api';
+import { getLeaveCalendar } from '../../api/leave_api';
 
 const LeaveCalendar = () => {
   const { isAdmin, currentUser } = useAuth();
@@ -12,32 +11,15 @@ const LeaveCalendar = () => {
   const [error, setError] = useState(null);
   const [selectedDay, setSelectedDay] = useState(null);
   
+  // only the approved leaves of the month on screen are fetched
+  const visibleMonth = `${currentDate.getFullYear()}-${String(currentDate.getMonth() + 1).padStart(2, '0')}`;
+  
   useEffect(() => {
     const fetchLeaves = async () => {
       setIsLoading(true);
       try {
-        let data;
-        if (isAdmin) {
-          // Admin mode: Show all leaves
-          data = await getAllLeaves();
-        } else {
-          // Employee mode: Show only current user's leaves
-          data = await getIUserLeaves();
-        }
-        
-        // Filter to only show approved leaves for the calendar view
-        const approvedLeaves = data.filter(leave => leave.status === 'approved');
-        console.log("the leaves for calender", approvedLeaves);
-        
-        // If not admin, ensure we only show current user's leaves
-        const filteredLeaves = isAdmin 
-          ? approvedLeaves 
-          : approvedLeaves.filter(leave => 
-              leave.user.id === currentUser.id
-            );
-            
-        setLeaves(filteredLeaves);
-        console.log(filteredLeaves)
+        const data = await getLeaveCalendar(visibleMonth, isAdmin);
+        setLeaves(data.leaves);
         setError(null);
       } catch (err) {
         setError('Failed to load leave data');
@@ -48,7 +30,7 @@ const LeaveCalendar = () => {
     };
     
     fetchLeaves();
-  }, [isAdmin, currentUser]);
+  }, [isAdmin, currentUser, visibleMonth]);
   
   useEffect(() => {
     generateCalendarDays(currentDate);
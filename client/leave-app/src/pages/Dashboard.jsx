@@ -3,7 +3,7 @@ import { useNavigate } from 'react-router-dom';
 import Layout from '../layout/Layout';
 import { useAuth } from '../context/AuthContext';
 import LeaveTable from '../components/leave/LeaveTable';
-import { getAllLeaves } from '../api/admin_api';
+import { getLeavesPage, getLeaveReport } from '../api/admin_api';
 
 const Dashboard = () => {
   const { isAdmin, getAllUsers, currentUser } = useAuth();
@@ -18,14 +18,57 @@ const Dashboard = () => {
     pending: 0
   });
   const [leaveRequests, setLeaveRequests] = useState([]);
+  const [nextPage, setNextPage] = useState(null);
+  const [loadingLeaves, setLoadingLeaves] = useState(false);
   const [activeTab, setActiveTab] = useState('pending');
   
+  // first page of the active tab's leaves, filtered by the server; more on demand
   useEffect(() => {
+    let ignore = false;
     const fetchLeaves = async () => {
-      const data = await getAllLeaves();
-      setLeaveRequests(data);
+      setLoadingLeaves(true);
+      try {
+        const page = await getLeavesPage({ status: activeTab });
+        if (!ignore) {
+          setLeaveRequests(page.results);
+          setNextPage(page.next);
+        }
+      } catch (error) {
+        console.error("Error fetching leaves:", error);
+      } finally {
+        if (!ignore) setLoadingLeaves(false);
+      }
     };
     fetchLeaves();
+    return () => { ignore = true; };
+  }, [isAdmin, activeTab]);
+
+  const loadMoreLeaves = async () => {
+    if (!nextPage) return;
+    setLoadingLeaves(true);
+    try {
+      const page = await getLeavesPage({}, nextPage);
+      setLeaveRequests((prev) => [...prev, ...page.results]);
+      setNextPage(page.next);
+    } catch (error) {
+      console.error("Error fetching leaves:", error);
+    } finally {
+      setLoadingLeaves(false);
+    }
+  };
+
+  // counts come from the report endpoint, not from downloading the leaves
+  useEffect(() => {
+    const fetchLeaveStats = async () => {
+      try {
+        const report = await getLeaveReport();
+        const { approved, rejected, pending } = report.totals.requests;
+        setLeaveStats({ approved, rejected, pending });
+      } catch (error) {
+        console.error("Error fetching leave stats:", error);
+      }
+    };
+    fetchLeaveStats();
   }, [isAdmin]);
 
   useEffect(() => {
@@ -53,19 +96,7 @@ const Dashboard = () => {
     };
     
     fetchUsers();
-    
-    // Calculate leave stats
-    const approved = leaveRequests.filter(leave => leave.status === 'approved').length;
-    const rejected = leaveRequests.filter(leave => leave.status === 'rejected').length;
-    const pending = leaveRequests.filter(leave => leave.status === 'pending').length;
-    
-    setLeaveStats({ approved, rejected, pending });
-  }, [isAdmin, navigate, getAllUsers, leaveRequests]);
-
-  // Get filtered leave requests based on active tab
-  const getFilteredLeaveRequests = () => {
-    return leaveRequests.filter(leave => leave.status === activeTab);
-  };
+  }, [isAdmin, navigate, getAllUsers]);
   
   const handleTabChange = (tabName) => {
     setActiveTab(tabName);
@@ -100,19 +131,19 @@ const Dashboard = () => {
     },
     {
       id: 'pending-leaves',
-      label: 'Pending Leaves',
+      label: 'Pending Leaves (this year)',
       value: leaveStats.pending,
       borderColor: 'border-warning'
     },
     {
       id: 'approved-leaves',
-      label: 'Approved Leaves',
+      label: 'Approved Leaves (this year)',
       value: leaveStats.approved,
       borderColor: 'border-success'
     },
     {
       id: 'rejected-leaves',
-      label: 'Rejected Leaves',
+      label: 'Rejected Leaves (this year)',
       value: leaveStats.rejected,
       borderColor: 'border-destructive'
     }
@@ -235,7 +266,18 @@ const Dashboard = () => {
           <h2 className="text-xl font-bold mb-4">
             {activeTab.charAt(0).toUpperCase() + activeTab.slice(1)} Leave Requests
           </h2>
-          <LeaveTable mode="admin" data={getFilteredLeaveRequests()} activeTab={activeTab} />
+          <LeaveTable mode="admin" data={leaveRequests} activeTab={activeTab} />
+          {nextPage && (
+            <div className="mt-4 text-center">
+              <button
+                onClick={loadMoreLeaves}
+                disabled={loadingLeaves}
+                className="px-4 py-2 bg-primary text-white rounded disabled:opacity-50"
+              >
+                {loadingLeaves ? 'Loading...' : 'Load more'}
+              </button>
+            </div>
+          )}
         </div>
       </div>
     </div>
@@ -4,7 +4,6 @@ import { useNavigate } from 'react-router-dom';
 import Layout from '../layout/Layout';
 import { useAuth } from '../context/AuthContext';
 import LeaveTable from '../components/leave/LeaveTable';
-import { getAllLeaves } from '../api/admin_api';
 import { getIUserLeaves } from '../api/leave_api';
 
 const Home = () => {
@@ -2,4 +2,4 @@ from django.contrib import admin
 
 from .models import *
 
-admin.site.register([Profile,LeaveRequest])
\ No newline at end of file
+admin.site.register([Team,Profile,LeaveRequest,LeaveBalanceEntry,LeaveSummary,Holiday,OutboxMessage,BalanceReset])
\ No newline at end of file
@@ -7,4 +7,11 @@ class EmployeeConfig(AppConfig):
     
     def ready(self):
         # Import and connect the signals
-        import employee.signals
\ No newline at end of file
+        import employee.signals
+        from django.db import connections
+        from django.db.backends.signals import connection_created
+        from .instrumentation import install_sql_recorder
+        # time every query for the request metrics
+        connection_created.connect(install_sql_recorder)
+        for connection in connections.all(initialized_only=True):
+            install_sql_recorder(None, connection)
\ No newline at end of file
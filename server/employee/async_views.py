@@ -0,0 +1,116 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from django.views import View
+from rest_framework import exceptions, status
+from .authentication import CachedJWTAuthentication
+from .fast_serializers import get_fast_serializer
+from .instrumentation import TimedJSONRenderer
+from .models import LeaveRequest, Profile
+from .response_cache import CACHE_ALIAS, CACHE_TTL, response_cache_key, response_cache_stats
+from .revisions import arevision_stamp, user_key
+from .serializers import LeaveRequestSerializer, ProfileSerializer
+from .summaries import asummaries_for, parse_year
+from .views import LeaveView
+
+
+class AsyncAPIView(View):
+    """
+    Async counterpart of APIView for the hot read endpoints, served when
+    running under ASGI. GET handlers return plain data, which is rendered
+    with DRF's JSONRenderer so responses match the sync views byte for byte.
+    Authentication (JWT through the user cache), the staff check, ETags and
+    response caching follow the sync views; other methods are handed to
+    fallback_view in a thread.
+    """
+    authentication = CachedJWTAuthentication()
+    admin_only = False
+    cache_responses = False
+    fallback_view = None
+
+    def revision_key(self, request):
+        """ Revision the response depends on, None to skip conditional GETs """
+        return None
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            if self.fallback_view is None:
+                return await self.http_method_not_allowed(request, *args, **kwargs)
+            return await sync_to_async(self.fallback_view)(request, *args, **kwargs)
+        try:
+            return await self.respond(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.error(request, exc)
+
+    async def respond(self, request, *args, **kwargs):
+        auth = await self.authentication.aauthenticate(request)
+        if auth is None:
+            raise exceptions.NotAuthenticated()
+        request.user, request.auth = auth
+        if self.admin_only and not request.user.is_staff:
+            raise exceptions.PermissionDenied()
+
+        key = self.revision_key(request)
+        if key is None:
+            return self.render(await self.get(request, *args, **kwargs))
+
+        stamp, last_modified = await arevision_stamp(request, key)
+        etag = f'"{stamp}"'
+        last_modified = last_modified and int(last_modified.timestamp())
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            data = None
+            if self.cache_responses:
+                cache = caches[CACHE_ALIAS]
+                data = await cache.aget(response_cache_key(stamp))
+                response_cache_stats.record(data is not None)
+            if data is None:
+                data = await self.get(request, *args, **kwargs)
+                if self.cache_responses:
+                    await cache.aset(response_cache_key(stamp), data, CACHE_TTL)
+            response = self.render(data)
+        response.headers['ETag'] = etag
+        if last_modified:
+            response.headers['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def render(self, data, status_code=status.HTTP_200_OK):
+        return HttpResponse(TimedJSONRenderer().render(data), status=status_code, content_type='application/json')
+
+    def error(self, request, exc):
+        """ Same body and headers as DRF's default exception handler """
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        response = self.render(data, exc.status_code)
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            response.status_code = status.HTTP_401_UNAUTHORIZED
+            response.headers['WWW-Authenticate'] = self.authentication.authenticate_header(request)
+        return response
+
+
+class AsyncProfileView(AsyncAPIView):
+    def revision_key(self, request):
+        return user_key(request.user.id)
+
+    async def get(self, request):
+        # read fresh, like the revision behind the ETag: the cached user's
+        # profile may be older than a write made by another worker
+        profile = await Profile.objects.select_related('user').aget(user_id=request.user.id)
+        data = ProfileSerializer(profile).data
+        year = parse_year(request.GET.get('year'))
+        data['leave_summary'] = (await asummaries_for([request.user.id], year))[request.user.id]
+        return data
+
+
+class AsyncLeaveView(AsyncAPIView):
+    fallback_view = staticmethod(LeaveView.as_view())
+
+    def revision_key(self, request):
+        return user_key(request.user.id)
+
+    async def get(self, request):
+        serializer = get_fast_serializer(LeaveRequestSerializer)
+        rows = serializer.values(LeaveRequest.objects.filter(user_id=request.user.id))
+        return serializer.serialize([row async for row in rows])
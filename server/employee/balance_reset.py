@@ -0,0 +1,152 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import BigIntegerField, Case, CharField, Count, DateTimeField, F, IntegerField, Sum, Value, When
+from django.utils import timezone
+from .balances import BALANCE_FIELDS
+from .models import BalanceReset, LeaveBalanceEntry, Profile
+from .revisions import bump_users
+from .user_cache import invalidate_users
+
+# days granted per leave type at the start of every year
+ALLOWANCES = getattr(settings, 'LEAVE_ALLOWANCES', {'casual': 10, 'sick': 10})
+# most unused days of each type taken into the new year, the rest lapse
+CARRY_FORWARD = getattr(settings, 'LEAVE_CARRY_FORWARD', {'casual': 5, 'sick': 0})
+
+
+def reset_expression(leave_type):
+    """
+    New balance of a leave type as a CASE over the current one: the
+    year's allowance plus what is left, capped at the carry-forward
+    limit. A negative balance (imported or manually adjusted) is dropped.
+    """
+    field = BALANCE_FIELDS[leave_type]
+    allowance, cap = ALLOWANCES.get(leave_type, 0), CARRY_FORWARD.get(leave_type, 0)
+    return Case(
+        When(**{f'{field}__gte': cap}, then=Value(allowance + cap)),
+        When(**{f'{field}__lte': 0}, then=Value(allowance)),
+        default=F(field) + allowance,
+        output_field=IntegerField(),
+    )
+
+
+def forfeit_expression(leave_type):
+    field = BALANCE_FIELDS[leave_type]
+    cap = CARRY_FORWARD.get(leave_type, 0)
+    return Case(When(**{f'{field}__gt': cap}, then=F(field) - cap), default=Value(0), output_field=IntegerField())
+
+
+def insert_reset_entries(profiles, leave_type, actor, now):
+    """
+    Ledger entries for resetting leave_type on profiles, written with one
+    INSERT ... SELECT computing them from the balances still in place, so
+    rows never go through Python. Profiles whose balance doesn't move get
+    no entry. Returns the number of entries.
+    """
+    field = BALANCE_FIELDS[leave_type]
+    rows = (
+        profiles.annotate(new_balance=reset_expression(leave_type))
+        .exclude(new_balance=F(field))
+        .values_list(
+            'user_id', Value(leave_type, output_field=CharField()), F('new_balance') - F(field), 'new_balance',
+            Value('reset', output_field=CharField()),
+            Value(actor.pk if actor else None, output_field=BigIntegerField()),
+            Value(now, output_field=DateTimeField()),
+        )
+    )
+    select, params = rows.query.sql_with_params()
+    names = ('user', 'leave_type', 'delta', 'balance_after', 'reason', 'created_by', 'created_at')
+    columns = ', '.join(
+        connection.ops.quote_name(LeaveBalanceEntry._meta.get_field(name).column) for name in names
+    )
+    table = connection.ops.quote_name(LeaveBalanceEntry._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {table} ({columns}) {select}', params)
+        return cursor.rowcount
+
+
+class YearlyReset:
+    """
+    Open a year's leave balances for every profile with set-based
+    statements, chunk by chunk in user id order. Each chunk is one short
+    transaction: lock its profiles, one INSERT ... SELECT of ledger
+    entries per leave type, one CASE UPDATE for all balance columns, the
+    revision bump and the progress row. Chunks that committed are never
+    redone, so a run that is interrupted can simply be started again.
+    """
+
+    def __init__(self, year, chunk_size=1000):
+        self.year = year
+        self.chunk_size = chunk_size
+
+    def progress(self):
+        return BalanceReset.objects.filter(year=self.year).first()
+
+    def preview(self):
+        """
+        What a run would do to the profiles not reset yet, from one
+        aggregate query: per leave type the days held now, after the
+        reset and lapsing for want of carry-forward.
+        """
+        progress = self.progress()
+        if progress is not None and progress.finished_at:
+            return {'profiles': 0, 'leave_types': {}}
+        profiles = Profile.objects.filter(user_id__gt=progress.last_user_id if progress else 0)
+        aggregates = {'profiles': Count('id')}
+        for leave_type, field in BALANCE_FIELDS.items():
+            aggregates[f'{leave_type}_before'] = Sum(field)
+            aggregates[f'{leave_type}_after'] = Sum(reset_expression(leave_type))
+            aggregates[f'{leave_type}_forfeited'] = Sum(forfeit_expression(leave_type))
+        totals = profiles.aggregate(**aggregates)
+        return {
+            'profiles': totals['profiles'],
+            'leave_types': {
+                leave_type: {
+                    name: totals[f'{leave_type}_{name}'] or 0 for name in ('before', 'after', 'forfeited')
+                }
+                for leave_type in BALANCE_FIELDS
+            },
+        }
+
+    def run(self, actor=None, progress_callback=None):
+        """ Reset every profile not reset yet; returns the BalanceReset row """
+        BalanceReset.objects.get_or_create(year=self.year)
+        while True:
+            progress = self._chunk(actor)
+            if progress_callback is not None:
+                progress_callback(progress)
+            if progress.finished_at:
+                return progress
+
+    def _chunk(self, actor):
+        with transaction.atomic():
+            # also keeps two runs for the same year from interleaving
+            progress = BalanceReset.objects.select_for_update().get(year=self.year)
+            if progress.finished_at:
+                return progress
+            user_ids = list(
+                Profile.objects.select_for_update()
+                .filter(user_id__gt=progress.last_user_id)
+                .order_by('user_id')
+                .values_list('user_id', flat=True)[:self.chunk_size]
+            )
+            if not user_ids:
+                progress.finished_at = timezone.now()
+                progress.save(update_fields=['finished_at'])
+                return progress
+
+            # a range rather than IN (...): the same rows, a much shorter statement
+            profiles = Profile.objects.filter(user_id__gt=progress.last_user_id, user_id__lte=user_ids[-1])
+            now = timezone.now()
+            # the ledger is written first, from the balances before the reset
+            for leave_type in BALANCE_FIELDS:
+                insert_reset_entries(profiles, leave_type, actor, now)
+            profiles.update(**{
+                field: reset_expression(leave_type) for leave_type, field in BALANCE_FIELDS.items()
+            })
+
+            bump_users(user_ids)
+            transaction.on_commit(lambda: invalidate_users(user_ids))
+            progress.last_user_id = user_ids[-1]
+            progress.profiles += len(user_ids)
+            progress.save(update_fields=['last_user_id', 'profiles'])
+        return progress
@@ -0,0 +1,85 @@
+from django.db import transaction
+from django.db.models import F
+from rest_framework import serializers
+from .models import Profile, LeaveBalanceEntry
+from .revisions import bump_users
+from .user_cache import invalidate_users
+
+# leave types that are paid out of a Profile balance, and the column holding it
+BALANCE_FIELDS = {
+    'casual': 'casual_leave_balance',
+    'sick': 'sick_leave_balance',
+}
+
+
+def change_balance(user_id, leave_type, delta, reason, leave=None, actor=None):
+    """
+    Add delta to a user's balance for leave_type and append the matching
+    ledger entry, in one transaction holding the profile row lock. Returns
+    the new balance, or None for leave types without a balance. A deduction
+    that would overdraw the balance raises a ValidationError; since the row
+    is locked this also holds for concurrent approvals.
+    """
+    field = BALANCE_FIELDS.get(leave_type)
+    if field is None or delta == 0:
+        return None
+
+    with transaction.atomic():
+        current = Profile.objects.select_for_update().filter(user_id=user_id).values_list(field, flat=True).get()
+        if delta < 0 and current + delta < 0:
+            raise serializers.ValidationError({
+                "leave_type": f"Insufficient {leave_type} leave balance."
+            })
+        Profile.objects.filter(user_id=user_id).update(**{field: F(field) + delta})
+        balance = current + delta
+        LeaveBalanceEntry.objects.create(
+            user_id=user_id, leave=leave, leave_type=leave_type, delta=delta,
+            balance_after=balance, reason=reason, created_by=actor,
+        )
+        # queryset updates send no signals, drop the cached profile ourselves
+        bump_users([user_id])
+        transaction.on_commit(lambda: invalidate_users([user_id]))
+    return balance
+
+
+def deducted_days(leave_ids):
+    """
+    Days deducted when each of the leaves was last approved, for those
+    whose latest ledger entry is that approval. One query.
+    """
+    latest = {}
+    entries = (
+        LeaveBalanceEntry.objects
+        .filter(leave_id__in=leave_ids, reason__in=('approval', 'reversal'))
+        .order_by('id')
+        .values_list('leave_id', 'reason', 'delta')
+    )
+    for leave_id, reason, delta in entries:
+        latest[leave_id] = -delta if reason == 'approval' else None
+    return {leave_id: days for leave_id, days in latest.items() if days is not None}
+
+
+def status_change_delta(leave, previous_status, new_status, deducted=None):
+    """
+    Balance effect of moving leave from previous_status to new_status as a
+    (delta, ledger reason) pair: approving deducts no_days, un-approving
+    gives back what was deducted (from the ledger when it is passed in,
+    no_days for leaves approved before the ledger), anything else is (0, None).
+    """
+    if previous_status != 'approved' and new_status == 'approved':
+        return -leave.no_days, 'approval'
+    if previous_status == 'approved' and new_status != 'approved':
+        return (leave.no_days if deducted is None else deducted), 'reversal'
+    return 0, None
+
+
+def apply_status_change(leave, previous_status, actor=None):
+    """
+    Settle the balance for a leave whose status went from previous_status to
+    leave.status.
+    """
+    deducted = None
+    if previous_status == 'approved' and leave.status != 'approved':
+        deducted = deducted_days([leave.id]).get(leave.id)
+    delta, reason = status_change_delta(leave, previous_status, leave.status, deducted)
+    return change_balance(leave.user_id, leave.leave_type, delta, reason, leave, actor)
@@ -0,0 +1,285 @@
+import gc
+import time
+import tracemalloc
+from datetime import timedelta
+from importlib import import_module
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+from . import response_cache
+from .models import LeaveRequest, Profile
+from .token_blacklist import FastBlacklistRefreshToken
+from .user_cache import invalidate_user
+from .working_days import day_start, holiday_calendar
+
+User = get_user_model()
+
+BENCH_PASSWORD = 'bench-password'
+# apps whose urls.py the suite must cover, mounted under /api/<app>/
+APPS = ('employee', 'manager')
+# differences below these are noise whatever the tolerance
+MIN_LATENCY_DELTA_MS = 1.0
+MIN_MEMORY_DELTA_KB = 64
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Endpoint:
+    """
+    One request of the suite. path and the values of data may contain
+    {placeholders} filled from the fixtures; data may also be a callable
+    taking the fixtures, for payloads that can't be reused (uploads,
+    refresh tokens). Cached GETs are benchmarked cold, so the serializers
+    and queries behind them are what gets measured.
+    """
+
+    def __init__(self, method, path, role='employee', data=None, expect=200, cold=False):
+        self.method = method
+        self.path = path
+        self.role = role
+        self.data = data
+        self.expect = expect
+        self.cold = cold
+        self.name = f"{method} {path}"
+
+    def request_path(self, fixtures):
+        return self.path.format(**fixtures.values)
+
+    def request_data(self, fixtures):
+        if callable(self.data):
+            return self.data(fixtures)
+        if isinstance(self.data, dict):
+            return {
+                name: value.format(**fixtures.values) if isinstance(value, str) else value
+                for name, value in self.data.items()
+            }
+        return self.data
+
+
+def _upload(fixtures):
+    rows = '\n'.join(f'bench-import-{i},bench-import-{i}@example.com,{BENCH_PASSWORD}' for i in range(20))
+    return {'file': SimpleUploadedFile('staff.csv', f'username,email,password\n{rows}\n'.encode())}
+
+
+def _refresh(fixtures):
+    return {'refresh': str(FastBlacklistRefreshToken.for_user(fixtures.employee))}
+
+
+LEAVE_CHANGE = {
+    'leave_type': 'casual', 'start_date': '{pending_start}', 'end_date': '{pending_end}',
+    'reason': 'bench', 'status': 'approved',
+}
+
+ENDPOINTS = [
+    # employee/urls.py
+    Endpoint('POST', '/api/employee/token/', role=None, data={'username': '{employee_email}', 'password': BENCH_PASSWORD}),
+    Endpoint('POST', '/api/employee/token/refresh/', role=None, data=_refresh),
+    Endpoint('GET', '/api/employee/profile/'),
+    Endpoint('GET', '/api/employee/leave/'),
+    Endpoint('POST', '/api/employee/leave/', expect=201, data={
+        'leave_type': 'casual', 'start_date': '{free_start}', 'end_date': '{free_end}', 'reason': 'bench',
+    }),
+    Endpoint('GET', '/api/employee/calendar/'),
+    Endpoint('POST', '/api/employee/logout/', expect=205, data=_refresh),
+    # manager/urls.py
+    Endpoint('GET', '/api/manager/all-users/', role='admin', cold=True),
+    Endpoint('PUT', '/api/manager/users/{employee}/status/', role='admin'),
+    Endpoint('POST', '/api/manager/users/create/', role='admin', expect=201, data={
+        'username': 'bench-created', 'email': 'bench-created@example.com', 'password': BENCH_PASSWORD,
+    }),
+    Endpoint('POST', '/api/manager/users/import/', role='admin', data=_upload),
+    Endpoint('GET', '/api/manager/leaves/', role='admin', cold=True),
+    Endpoint('GET', '/api/manager/leaves/export/csv/', role='admin'),
+    Endpoint('GET', '/api/manager/leaves/export/jsonl/', role='admin'),
+    Endpoint('PUT', '/api/manager/leave/{leave}/status/', role='admin', data=LEAVE_CHANGE),
+    Endpoint('GET', '/api/manager/calendar/', role='admin'),
+    Endpoint('GET', '/api/manager/reports/leaves/', role='admin', cold=True),
+    Endpoint('POST', '/api/manager/leaves/bulk-status/', role='admin', data=lambda fixtures: {
+        'items': [{'id': fixtures.values['leave'], 'status': 'approved'}],
+    }),
+    Endpoint('GET', '/api/manager/cache-stats/', role='admin'),
+    Endpoint('GET', '/api/manager/login-stats/', role='admin'),
+]
+
+
+class _AnyId(dict):
+    def __missing__(self, key):
+        return 1
+
+
+def uncovered_routes(endpoints=ENDPOINTS):
+    """ Routes of the apps' urls.py that no endpoint of the suite requests """
+    routes = {
+        f'api/{app}/{pattern.pattern}'
+        for app in APPS
+        for pattern in import_module(f'{app}.urls').urlpatterns
+    }
+    for endpoint in endpoints:
+        routes.discard(resolve(endpoint.path.format_map(_AnyId())).route)
+    return sorted(routes)
+
+
+class Fixtures:
+    """
+    An admin and an employee with tokens, plus leaves the write endpoints
+    act on, created next to whatever data is already in the database.
+    """
+
+    def __init__(self):
+        self.admin = User.objects.create_user(
+            'bench-admin', 'bench-admin@example.com', BENCH_PASSWORD, is_staff=True, is_superuser=True,
+        )
+        self.employee = User.objects.create_user('bench-employee', 'bench-employee@example.com', BENCH_PASSWORD)
+        Profile.objects.filter(user=self.employee).update(casual_leave_balance=1000, sick_leave_balance=1000)
+        # runs are rolled back, so ids can come round again while an
+        # earlier run's users are still cached
+        for user in (self.admin, self.employee):
+            invalidate_user(user.pk, user.email)
+
+        # one working day for the pending leave, another for new requests
+        day = timezone.localdate() + timedelta(days=30)
+        free = []
+        while len(free) < 2:
+            if holiday_calendar.working_days(day, day):
+                free.append(day_start(day))
+            day += timedelta(days=1)
+        pending = LeaveRequest.objects.create(
+            user=self.employee, leave_type='casual', start_date=free[0], end_date=free[0], reason='bench',
+        )
+        self.values = {
+            'employee': self.employee.pk,
+            'employee_email': self.employee.email,
+            'leave': pending.pk,
+            'pending_start': free[0].isoformat(),
+            'pending_end': free[0].isoformat(),
+            'free_start': free[1].isoformat(),
+            'free_end': free[1].isoformat(),
+        }
+        self.headers = {
+            'admin': {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.admin)}'},
+            'employee': {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.employee)}'},
+            None: {},
+        }
+
+
+class EndpointBenchmark:
+    """
+    Drive each endpoint through the full Django stack with the test client
+    and record latency percentiles, queries and response bytes per request,
+    and the peak memory allocated while answering (measured in a separate
+    pass, tracemalloc slows everything down). Every request runs in a
+    savepoint that is rolled back, so writes can be repeated with the same
+    payload and leave the data as it was.
+    """
+
+    def __init__(self, fixtures, requests=50, warmup=5, memory_requests=3):
+        self.fixtures = fixtures
+        self.requests = requests
+        self.warmup = warmup
+        self.memory_requests = memory_requests
+        self.client = Client()
+
+    def _prepare(self, endpoint):
+        path = endpoint.request_path(self.fixtures)
+        data = endpoint.request_data(self.fixtures)
+        headers = self.fixtures.headers[endpoint.role]
+        if endpoint.cold:
+            caches[response_cache.CACHE_ALIAS].clear()
+        if endpoint.method == 'GET':
+            return lambda: self.client.get(path, data, **headers)
+        if endpoint.method == 'POST' and any(isinstance(value, SimpleUploadedFile) for value in data.values()):
+            return lambda: self.client.post(path, data, **headers)
+        method = getattr(self.client, endpoint.method.lower())
+        return lambda: method(path, data, content_type='application/json', **headers)
+
+    def _request(self, endpoint):
+        """ (seconds, queries, status, bytes) of one request, rolled back """
+        with transaction.atomic():
+            send = self._prepare(endpoint)
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                start = time.perf_counter()
+                response = send()
+                # streamed responses do their work while being consumed
+                body = b''.join(response.streaming_content) if response.streaming else response.content
+                elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+        return elapsed, counter.count, response.status_code, len(body)
+
+    def run(self, endpoint):
+        for _ in range(self.warmup):
+            self._request(endpoint)
+
+        latencies, queries, errors = [], [], 0
+        for _ in range(self.requests):
+            elapsed, count, status, size = self._request(endpoint)
+            latencies.append(elapsed * 1000)
+            queries.append(count)
+            errors += status != endpoint.expect
+
+        peak = 0
+        gc.collect()
+        tracemalloc.start()
+        try:
+            for _ in range(self.memory_requests):
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                self._request(endpoint)
+                peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'requests': self.requests,
+            'errors': errors,
+            'status': status,
+            'p50_ms': round(percentile(latencies, 0.5), 3),
+            'p95_ms': round(percentile(latencies, 0.95), 3),
+            'p99_ms': round(percentile(latencies, 0.99), 3),
+            'mean_ms': round(sum(latencies) / len(latencies), 3),
+            'queries': max(queries),
+            'response_bytes': size,
+            'peak_kb': round(peak / 1024, 1),
+        }
+
+
+def compare(baseline, results, tolerance=0.25):
+    """
+    Regressions of results against a baseline, as readable strings: more
+    queries than before, errors, or median latency / peak memory up by
+    more than tolerance (and by more than the noise floor). The tail
+    percentiles are recorded but too noisy on a shared machine to gate on.
+    """
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if result['errors']:
+            regressions.append(f"{name}: {result['errors']} of {result['requests']} requests failed")
+        if before is None:
+            continue
+        if result['queries'] > before['queries']:
+            regressions.append(f"{name}: {before['queries']} -> {result['queries']} queries")
+        if result['p50_ms'] > before['p50_ms'] * (1 + tolerance) and \
+                result['p50_ms'] - before['p50_ms'] > MIN_LATENCY_DELTA_MS:
+            regressions.append(f"{name}: p50 {before['p50_ms']:.1f} -> {result['p50_ms']:.1f} ms")
+        if result['peak_kb'] > before['peak_kb'] * (1 + tolerance) and \
+                result['peak_kb'] - before['peak_kb'] > MIN_MEMORY_DELTA_KB:
+            regressions.append(f"{name}: peak memory {before['peak_kb']:.0f} -> {result['peak_kb']:.0f} KB")
+    return regressions
@@ -1,17 +1,28 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import ModelBackend
+from .password_hashing import check_user_password, hash_unknown_user_password
+from .user_cache import get_cached_user_by_email
+
+User = get_user_model()
 
 class EmailBackend(ModelBackend):
-    """ custome authentication backend for users to log in with there email """
+    """
+    custome authentication backend for users to log in with there email, or
+    their username (the admin site). It replaces ModelBackend, which would
+    hash in the request thread: every password hash, including the one for
+    unknown users, runs in hash_pool.
+    """
     def authenticate(self, request, username=None, password=None, **kwargs):
-        UserModel = get_user_model()
-        try:
-            user = UserModel.objects.get(email=username)
-        except UserModel.DoesNotExist:
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        user = get_cached_user_by_email(username) or User._default_manager.filter(username=username).first()
+        if user is None:
+            hash_unknown_user_password(password)
             return None
-        else:
-            if user.check_password(password) and self.user_can_authenticate(user):
-                return user
+        if self.user_can_authenticate(user) and check_user_password(user, password):
+            return user
         return None
 
     def user_can_authenticate(self, user):
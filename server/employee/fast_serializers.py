@@ -0,0 +1,109 @@
+from functools import lru_cache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from .instrumentation import timed
+from .query_planning import get_query_plan
+
+# fields whose to_representation() returns database values unchanged
+PASSTHROUGH_FIELDS = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.ChoiceField,
+)
+
+
+def _datetime_converter(field):
+    """
+    DateTimeField.to_representation() looks up the active timezone for every
+    value; resolve it once per serialize() call and format aware values here.
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if not timezone.is_aware(value):
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+def _converter(field):
+    if type(field) in PASSTHROUGH_FIELDS:
+        return None
+    if type(field) is serializers.DateTimeField:
+        return _datetime_converter(field)
+    return field.to_representation
+
+
+class FastSerializer:
+    """
+    Read-only counterpart of a ModelSerializer for large listings.
+    Rows are fetched with values() and turned into dicts by precomputed
+    accessors, skipping serializer and model instantiation per row. The
+    output renders to the same JSON as serializer_class(many=True).data.
+    """
+
+    def __init__(self, serializer_class):
+        plan = get_query_plan(serializer_class)
+        if plan is None:
+            raise ImproperlyConfigured(
+                f'{serializer_class.__name__} has fields that cannot be read from values().'
+            )
+        related, columns = plan
+        # the relation columns themselves tell a null relation apart
+        self.columns = tuple(columns) + tuple(related)
+        self.steps = self._compile(serializer_class(), '')
+
+    def _compile(self, serializer, prefix):
+        steps = []
+        for field in serializer.fields.values():
+            if field.write_only:
+                continue
+            path = prefix + field.source
+            if isinstance(field, serializers.ModelSerializer):
+                steps.append((field.field_name, path, None, self._compile(field, path + '__')))
+            else:
+                steps.append((field.field_name, path, field, None))
+        return steps
+
+    def _bind(self, steps):
+        """ Swap each field for the converter to use during this call """
+        return [
+            (name, path, None if nested else _converter(field), nested and self._bind(nested))
+            for name, path, field, nested in steps
+        ]
+
+    def _build(self, row, steps):
+        data = {}
+        for name, path, convert, nested in steps:
+            value = row[path]
+            if value is None:
+                data[name] = None
+            elif nested is not None:
+                data[name] = self._build(row, nested)
+            elif convert is None:
+                data[name] = value
+            else:
+                data[name] = convert(value)
+        return data
+
+    def values(self, queryset):
+        return queryset.values(*self.columns)
+
+    def serialize(self, rows):
+        with timed('serialize'):
+            steps = self._bind(self.steps)
+            return [self._build(row, steps) for row in rows]
+
+
+@lru_cache(maxsize=None)
+def get_fast_serializer(serializer_class):
+    return FastSerializer(serializer_class)
@@ -0,0 +1,290 @@
+import contextvars
+import hmac
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseForbidden
+from rest_framework.renderers import JSONRenderer
+
+# requests slower than this (seconds) are logged with their worst query
+SLOW_REQUEST_THRESHOLD = getattr(settings, 'SLOW_REQUEST_THRESHOLD', 0.5)
+# add a Server-Timing header (db, serialize, render, total) to responses
+SERVER_TIMING = getattr(settings, 'INSTRUMENTATION_SERVER_TIMING', True)
+# bearer token required by the metrics endpoint; without one it is only
+# served with DEBUG on
+METRICS_TOKEN = getattr(settings, 'METRICS_TOKEN', '')
+# how much of the worst query goes into the slow request log; its parameters
+# never do (password hashes, emails, tokens)
+MAX_SQL_LENGTH = 2000
+# anything else is recorded as 'other', so clients can't add label values
+METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+logger = logging.getLogger('employee.slow_requests')
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """ What one request spent its time on; filled in as it runs """
+    __slots__ = (
+        'start', 'queries', 'db_time', 'serialize_time', 'render_time',
+        'worst_time', 'worst_sql',
+    )
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.render_time = 0.0
+        self.worst_time = 0.0
+        self.worst_sql = None
+
+    def server_timing(self):
+        total = time.perf_counter() - self.start
+        return (
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries", '
+            f'serialize;dur={self.serialize_time * 1000:.1f}, '
+            f'render;dur={self.render_time * 1000:.1f}, '
+            f'total;dur={total * 1000:.1f}'
+        )
+
+
+def record_sql(execute, sql, params, many, context):
+    """
+    Execute wrapper installed on every connection: times the query for the
+    request running in this context, if any. Async views run their
+    queries in other threads; the context (and so the request) goes along.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.queries += 1
+        metrics.db_time += elapsed
+        if elapsed > metrics.worst_time:
+            metrics.worst_time, metrics.worst_sql = elapsed, sql
+
+
+def install_sql_recorder(sender, connection, **kwargs):
+    """ connection_created receiver """
+    if record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_sql)
+
+
+@contextmanager
+def timed(phase):
+    """
+    Add the time spent in the block to the current request's phase
+    ('serialize' or 'render'). Queries run inside the block (a lazy
+    queryset being serialized) count as db time only.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start, db_time = time.perf_counter(), metrics.db_time
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start - (metrics.db_time - db_time)
+        setattr(metrics, f'{phase}_time', getattr(metrics, f'{phase}_time') + elapsed)
+
+
+class TimedSerializerMixin:
+    """ Counts serializer.data towards the request's serialize time """
+
+    @property
+    def data(self):
+        with timed('serialize'):
+            return super().data
+
+
+class TimedJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed('render'):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+class Histogram:
+    """ Prometheus histogram per label set; observe() is called under the registry lock """
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        # labels -> [count per bucket (last is +Inf), sum]
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def expose(self, label_names):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, series in sorted(self.series.items()):
+            label_text = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(label_names, labels))
+            cumulative = 0
+            for upper, count in zip((*self.buckets, '+Inf'), series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{upper}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {round(series[-1], 6)}')
+            lines.append(f'{self.name}_count{{{label_text}}} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Per-route request histograms of this process, exported in the
+    Prometheus text format. Recording a request is a handful of list
+    increments under one lock.
+    """
+    LABELS = ('route', 'method')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.responses = {}
+            self.histograms = {
+                'duration': Histogram('http_request_duration_seconds', 'Time to the response.', DURATION_BUCKETS),
+                'db': Histogram('http_request_db_seconds', 'Time spent executing SQL.', DURATION_BUCKETS),
+                'queries': Histogram('http_request_queries', 'SQL queries per request.', QUERY_BUCKETS),
+                'serialize': Histogram('http_request_serialize_seconds', 'Time spent in serializers.', DURATION_BUCKETS),
+                'render': Histogram('http_request_render_seconds', 'Time spent rendering JSON.', DURATION_BUCKETS),
+                'size': Histogram('http_response_size_bytes', 'Response body size.', SIZE_BUCKETS),
+            }
+
+    def record(self, route, method, status, metrics, duration, size):
+        labels = (route, method)
+        observations = (
+            ('duration', duration), ('db', metrics.db_time), ('queries', metrics.queries),
+            ('serialize', metrics.serialize_time), ('render', metrics.render_time), ('size', size),
+        )
+        with self.lock:
+            key = (route, method, str(status))
+            self.responses[key] = self.responses.get(key, 0) + 1
+            for name, value in observations:
+                self.histograms[name].observe(labels, value)
+
+    def expose(self):
+        with self.lock:
+            lines = ['# HELP http_responses_total Responses by route, method and status.', '# TYPE http_responses_total counter']
+            for (route, method, status), count in sorted(self.responses.items()):
+                lines.append(
+                    f'http_responses_total{{route="{_escape(route)}",method="{method}",status="{status}"}} {count}'
+                )
+            for histogram in self.histograms.values():
+                lines.extend(histogram.expose(self.LABELS))
+        return '\n'.join(lines) + '\n'
+
+
+metrics_registry = MetricsRegistry()
+
+
+def start_request():
+    metrics = RequestMetrics()
+    _current.set(metrics)
+    return metrics
+
+
+def _route(request):
+    match = getattr(request, 'resolver_match', None)
+    # the URL pattern, not the path, keeps the number of series bounded
+    return match.route if match is not None else '<unmatched>'
+
+
+def _finish(request, status, metrics, size):
+    _current.set(None)
+    duration = time.perf_counter() - metrics.start
+    route = _route(request)
+    method = request.method if request.method in METHODS else 'other'
+    metrics_registry.record(route, method, status, metrics, duration, size)
+    if duration < SLOW_REQUEST_THRESHOLD:
+        return
+    entry = {
+        'method': request.method, 'path': request.path, 'route': route, 'status': status,
+        'duration_ms': round(duration * 1000, 1), 'queries': metrics.queries,
+        'db_ms': round(metrics.db_time * 1000, 1),
+        'serialize_ms': round(metrics.serialize_time * 1000, 1),
+        'render_ms': round(metrics.render_time * 1000, 1),
+        'response_bytes': size,
+        'worst_query': metrics.worst_sql and {
+            # with its placeholders, the values stay out of the log
+            'sql': metrics.worst_sql[:MAX_SQL_LENGTH],
+            'duration_ms': round(metrics.worst_time * 1000, 1),
+        },
+    }
+    logger.warning(json.dumps(entry), extra={'slow_request': entry})
+
+
+def finish_request(request, response, metrics):
+    """
+    Record the request and add the Server-Timing header. Streamed bodies
+    are produced after this returns, so they are recorded once the last
+    chunk is sent (their header only covers the time to the first byte).
+    """
+    if SERVER_TIMING:
+        response.headers['Server-Timing'] = metrics.server_timing()
+    if not response.streaming:
+        _finish(request, response.status_code, metrics, len(response.content))
+        return response
+    if isinstance(response, FileResponse):
+        # wrapping the file would stop the server from using sendfile
+        _finish(request, response.status_code, metrics, int(response.headers.get('Content-Length', 0)))
+        return response
+
+    def count(size=0):
+        # metrics are set again: the body may be consumed in another context
+        _current.set(metrics)
+        try:
+            for chunk in chunks:
+                size += len(chunk)
+                yield chunk
+        finally:
+            _finish(request, response.status_code, metrics, size)
+
+    async def acount(size=0):
+        _current.set(metrics)
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                yield chunk
+        finally:
+            _finish(request, response.status_code, metrics, size)
+
+    chunks = response.streaming_content
+    response.streaming_content = acount() if response.is_async else count()
+    return response
+
+
+def metrics_view(request):
+    """ Request histograms in the Prometheus text format """
+    if METRICS_TOKEN:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(supplied.encode(), METRICS_TOKEN.encode()):
+            return HttpResponseForbidden()
+    elif not settings.DEBUG:
+        return HttpResponseForbidden()
+    return HttpResponse(metrics_registry.expose(), content_type='text/plain; version=0.0.4; charset=utf-8')
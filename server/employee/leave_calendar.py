@@ -0,0 +1,71 @@
+import calendar
+from datetime import date, timedelta
+from django.utils import timezone
+from rest_framework import serializers
+from .fast_serializers import get_fast_serializer
+from .models import LeaveRequest
+from .serializers import LeaveRequestSerializer
+from .working_days import day_start
+
+
+def parse_month(value):
+    """ First and last day of a YYYY-MM month string; defaults to this month """
+    if not value:
+        today = timezone.localdate()
+        year, month = today.year, today.month
+    else:
+        try:
+            year, month = (int(part) for part in value.split('-'))
+            date(year, month, 1)
+        except ValueError:
+            raise serializers.ValidationError({"month": "Enter a month in YYYY-MM format."})
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def month_occupancy(queryset, first_day, last_day):
+    """
+    Leaves from queryset touching [first_day, last_day] and, for every day of
+    that window, how many of them fall on it. The start_date indexes are read
+    over a range bounded on both sides: leaves are at most
+    LeaveRequest.MAX_SPAN_DAYS long, so none starting earlier can reach the
+    window. Each leave is expanded over at most the days of the window, so
+    the cost depends on the month, not on the size of the leave history.
+    """
+    serializer = get_fast_serializer(LeaveRequestSerializer)
+    earliest_start = first_day - timedelta(days=LeaveRequest.MAX_SPAN_DAYS - 1)
+    rows = list(serializer.values(
+        queryset.filter(
+            start_date__gte=day_start(earliest_start), start_date__lt=day_start(last_day + timedelta(days=1)),
+            end_date__gte=day_start(first_day),
+        )
+        .order_by('start_date', 'id')
+    ))
+
+    days = {first_day + timedelta(days=offset): [] for offset in range((last_day - first_day).days + 1)}
+    for row in rows:
+        day = max(timezone.localtime(row['start_date']).date(), first_day)
+        end = min(timezone.localtime(row['end_date']).date(), last_day)
+        while day <= end:
+            days[day].append(row['id'])
+            day += timedelta(days=1)
+
+    return {
+        "days": [
+            {"date": day.isoformat(), "count": len(leave_ids), "leave_ids": leave_ids}
+            for day, leave_ids in days.items()
+        ],
+        "leaves": serializer.serialize(rows),
+    }
+
+
+def calendar_response_data(queryset, params):
+    """ Shared body of the employee and manager calendar endpoints """
+    first_day, last_day = parse_month(params.get('month'))
+    leave_status = params.get('status', 'approved')
+    if leave_status != 'all':
+        if leave_status not in dict(LeaveRequest.STATUS_CHOICES):
+            raise serializers.ValidationError({"status": "Invalid status."})
+        queryset = queryset.filter(status=leave_status)
+    data = {"month": first_day.strftime('%Y-%m')}
+    data.update(month_occupancy(queryset, first_day, last_day))
+    return data
@@ -0,0 +1,38 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from employee.synthetic import SyntheticData
+from manager.analytics import LeaveReport
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the leave report over synthetic leaves spread across one year. "
+        "Rows are inserted in a transaction that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        data = SyntheticData(seed=options['seed'], prefix='bench-report')
+
+        with transaction.atomic():
+            start = time.perf_counter()
+            users = data.create_users(options['users'])
+            data.create_leaves(users, options['rows'], batch_size=10000)
+            self.stdout.write(f"inserted {options['rows']} leaves in {time.perf_counter() - start:.1f} s")
+
+            report = LeaveReport({})
+            total = 0
+            for name in ('by_leave_type', 'absent_days', 'top_employees', 'approval_latency'):
+                start = time.perf_counter()
+                getattr(report, name)()
+                elapsed = time.perf_counter() - start
+                total += elapsed
+                self.stdout.write(f'{name:>17}: {elapsed * 1000:8.0f} ms')
+            self.stdout.write(f"{'report':>17}: {total * 1000:8.0f} ms")
+
+            transaction.set_rollback(True)
@@ -0,0 +1,146 @@
+import asyncio
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+from employee.benchmarks import percentile
+
+User = get_user_model()
+
+DEFAULT_PATHS = ['/api/employee/profile/', '/api/employee/leave/']
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test read endpoints in process, through the WSGI handler with the sync "
+        "views (a pool of threads, like gunicorn's gthread workers) and through the ASGI "
+        "handler with the async views (one event loop). Each mode runs in a fresh process "
+        "so its peak memory can be compared too. Requests are made as --user against the "
+        "configured database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help="email of the user to authenticate as")
+        parser.add_argument('--path', action='append', dest='paths', help="endpoint to load, repeatable")
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--mode', choices=('wsgi', 'asgi', 'both'), default='both')
+
+    def handle(self, *args, **options):
+        if options['mode'] == 'both':
+            for mode in ('wsgi', 'asgi'):
+                for result in self.run_child(mode, options):
+                    self.report(result)
+            return
+
+        if (options['mode'] == 'asgi') != settings.ASYNC_VIEWS:
+            raise CommandError(f"Run --mode {options['mode']} with ASYNC_VIEWS={'1' if options['mode'] == 'asgi' else '0'}.")
+        user = User.objects.filter(email=options['user']).first()
+        if user is None:
+            raise CommandError(f"No user with email {options['user']}.")
+        token = str(RefreshToken.for_user(user).access_token)
+
+        bench = self.bench_wsgi if options['mode'] == 'wsgi' else self.bench_asgi
+        for path in options['paths'] or DEFAULT_PATHS:
+            elapsed, calls = bench(path, token, options['requests'], options['concurrency'])
+            latencies = [latency for latency, _ in calls]
+            self.stdout.write(json.dumps({
+                'mode': options['mode'], 'path': path, 'requests': len(latencies),
+                'errors': sum(status != 200 for _, status in calls),
+                'rps': len(latencies) / elapsed,
+                'p50_ms': percentile(latencies, 0.5) * 1000,
+                'p99_ms': percentile(latencies, 0.99) * 1000,
+                'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            }))
+
+    def run_child(self, mode, options):
+        command = [
+            sys.executable, sys.argv[0], 'bench_asgi', '--mode', mode, '--user', options['user'],
+            '--requests', str(options['requests']), '--concurrency', str(options['concurrency']),
+        ]
+        for path in options['paths'] or []:
+            command += ['--path', path]
+        env = dict(os.environ, ASYNC_VIEWS='1' if mode == 'asgi' else '0')
+        output = subprocess.run(command, env=env, capture_output=True, text=True)
+        if output.returncode:
+            raise CommandError(output.stderr)
+        return [json.loads(line) for line in output.stdout.splitlines() if line.startswith('{')]
+
+    def report(self, result):
+        self.stdout.write(
+            f"{result['mode']} {result['path']:<28} {result['rps']:7.0f} req/s  "
+            f"p50 {result['p50_ms']:6.2f} ms  p99 {result['p99_ms']:7.2f} ms  "
+            f"peak RSS {result['peak_rss_mb']:5.0f} MB  {result['errors']} errors"
+        )
+
+    def bench_wsgi(self, path, token, requests, concurrency):
+        handler = WSGIHandler()
+
+        def call(_):
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+                'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_AUTHORIZATION': f'Bearer {token}',
+                'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+            }
+            start = time.perf_counter()
+            response = handler(environ, lambda status, headers: None)
+            b''.join(response)
+            response.close()
+            return time.perf_counter() - start, response.status_code
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            calls = list(pool.map(call, range(requests)))
+        return time.perf_counter() - start, calls
+
+    def bench_asgi(self, path, token, requests, concurrency):
+        handler = ASGIHandler()
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+            'headers': [(b'host', b'localhost'), (b'authorization', f'Bearer {token}'.encode())],
+            'server': ('localhost', 80), 'client': ('127.0.0.1', 0),
+        }
+
+        async def call(limit):
+            async with limit:
+                disconnected = asyncio.Event()
+                body_sent = False
+
+                async def receive():
+                    nonlocal body_sent
+                    if not body_sent:
+                        body_sent = True
+                        return {'type': 'http.request', 'body': b'', 'more_body': False}
+                    await disconnected.wait()
+                    return {'type': 'http.disconnect'}
+
+                async def send(message):
+                    if message['type'] == 'http.response.start':
+                        statuses.append(message['status'])
+                    if message['type'] == 'http.response.body' and not message.get('more_body'):
+                        disconnected.set()
+
+                statuses = []
+                start = time.perf_counter()
+                await handler(dict(scope), receive, send)
+                return time.perf_counter() - start, statuses[0]
+
+        async def run():
+            limit = asyncio.Semaphore(concurrency)
+            start = time.perf_counter()
+            calls = await asyncio.gather(*(call(limit) for _ in range(requests)))
+            return time.perf_counter() - start, calls
+
+        return asyncio.run(run())
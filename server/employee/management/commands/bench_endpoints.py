@@ -0,0 +1,94 @@
+import json
+import platform
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import override_settings
+from django.utils import timezone
+from employee.benchmarks import ENDPOINTS, EndpointBenchmark, Fixtures, compare, uncovered_routes
+from employee.synthetic import SyntheticData
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every endpoint of employee/urls.py and manager/urls.py: latency percentiles, "
+        "queries and peak memory per request. Synthetic users and leaves are generated first "
+        "(--users/--leaves, 0 to use only what is in the database) and everything is rolled back. "
+        "--output writes the results as a JSON baseline, --baseline compares against one and "
+        "exits with an error on regressions. Passwords use a cheap hasher so logins measure the "
+        "view rather than PBKDF2."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--leaves', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--requests', type=int, default=50, help="Timed requests per endpoint")
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--memory-requests', type=int, default=3, help="Requests per endpoint traced for peak memory")
+        parser.add_argument('--only', nargs='+', default=[], help="Endpoints whose name contains one of these")
+        parser.add_argument('--output', help="Write the results to this JSON file")
+        parser.add_argument('--baseline', help="Compare with this JSON file")
+        parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed median latency and memory growth")
+
+    @override_settings(
+        PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+        ALLOWED_HOSTS=['*'],
+        USER_IMPORT_HASH_WORKERS=1,
+    )
+    def handle(self, *args, **options):
+        missing = uncovered_routes()
+        if missing:
+            raise CommandError(f"No benchmark for: {', '.join(missing)}")
+
+        baseline = None
+        if options['baseline']:
+            try:
+                baseline = json.loads(Path(options['baseline']).read_text())['endpoints']
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f"Can't read baseline {options['baseline']}: {e}")
+
+        endpoints = [
+            endpoint for endpoint in ENDPOINTS
+            if not options['only'] or any(part in endpoint.name for part in options['only'])
+        ]
+        results = {}
+        with transaction.atomic():
+            if options['users'] and options['leaves']:
+                data = SyntheticData(seed=options['seed'], prefix='bench-endpoints')
+                data.create_leaves(data.create_users(options['users']), options['leaves'])
+                data.finish()
+            benchmark = EndpointBenchmark(
+                Fixtures(), requests=options['requests'], warmup=options['warmup'],
+                memory_requests=options['memory_requests'],
+            )
+            for endpoint in endpoints:
+                result = results[endpoint.name] = benchmark.run(endpoint)
+                self.stdout.write(
+                    f"{endpoint.name:<45} p50 {result['p50_ms']:8.2f}  p95 {result['p95_ms']:8.2f}  "
+                    f"p99 {result['p99_ms']:8.2f} ms  {result['queries']:3d} queries  "
+                    f"{result['peak_kb']:8.0f} KB peak  {result['errors']} errors"
+                )
+            transaction.set_rollback(True)
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps({
+                'created_at': timezone.now().isoformat(),
+                'settings': {
+                    'database': connection.vendor,
+                    'python': platform.python_version(),
+                    'async_views': settings.ASYNC_VIEWS,
+                    'users': options['users'],
+                    'leaves': options['leaves'],
+                    'requests': options['requests'],
+                },
+                'endpoints': results,
+            }, indent=2) + '\n')
+            self.stdout.write(f"Wrote {options['output']}")
+
+        if baseline is not None:
+            regressions = compare(baseline, results, options['tolerance'])
+            if regressions:
+                raise CommandError("Regressions against the baseline:\n  " + '\n  '.join(regressions))
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}."))
@@ -0,0 +1,53 @@
+import time
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import update_last_login
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from employee.benchmarks import QueryCounter
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure login throughput: token logins through the API and session-style "
+        "logins that record last_login. Passwords use a cheap hasher so the numbers "
+        "show the per-login database work rather than PBKDF2. Nothing is kept in the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=500)
+
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], ALLOWED_HOSTS=['*'])
+    def handle(self, *args, **options):
+        logins = options['logins']
+        client = Client()
+        credentials = {'username': 'bench-login@example.com', 'password': 'bench-password'}
+
+        with transaction.atomic():
+            user = User.objects.create_user(username='bench-login', email=credentials['username'], password=credentials['password'])
+
+            def token_login():
+                client.post('/api/employee/token/', credentials, content_type='application/json')
+
+            def session_login():
+                # what django.contrib.auth.login() does for the admin site
+                update_last_login(None, User.objects.get(pk=user.pk))
+
+            for name, func in (('token login', token_login), ('last_login update', session_login)):
+                self.report(name, logins, func)
+
+            transaction.set_rollback(True)
+
+    def report(self, name, logins, func):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            start = time.perf_counter()
+            for _ in range(logins):
+                func()
+            elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'{name:>18}: {logins / elapsed:7.0f} logins/s  {elapsed / logins * 1000:6.2f} ms/login  '
+            f'{counter.count / logins:4.1f} queries/login'
+        )
@@ -0,0 +1,70 @@
+import time
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from employee.fast_serializers import get_fast_serializer
+from employee.models import LeaveRequest
+from employee.serializers import LeaveRequestSerializer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Compare LeaveRequestSerializer with the fast serializer on in-memory rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 10_000, 100_000])
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        fast = get_fast_serializer(LeaveRequestSerializer)
+        for size in options['sizes']:
+            instances, rows = self.make_rows(size, fast.columns)
+
+            sample = min(size, 100)
+            if JSONRenderer().render(LeaveRequestSerializer(instances[:sample], many=True).data) != \
+                    JSONRenderer().render(fast.serialize(rows[:sample])):
+                self.stderr.write(self.style.ERROR(f'{size} rows: output differs'))
+                return
+
+            drf = self.best_of(options['repeat'], lambda: LeaveRequestSerializer(instances, many=True).data)
+            quick = self.best_of(options['repeat'], lambda: fast.serialize(rows))
+            self.stdout.write(
+                f'{size:>8} rows  drf {drf * 1000:9.1f} ms  fast {quick * 1000:9.1f} ms  '
+                f'speedup {drf / quick:5.1f}x'
+            )
+
+    def best_of(self, repeat, func):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    def make_rows(self, size, columns):
+        """ Build matching model instances and values() rows without touching the database """
+        now = timezone.now()
+        users = [
+            User(id=i, username=f'user{i}', email=f'user{i}@example.com', first_name='First', last_name='Last')
+            for i in range(1, 51)
+        ]
+        instances, rows = [], []
+        for i in range(size):
+            user = users[i % len(users)]
+            start = now + timedelta(days=i % 365)
+            leave = LeaveRequest(
+                id=i + 1, user=user, leave_type=('casual', 'sick', 'other')[i % 3],
+                start_date=start, end_date=start + timedelta(days=i % 5), no_days=i % 5 + 1,
+                reason='Family event', status=('pending', 'approved', 'rejected')[i % 3],
+            )
+            instances.append(leave)
+            rows.append({column: self.lookup(leave, column) for column in columns})
+        return instances, rows
+
+    def lookup(self, obj, column):
+        for part in column.split('__'):
+            obj = getattr(obj, part)
+        return obj.pk if hasattr(obj, 'pk') else obj
@@ -0,0 +1,151 @@
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+from collections import Counter
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.test import Client, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+from employee.benchmarks import percentile
+from employee.models import Profile
+from employee.working_days import day_start, holiday_calendar
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure write throughput on SQLite with parallel writers: each worker is a forked "
+        "process, like a server worker, with its own connection and staff user, submitting "
+        "leave requests through the API and approving each one (a transaction that reads "
+        "before it writes) as fast as it can. Runs once with the configured database OPTIONS (the production "
+        "profile of settings.py) and once with SQLite's defaults, each on a fresh database "
+        "in a temporary directory, and reports writes per second, latency percentiles and "
+        "failed requests. The configured database is not touched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=16)
+        parser.add_argument('--requests', type=int, default=50, help="Leaves submitted and approved per worker")
+        parser.add_argument(
+            '--modes', nargs='+', choices=('configured', 'defaults'), default=['configured', 'defaults'],
+        )
+
+    @override_settings(ALLOWED_HOSTS=['*'])
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError(f"The default database is {connection.vendor}, not SQLite.")
+        configured = dict(connection.settings_dict.get('OPTIONS', {}))
+        for mode in options['modes']:
+            database_options = configured if mode == 'configured' else {}
+            result = self.run(database_options, options['workers'], options['requests'])
+            failures = ', '.join(f'{count} {reason}' for reason, count in sorted(result['failures'].items()))
+            self.stdout.write(
+                f"{mode:>10} ({result['pragmas']}): {result['writes'] / result['elapsed']:7.0f} writes/s  "
+                f"p50 {result['p50_ms']:7.1f}  p95 {result['p95_ms']:7.1f}  p99 {result['p99_ms']:7.1f} ms  "
+                f"{failures or 'no failures'}"
+            )
+
+    def run(self, database_options, workers, requests):
+        """ One round on a fresh database file opened with database_options """
+        settings_dict = connection.settings_dict
+        saved_options, saved_test = settings_dict.get('OPTIONS', {}), settings_dict['TEST']
+        with tempfile.TemporaryDirectory() as directory:
+            # new connections, including the workers', read these
+            settings_dict['OPTIONS'] = database_options
+            settings_dict['TEST'] = {**saved_test, 'NAME': os.path.join(directory, 'bench.sqlite3')}
+            connection.close()
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                return self.round(workers, requests)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                settings_dict['OPTIONS'], settings_dict['TEST'] = saved_options, saved_test
+
+    def round(self, workers, requests):
+        with connection.cursor() as cursor:
+            pragmas = []
+            for pragma in ('journal_mode', 'synchronous', 'busy_timeout'):
+                cursor.execute(f'PRAGMA {pragma}')
+                pragmas.append(f'{pragma}={cursor.fetchone()[0]}')
+
+        users = [
+            User.objects.create_user(f'bench-writer-{i}', f'bench-writer-{i}@example.com', is_staff=True)
+            for i in range(workers)
+        ]
+        Profile.objects.filter(user__in=users).update(casual_leave_balance=requests * 10)
+        headers = [f'Bearer {AccessToken.for_user(user)}' for user in users]
+        days, day = [], timezone.localdate() + timedelta(days=1)
+        while len(days) < requests:
+            if holiday_calendar.working_days(day, day):
+                days.append(day_start(day).isoformat())
+            day += timedelta(days=1)
+
+        # fork, so the workers start from this process' settings and
+        # database OPTIONS; none of them may inherit an open connection
+        context = multiprocessing.get_context('fork')
+        barrier, results = context.Barrier(workers + 1), context.Queue()
+        connections.close_all()
+        processes = [
+            context.Process(target=_work, args=(authorization, days, barrier, results)) for authorization in headers
+        ]
+        for process in processes:
+            process.start()
+        barrier.wait()
+        start = time.perf_counter()
+        latencies, failures = [], Counter()
+        for _ in processes:
+            worker_latencies, worker_failures = results.get()
+            latencies.extend(worker_latencies)
+            failures.update(worker_failures)
+        elapsed = time.perf_counter() - start
+        for process in processes:
+            process.join()
+
+        return {
+            'pragmas': ', '.join(pragmas),
+            'writes': len(latencies),
+            'elapsed': elapsed,
+            'p50_ms': percentile(latencies, 0.5) if latencies else 0,
+            'p95_ms': percentile(latencies, 0.95) if latencies else 0,
+            'p99_ms': percentile(latencies, 0.99) if latencies else 0,
+            'failures': failures,
+        }
+
+
+def _work(authorization, days, barrier, results):
+    """ One worker process: submit and approve a leave per day, as fast as possible """
+    client = Client(HTTP_AUTHORIZATION=authorization)
+    latencies, failures = [], Counter()
+
+    def write(method, path, data, expect):
+        start = time.perf_counter()
+        try:
+            response = method(path, data, content_type='application/json')
+        except OperationalError as e:
+            failures['database is locked' if 'locked' in str(e) else type(e).__name__] += 1
+            return None
+        if response.status_code != expect:
+            failures[f'HTTP {response.status_code}'] += 1
+            return None
+        latencies.append((time.perf_counter() - start) * 1000)
+        return response
+
+    # failures are counted; their tracebacks would drown the report
+    logging.disable(logging.ERROR)
+    barrier.wait()
+    try:
+        for day in days:
+            leave = {'leave_type': 'casual', 'start_date': day, 'end_date': day, 'reason': 'bench'}
+            response = write(client.post, '/api/employee/leave/', leave, 201)
+            if response is not None:
+                path = f"/api/manager/leave/{response.json()['id']}/status/"
+                write(client.put, path, {**leave, 'status': 'approved'}, 200)
+    finally:
+        connections.close_all()
+        results.put((latencies, dict(failures)))
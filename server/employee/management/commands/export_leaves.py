@@ -0,0 +1,32 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework import serializers
+from employee.models import LeaveRequest
+from manager.export import EXPORT_FORMATS, iter_export
+from manager.filters import filter_leaves
+
+
+class Command(BaseCommand):
+    help = "Stream leave requests to a CSV or JSONL file (or stdout), with the admin listing filters"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--output', help="file to write, defaults to stdout")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        for name in ('status', 'leave_type', 'user', 'date_from', 'date_to'):
+            parser.add_argument(f"--{name.replace('_', '-')}", dest=name)
+
+    def handle(self, *args, **options):
+        params = {name: options[name] for name in ('status', 'leave_type', 'user', 'date_from', 'date_to')}
+        try:
+            leaves = filter_leaves(LeaveRequest.objects.all(), params)
+        except serializers.ValidationError as exc:
+            raise CommandError(exc.detail)
+
+        stream = open(options['output'], 'w', newline='') if options['output'] else sys.stdout
+        try:
+            for line in iter_export(leaves, options['format'], options['chunk_size']):
+                stream.write(line)
+        finally:
+            if options['output']:
+                stream.close()
@@ -0,0 +1,33 @@
+import time
+from django.core.management.base import BaseCommand
+from employee.synthetic import SyntheticData
+
+
+class Command(BaseCommand):
+    help = (
+        "Create synthetic employees and leave requests for load tests "
+        "(see employee.synthetic for the distributions). All users share --password."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--admins', type=int, default=1, help="How many of the users are admins")
+        parser.add_argument('--leaves', type=int, default=20000)
+        parser.add_argument('--years', type=int, default=1, help="Spread leaves over this many calendar years up to this one")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='synthetic', help="Usernames are <prefix>-<n>, emails <prefix>-<n>@example.com")
+        parser.add_argument('--password', default='synthetic-password')
+
+    def handle(self, *args, **options):
+        data = SyntheticData(seed=options['seed'], years=options['years'], prefix=options['prefix'])
+
+        start = time.perf_counter()
+        users = data.create_users(options['users'], admins=options['admins'], password=options['password'])
+        self.stdout.write(f"created {len(users)} users in {time.perf_counter() - start:.1f} s")
+
+        start = time.perf_counter()
+        employees = [user for user in users if not user.is_superuser] or users
+        leaves = data.create_leaves(employees, options['leaves']) if users else 0
+        data.finish()
+        self.stdout.write(f"created {leaves} leaves in {time.perf_counter() - start:.1f} s")
+        self.stdout.write(self.style.SUCCESS(f"Generated {len(users)} users and {leaves} leave requests."))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from employee.user_import import FORMATS, UserImporter, iter_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk import employees from a CSV or JSONL file (username, email, password, first_name, last_name)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS, help="defaults to the file extension")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, help="password hashing processes, 1 hashes inline")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or path.rsplit('.', 1)[-1].lower()
+        if fmt not in FORMATS:
+            raise CommandError(f"Unknown format '{fmt}', use --format {'/'.join(FORMATS)}.")
+
+        importer = UserImporter(batch_size=options['batch_size'], workers=options['workers'])
+        with open(path, 'rb') as stream:
+            for event in importer.iter_events(iter_rows(stream, fmt)):
+                if event['event'] == 'error':
+                    self.stderr.write(f"row {event['row']}: {event['errors']}")
+                elif event['event'] == 'progress':
+                    self.stdout.write(f"{event['processed']} rows, {event['created']} created, {event['failed']} failed")
+                else:
+                    self.stdout.write(self.style.SUCCESS(
+                        f"Done: {event['created']} created, {event['failed']} failed of {event['processed']} rows."
+                    ))
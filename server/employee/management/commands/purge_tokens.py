@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from employee.token_blacklist import purge_expired_tokens
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete outstanding and blacklisted JWTs past their expiry "
+        "(REFRESH_TOKEN_LIFETIME). Run from cron, or keep it running with --every."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--every', type=int, help="repeat every N seconds instead of running once")
+
+    def handle(self, *args, **options):
+        while True:
+            removed = purge_expired_tokens(options['batch_size'])
+            self.stdout.write(f"Removed {removed} expired tokens.")
+            if not options['every']:
+                return
+            time.sleep(options['every'])
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from employee.models import LeaveRequest, LeaveSummary
+from employee.summaries import rebuild_leave_summaries
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-user, per-year leave summaries from the leave requests"
+
+    def handle(self, *args, **options):
+        written = rebuild_leave_summaries(LeaveRequest, LeaveSummary)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} leave summary rows."))
@@ -0,0 +1,53 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from employee.balance_reset import ALLOWANCES, CARRY_FORWARD, YearlyReset
+
+
+class Command(BaseCommand):
+    help = (
+        "Open a year's leave balances: every profile gets the yearly allowance (LEAVE_ALLOWANCES) "
+        "plus its unused days up to the carry-forward limit (LEAVE_CARRY_FORWARD), with a "
+        "'reset' ledger entry per change. Profiles are updated in chunks with set-based "
+        "statements; an interrupted run continues where it stopped when started again, and a "
+        "year that was reset is left alone. --dry-run only reports what would change."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help="Year being opened (this year by default)")
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be positive.")
+        year = options['year'] or timezone.localdate().year
+        reset = YearlyReset(year, chunk_size=options['chunk_size'])
+        self.stdout.write(f"Allowances {ALLOWANCES}, carry-forward limits {CARRY_FORWARD}.")
+
+        if options['dry_run']:
+            preview = reset.preview()
+            self.stdout.write(f"{preview['profiles']} profiles left to reset for {year}.")
+            for leave_type, days in preview['leave_types'].items():
+                self.stdout.write(
+                    f"  {leave_type}: {days['before']} days held -> {days['after']} after the reset, "
+                    f"{days['forfeited']} lapse"
+                )
+            return
+
+        progress = reset.progress()
+        if progress is not None and progress.finished_at:
+            self.stdout.write(f"Balances for {year} were reset at {progress.finished_at:%Y-%m-%d %H:%M}.")
+            return
+        if progress is not None:
+            self.stdout.write(f"Resuming after user {progress.last_user_id} ({progress.profiles} profiles done).")
+
+        def report(progress):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {progress.profiles} profiles, up to user {progress.last_user_id}")
+
+        start = time.perf_counter()
+        progress = reset.run(progress_callback=report)
+        self.stdout.write(self.style.SUCCESS(
+            f"Reset {progress.profiles} profiles for {year} in {time.perf_counter() - start:.1f} s."
+        ))
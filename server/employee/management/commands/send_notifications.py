@@ -0,0 +1,24 @@
+import time
+from django.core.management.base import BaseCommand
+from employee.outbox import drain_outbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Send the queued leave status notifications through the email backend, "
+        "retrying failures with exponential backoff (OUTBOX_RETRY_DELAY, OUTBOX_MAX_ATTEMPTS). "
+        "Run from cron, or keep it running with --every."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--every', type=float, help="repeat every N seconds instead of running once")
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = drain_outbox(options['batch_size'])
+            if sent or failed or not options['every']:
+                self.stdout.write(f"Sent {sent} notifications, {failed} failed attempts.")
+            if not options['every']:
+                return
+            time.sleep(options['every'])
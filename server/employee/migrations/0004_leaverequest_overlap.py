@@ -0,0 +1,43 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def add_overlap_constraint(apps, schema_editor):
+    """
+    On PostgreSQL let the database refuse overlapping active leaves of the
+    same user with a GiST exclusion constraint over the date range. Other
+    backends rely on the range check done in LeaveRequestSerializer.validate.
+    Existing overlapping rows have to be resolved before this can apply.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    schema_editor.execute(
+        'ALTER TABLE employee_leaverequest ADD CONSTRAINT leave_no_overlap '
+        "EXCLUDE USING gist (user_id WITH =, tstzrange(start_date, end_date, '[]') WITH &&) "
+        "WHERE (status <> 'rejected')"
+    )
+
+
+def drop_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('ALTER TABLE employee_leaverequest DROP CONSTRAINT IF EXISTS leave_no_overlap')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0003_leaverequest_feed_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(condition=models.Q(('status', 'rejected'), _negated=True), fields=['user', 'start_date', 'end_date'], name='leave_active_user_start_idx'),
+        ),
+        migrations.RunPython(add_overlap_constraint, drop_overlap_constraint),
+    ]
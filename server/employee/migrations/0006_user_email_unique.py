@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    employee.models marks auth.User.email as unique at import time, which
+    only affects validation. Back it with a real index on auth_user so email
+    logins are an index lookup and duplicates can't slip in. Blank emails
+    (e.g. from createsuperuser) stay allowed.
+    """
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('employee', '0005_leavebalanceentry'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE UNIQUE INDEX employee_user_email_uniq ON auth_user (email) WHERE email <> ''",
+            "DROP INDEX employee_user_email_uniq",
+        ),
+    ]
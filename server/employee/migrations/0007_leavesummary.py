@@ -0,0 +1,62 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import ExtractYear
+
+
+def build_summaries(apps, schema_editor):
+    """
+    Fill LeaveSummary from the leaves with one GROUP BY. A copy of
+    employee.summaries.rebuild_leave_summaries as of this migration, so
+    later changes to that module can't change what it does.
+    """
+    LeaveRequest = apps.get_model('employee', 'LeaveRequest')
+    LeaveSummary = apps.get_model('employee', 'LeaveSummary')
+    totals = {}
+    rows = (
+        LeaveRequest.objects
+        .annotate(year=ExtractYear('start_date'))
+        .values('user_id', 'year', 'leave_type', 'status')
+        .annotate(days=Sum('no_days'))
+        .order_by()
+    )
+    for row in rows:
+        key = (row['user_id'], row['year'], row['leave_type'])
+        totals.setdefault(key, {})[f"{row['status']}_days"] = row['days']
+    LeaveSummary.objects.bulk_create(
+        [
+            LeaveSummary(user_id=user_id, year=year, leave_type=leave_type, **days)
+            for (user_id, year, leave_type), days in totals.items()
+        ],
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0006_user_email_unique'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('leave_type', models.CharField(choices=[('casual', 'Casual Leave'), ('sick', 'Sick Leave'), ('other', 'Other Leave')], max_length=10)),
+                ('pending_days', models.IntegerField(default=0)),
+                ('approved_days', models.IntegerField(default=0)),
+                ('rejected_days', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'year', 'leave_type'), name='leave_summary_unique')],
+            },
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
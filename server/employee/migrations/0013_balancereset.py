@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:37
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0012_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceReset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField(unique=True)),
+                ('last_user_id', models.BigIntegerField(default=0)),
+                ('profiles', models.PositiveIntegerField(default=0)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='leavebalanceentry',
+            name='reason',
+            field=models.CharField(choices=[('approval', 'Leave approved'), ('reversal', 'Approval reverted'), ('adjustment', 'Manual adjustment'), ('reset', 'Yearly reset')], max_length=10),
+        ),
+    ]
@@ -1,11 +1,28 @@
-from django.db import models
+from collections import defaultdict
+from django.conf import settings
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import ExpressionWrapper, F, Value
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from datetime import timedelta
+from .working_days import working_days
 
 User = get_user_model()
 User._meta.get_field('email')._unique = True
+
+
+class Team(models.Model):
+    """ A team or department; caps how many members may be on approved leave on the same day """
+    name = models.CharField(max_length=100, unique=True)
+    max_absent = models.PositiveIntegerField(
+        null=True, blank=True, help_text="Most members on approved leave on any one day; empty for no limit.",
+    )
+
+    def __str__(self):
+        return self.name
+
+
 class Profile(models.Model):
     ROLE_CHOICES = (
         ('employee', 'Employee'),
@@ -16,10 +33,60 @@ class Profile(models.Model):
     role = models.CharField(max_length=10, choices=ROLE_CHOICES)
     casual_leave_balance = models.IntegerField(default=10)
     sick_leave_balance = models.IntegerField(default=10)
+    team = models.ForeignKey(Team, on_delete=models.SET_NULL, null=True, blank=True, related_name='members')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+        }
+
+    def get_changed_fields(self):
+        """
+        Names of the fields changed in memory since the profile was loaded or
+        last saved, or None if it was never loaded or saved.
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return None
+        return [name for name, value in loaded.items() if getattr(self, name) != value]
 
     def __str__(self):
         return f'Profile of {self.user.email}'
 
+class LeaveRequestQuerySet(models.QuerySet):
+    def active(self):
+        """ Leaves that hold their dates, i.e. everything but rejected ones """
+        return self.exclude(status='rejected')
+
+    def has_overlap(self, user, start_date, end_date, exclude_id=None):
+        """
+        Check whether any active leave of user touches [start_date, end_date].
+        On PostgreSQL the exclusion constraint guarantees active leaves of one
+        user never overlap each other, so they are ordered by end date as well
+        as start date: only the last one starting on or before end_date can
+        reach into the range, a single descending seek on the partial (user,
+        start_date) index. Elsewhere nothing enforces that (rows written
+        before the check existed, or by bulk inserts), so both bounds are
+        tested on that index, which also holds end_date.
+        """
+        leaves = self.active().filter(user=user, start_date__lte=end_date)
+        if exclude_id is not None:
+            leaves = leaves.exclude(id=exclude_id)
+        if connections[self.db].vendor != 'postgresql':
+            return leaves.filter(end_date__gte=start_date).exists()
+        latest_end = leaves.order_by('-start_date').values_list('end_date', flat=True).first()
+        return latest_end is not None and latest_end >= start_date
+
+
 class LeaveRequest(models.Model):
     LEAVE_TYPE_CHOICES = (
         ('casual', 'Casual Leave'),
@@ -41,15 +108,291 @@ class LeaveRequest(models.Model):
     reason = models.TextField()
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', db_index=True)
     reason_not_approved = models.TextField(null=True, blank=True)
+    # when the request was made and when it was last approved or rejected,
+    # for approval latency reports; null on rows older than these columns.
+    # decision_latency is decided_at - created_at, stored so reports can
+    # aggregate it without datetime arithmetic per row
+    created_at = models.DateTimeField(auto_now_add=True, null=True)
+    decided_at = models.DateTimeField(null=True, blank=True)
+    decision_latency = models.DurationField(null=True, blank=True)
+
+    objects = LeaveRequestQuerySet.as_manager()
+
+    # name of the PostgreSQL exclusion constraint that rejects overlapping
+    # active leaves of the same user (see migration 0004)
+    OVERLAP_CONSTRAINT = 'leave_no_overlap'
+    # longest leave accepted through the API, in calendar days; month views
+    # look this far back for leaves still running
+    MAX_SPAN_DAYS = getattr(settings, 'LEAVE_MAX_SPAN_DAYS', 366)
+
+    class Meta:
+        # composite indexes backing the admin leave feed: every filter is
+        # followed by the (start_date, id) cursor ordering
+        indexes = [
+            models.Index(fields=['start_date', 'id'], name='leave_start_id_idx'),
+            models.Index(fields=['status', 'start_date', 'id'], name='leave_status_start_idx'),
+            models.Index(fields=['leave_type', 'start_date', 'id'], name='leave_type_start_idx'),
+            models.Index(fields=['user', 'start_date', 'id'], name='leave_user_start_idx'),
+            models.Index(
+                fields=['user', 'start_date', 'end_date'],
+                condition=~models.Q(status='rejected'),
+                name='leave_active_user_start_idx',
+            ),
+            # team coverage checks: approved leaves still running at a date
+            models.Index(fields=['end_date'], condition=models.Q(status='approved'), name='leave_approved_end_idx'),
+        ]
 
     def clean(self):
         if self.start_date > self.end_date:
             raise ValidationError("End date cannot be before start date.")
 
+    # fields that decide which LeaveSummary row a leave counts towards
+    SUMMARY_FIELDS = ('user_id', 'start_date', 'leave_type', 'status', 'no_days')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._summary_state = instance.get_summary_state()
+        instance._loaded_dates = (instance.__dict__.get('start_date'), instance.__dict__.get('end_date'))
+        return instance
+
+    def get_summary_state(self):
+        """ (user_id, year, leave_type, status, no_days), or None if some are deferred """
+        deferred = self.get_deferred_fields()
+        if any(field in deferred for field in ('user', 'start_date', 'leave_type', 'status', 'no_days')):
+            return None
+        return (self.user_id, timezone.localtime(self.start_date).year, self.leave_type, self.status, self.no_days)
+
     def save(self, *args, **kwargs):
-        delta = self.end_date - self.start_date
-        self.no_days = delta.days + 1
-        super().save(*args, **kwargs)
+        previous = getattr(self, '_summary_state', None)
+        loaded_dates = getattr(self, '_loaded_dates', None)
+        if (previous is None or loaded_dates is None) and not self._state.adding:
+            row = LeaveRequest.objects.filter(pk=self.pk).values_list(*self.SUMMARY_FIELDS, 'end_date').first()
+            if row:
+                user_id, start_date, leave_type, leave_status, no_days, end_date = row
+                previous = (user_id, timezone.localtime(start_date).year, leave_type, leave_status, no_days)
+                loaded_dates = (start_date, end_date)
+
+        # counted when the dates are set: a holiday added or a change of
+        # working weekdays later doesn't alter what was requested (and paid)
+        if self._state.adding or loaded_dates != (self.start_date, self.end_date):
+            self.no_days = working_days(self.start_date, self.end_date)
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'no_days'}
+
+        if previous is None or previous[3] != self.status:
+            self.decided_at = self.decision_time(self.status)
+            created_at = self.created_at or self.decided_at
+            self.decision_latency = self.decided_at and created_at and self.decided_at - created_at
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'decided_at', 'decision_latency'}
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            current = self.get_summary_state()
+            LeaveSummary.apply_change(previous, current)
+        self._summary_state = current
+        self._loaded_dates = (self.start_date, self.end_date)
+
+    @staticmethod
+    def decision_time(status):
+        """ decided_at for a leave that just moved to status """
+        return None if status == 'pending' else timezone.now()
+
+    @classmethod
+    def decision_fields(cls, status):
+        """ decided_at and decision_latency for a queryset update() moving leaves to status """
+        decided_at = cls.decision_time(status)
+        return {
+            'decided_at': decided_at,
+            'decision_latency': None if decided_at is None else ExpressionWrapper(
+                Value(decided_at) - F('created_at'), output_field=models.DurationField(),
+            ),
+        }
+
+    def __str__(self):
+        return f'{self.user.email} - {self.leave_type} Leave ({self.status})'
+
+
+class LeaveSummary(models.Model):
+    """
+    Days of leave per user, year (of the start date) and leave type, split
+    by status. Kept up to date incrementally by LeaveRequest.save(), the
+    post_delete signal and bulk status changes; `manage.py
+    rebuild_leave_summaries` recomputes it from scratch.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='leave_summaries')
+    year = models.IntegerField()
+    leave_type = models.CharField(max_length=10, choices=LeaveRequest.LEAVE_TYPE_CHOICES)
+    pending_days = models.IntegerField(default=0)
+    approved_days = models.IntegerField(default=0)
+    rejected_days = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'year', 'leave_type'], name='leave_summary_unique'),
+        ]
+
+    @classmethod
+    def apply_change(cls, previous, current):
+        """ Move a leave's days from its previous summary state to its current one """
+        deltas = defaultdict(lambda: defaultdict(int))
+        for state, sign in ((previous, -1), (current, 1)):
+            if state is not None:
+                user_id, year, leave_type, leave_status, no_days = state
+                deltas[(user_id, year, leave_type)][leave_status] += sign * no_days
+        cls.apply_deltas(deltas)
+
+    @classmethod
+    def apply_deltas(cls, deltas):
+        """
+        deltas maps (user_id, year, leave_type) to {status: days}. Rows are
+        changed with F() updates so concurrent writers don't lose counts.
+        """
+        for (user_id, year, leave_type), by_status in deltas.items():
+            changes = {
+                f'{leave_status}_days': F(f'{leave_status}_days') + days
+                for leave_status, days in by_status.items() if days
+            }
+            if not changes:
+                continue
+            rows = cls.objects.filter(user_id=user_id, year=year, leave_type=leave_type)
+            # nothing to take away from a row that doesn't exist (e.g. it was
+            # cascade-deleted together with the user)
+            if rows.update(**changes) or all(days <= 0 for days in by_status.values()):
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(user_id=user_id, year=year, leave_type=leave_type, **{
+                        f'{leave_status}_days': days for leave_status, days in by_status.items()
+                    })
+            except IntegrityError:
+                # created concurrently in the meantime
+                rows.update(**changes)
+
+    def as_dict(self):
+        return {
+            'pending': self.pending_days,
+            'approved': self.approved_days,
+            'rejected': self.rejected_days,
+        }
+
+    def __str__(self):
+        return f'{self.user_id} {self.year} {self.leave_type}'
+
+
+class LeaveBalanceEntry(models.Model):
+    """
+    Append-only ledger of balance changes. Profile balances are the running
+    total of these entries; balance_after records it at the time of writing.
+    """
+    REASON_CHOICES = (
+        ('approval', 'Leave approved'),
+        ('reversal', 'Approval reverted'),
+        ('adjustment', 'Manual adjustment'),
+        ('reset', 'Yearly reset'),
+    )
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='balance_entries')
+    leave = models.ForeignKey(LeaveRequest, on_delete=models.SET_NULL, null=True, blank=True, related_name='balance_entries')
+    leave_type = models.CharField(max_length=10, choices=LeaveRequest.LEAVE_TYPE_CHOICES)
+    delta = models.IntegerField()
+    balance_after = models.IntegerField()
+    reason = models.CharField(max_length=10, choices=REASON_CHOICES)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='balance_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} {self.leave_type} {self.delta:+d} -> {self.balance_after}'
+
+
+
+class BalanceReset(models.Model):
+    """
+    Progress of the yearly balance reset (`manage.py reset_balances`) for
+    one year: profiles up to last_user_id are done, so an interrupted run
+    carries on from there and a finished year is never reset twice.
+    """
+    year = models.PositiveIntegerField(unique=True)
+    last_user_id = models.BigIntegerField(default=0)
+    profiles = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        state = 'done' if self.finished_at else f'at user {self.last_user_id}'
+        return f'{self.year} reset {state}'
+
+
+class Revision(models.Model):
+    """
+    Monotonic change counters used as cheap version stamps for conditional
+    GETs: 'user:<id>' moves whenever that user, their profile or their
+    leaves change, 'users' whenever any of them does.
+    """
+    key = models.CharField(max_length=64, primary_key=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    @classmethod
+    def bump(cls, keys):
+        keys = set(keys)
+        changes = {'value': F('value') + 1, 'updated_at': timezone.now()}
+        if cls.objects.filter(key__in=keys).update(**changes) < len(keys):
+            # first change for some key: create it, then bump again (existing
+            # ones moving twice is harmless, missing a bump is not)
+            cls.objects.bulk_create([cls(key=key) for key in keys], ignore_conflicts=True)
+            cls.objects.filter(key__in=keys).update(**changes)
+
+    def __str__(self):
+        return f'{self.key}@{self.value}'
+
+
+class Holiday(models.Model):
+    """ Non-working day; leave days falling on one are not counted or deducted """
+    date = models.DateField(unique=True)
+    name = models.CharField(max_length=100)
+
+    class Meta:
+        ordering = ['date']
+
+    def __str__(self):
+        return f'{self.date} {self.name}'
+
+
+class OutboxMessage(models.Model):
+    """
+    Email written in the same transaction as the change it reports, so it
+    exists exactly when the change was committed. `manage.py
+    send_notifications` delivers it later, off the request path.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    leave = models.ForeignKey(LeaveRequest, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # the worker's queue: only undelivered rows are indexed
+            models.Index(fields=['next_attempt_at', 'id'], condition=models.Q(status='pending'), name='outbox_pending_idx'),
+        ]
 
     def __str__(self):
-        return f'{self.user.email} - {self.leave_type} Leave ({self.status})'
\ No newline at end of file
+        return f'{self.status} to {self.user_id}: {self.subject}'
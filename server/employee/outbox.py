@@ -0,0 +1,137 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+from .models import OutboxMessage
+from .working_days import as_date
+
+# deliveries tried before a message is given up on as failed
+MAX_ATTEMPTS = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 5)
+# seconds before the first retry; doubled after every failed attempt
+RETRY_DELAY = getattr(settings, 'OUTBOX_RETRY_DELAY', 60)
+MAX_RETRY_DELAY = 6 * 60 * 60
+# seconds a claimed message is left to its worker before it is due again;
+# longer than a batch can take to send (EMAIL_TIMEOUT per message)
+LEASE = getattr(settings, 'OUTBOX_LEASE', 15 * 60)
+MAX_ERROR_LENGTH = 1000
+
+# statuses employees are told about
+NOTIFIED_STATUSES = ('approved', 'rejected')
+
+
+def status_message(leave):
+    """ Unsaved outbox message telling the leave's owner about its status """
+    subject = f"Your {leave.leave_type} leave request was {leave.status}"
+    lines = [
+        f"Your {leave.leave_type} leave request from {as_date(leave.start_date).isoformat()} "
+        f"to {as_date(leave.end_date).isoformat()} ({leave.no_days} days) was {leave.status}.",
+    ]
+    if leave.status == 'rejected' and leave.reason_not_approved:
+        lines.append(f"Reason: {leave.reason_not_approved}")
+    return OutboxMessage(user_id=leave.user_id, leave=leave, subject=subject, body='\n\n'.join(lines) + '\n')
+
+
+def notify_status_changes(leaves):
+    """
+    Queue a notification for each leave that is now approved or rejected,
+    with a single INSERT. Call it inside the transaction changing the
+    status: rolled back together, committed together.
+    """
+    messages = [status_message(leave) for leave in leaves if leave.status in NOTIFIED_STATUSES]
+    if messages:
+        OutboxMessage.objects.bulk_create(messages)
+    return len(messages)
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY))
+
+
+def claim_batch(batch_size=100, now=None):
+    """
+    Take up to batch_size due messages for delivery, in a short
+    transaction of its own: each counts an attempt and is leased, i.e. not
+    due again, for LEASE seconds. A worker that dies while sending leaves
+    its messages to be picked up once the lease runs out. Rows locked by
+    another worker's claim are skipped (on databases with SKIP LOCKED).
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True, of=('self',))
+            .filter(status='pending', next_attempt_at__lte=now)
+            .select_related('user')
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        for message in messages:
+            message.attempts += 1
+            message.next_attempt_at = now + timedelta(seconds=LEASE)
+        OutboxMessage.objects.bulk_update(messages, ['attempts', 'next_attempt_at'])
+    return messages
+
+
+def deliver_batch(batch_size=100, connection=None):
+    """
+    Send up to batch_size due messages through the email backend over one
+    connection and record the outcome: sent, retried later with
+    exponential backoff, or failed after MAX_ATTEMPTS. No transaction is
+    open while sending: on SQLite, whose transactions take the database
+    write lock, leave requests would otherwise wait for the mail server.
+    Returns (sent, failed attempts).
+    """
+    messages = claim_batch(batch_size)
+    if not messages:
+        return 0, 0
+
+    sent = failed = 0
+    now = timezone.now()
+    connection = connection or get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        # the backend is down: every message of the batch waits its turn again
+        for message in messages:
+            _record_failure(message, e, now)
+        failed = len(messages)
+    else:
+        try:
+            for message in messages:
+                try:
+                    if not message.user.email:
+                        raise ValueError("user has no email address")
+                    EmailMessage(
+                        message.subject, message.body, settings.DEFAULT_FROM_EMAIL, [message.user.email],
+                        connection=connection,
+                    ).send()
+                except Exception as e:
+                    _record_failure(message, e, now)
+                    failed += 1
+                else:
+                    message.status, message.sent_at = 'sent', timezone.now()
+                    sent += 1
+        finally:
+            connection.close()
+
+    OutboxMessage.objects.bulk_update(messages, ['status', 'next_attempt_at', 'last_error', 'sent_at'])
+    return sent, failed
+
+
+def _record_failure(message, error, now):
+    """ The attempt was counted when the message was claimed """
+    message.last_error = f'{type(error).__name__}: {error}'[:MAX_ERROR_LENGTH]
+    if message.attempts >= MAX_ATTEMPTS:
+        message.status = 'failed'
+    else:
+        message.next_attempt_at = now + retry_delay(message.attempts)
+
+
+def drain_outbox(batch_size=100):
+    """ Deliver batches until nothing is due; returns (sent, failed attempts) """
+    sent = failed = 0
+    while True:
+        batch_sent, batch_failed = deliver_batch(batch_size)
+        sent, failed = sent + batch_sent, failed + batch_failed
+        # failed messages are rescheduled, so a short batch means the queue is empty
+        if batch_sent + batch_failed < batch_size:
+            return sent, failed
@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, identify_hasher, is_password_usable, make_password
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+
+# where login password checks run: 'thread' or 'process' pool, or 'inline'
+# in the request thread; hashlib's PBKDF2 releases the GIL, so threads
+# already hash in parallel, processes are for pure-Python hashers
+EXECUTOR = getattr(settings, 'PASSWORD_HASH_EXECUTOR', 'thread')
+WORKERS = getattr(settings, 'PASSWORD_HASH_WORKERS', None) or os.cpu_count()
+# checks allowed to wait for a free worker before logins get a 429
+MAX_QUEUE = getattr(settings, 'PASSWORD_HASH_MAX_QUEUE', 2 * WORKERS)
+RETRY_AFTER = getattr(settings, 'PASSWORD_HASH_RETRY_AFTER', 1)
+
+
+class LoginThrottled(exceptions.Throttled):
+    default_detail = _('Too many logins in progress, try again shortly.')
+
+
+def init_worker():
+    # spawned workers (non-fork platforms) start without Django configured
+    if not settings.configured:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'leave_app.settings')
+        django.setup()
+
+
+def _verify(password, encoded):
+    """
+    The hashing half of django.contrib.auth.hashers.check_password():
+    returns (correct, must_update) without calling a setter, so it can run
+    in another process.
+    """
+    preferred = get_hasher('default')
+    hasher = identify_hasher(encoded)
+    hasher_changed = hasher.algorithm != preferred.algorithm
+    must_update = hasher_changed or preferred.must_update(encoded)
+    correct = hasher.verify(password, encoded)
+    if not correct and not hasher_changed and must_update:
+        hasher.harden_runtime(password, encoded)
+    return correct, must_update
+
+
+class HashPool:
+    """
+    Bounded executor for password hashing. At most WORKERS hashes run at
+    once and MAX_QUEUE more may wait; beyond that run() fails at once with
+    LoginThrottled instead of tying up the request worker. Keeps timing and
+    saturation counters for monitoring.
+    """
+
+    def __init__(self, executor=EXECUTOR, workers=WORKERS, max_queue=MAX_QUEUE):
+        self.executor = executor
+        self.workers = workers
+        self.max_queue = max_queue
+        self.lock = threading.Lock()
+        self.pool = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self.lock:
+            self.in_flight = 0
+            self.peak_in_flight = 0
+            self.hashes = 0
+            self.rejected = 0
+            self.total_time = 0.0
+            self.max_time = 0.0
+
+    def _get_pool(self):
+        if self.pool is None:
+            if self.executor == 'process':
+                self.pool = ProcessPoolExecutor(self.workers, initializer=init_worker)
+            else:
+                self.pool = ThreadPoolExecutor(self.workers, thread_name_prefix='password-hash')
+        return self.pool
+
+    def run(self, func, *args):
+        with self.lock:
+            if self.in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise LoginThrottled(wait=RETRY_AFTER)
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            pool = None if self.executor == 'inline' else self._get_pool()
+        start = time.perf_counter()
+        try:
+            return func(*args) if pool is None else pool.submit(func, *args).result()
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.in_flight -= 1
+                self.hashes += 1
+                self.total_time += elapsed
+                self.max_time = max(self.max_time, elapsed)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'executor': self.executor,
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+                'hashes': self.hashes,
+                'rejected': self.rejected,
+                'avg_hash_ms': round(self.total_time / self.hashes * 1000, 2) if self.hashes else None,
+                'max_hash_ms': round(self.max_time * 1000, 2),
+            }
+
+
+hash_pool = HashPool()
+
+
+def check_user_password(user, password):
+    """
+    user.check_password() with the hashing done in hash_pool. A correct
+    password stored with an outdated hasher (or iteration count) is
+    re-hashed with the preferred one, also in the pool, and saved.
+    """
+    if password is None or not is_password_usable(user.password):
+        return False
+    try:
+        correct, must_update = hash_pool.run(_verify, password, user.password)
+    except ValueError:
+        # unknown hasher
+        return False
+    if correct and must_update:
+        user.password = hash_pool.run(make_password, password)
+        user.save(update_fields=['password'])
+    return correct
+
+
+def hash_unknown_user_password(password):
+    """
+    Hash password and throw it away, like ModelBackend does for unknown
+    users so they take as long to refuse as wrong passwords; in hash_pool,
+    so failed logins are bounded by it too.
+    """
+    hash_pool.run(make_password, password)
@@ -0,0 +1,46 @@
+from functools import lru_cache
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+
+def _plan(serializer, model, prefix=''):
+    """
+    Walk the readable fields of a serializer and collect the relations to
+    join and the columns to load for them.
+    """
+    related, columns = [], []
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*' or '.' in field.source:
+            continue
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            # method fields, properties... can't be planned, load everything
+            return None
+
+        path = prefix + field.source
+        if isinstance(field, serializers.ModelSerializer):
+            if not (model_field.many_to_one or model_field.one_to_one) or model_field.auto_created:
+                return None
+            nested = _plan(field, model_field.related_model, path + '__')
+            if nested is None:
+                return None
+            related.append(path)
+            related.extend(nested[0])
+            columns.extend(nested[1])
+        elif model_field.concrete:
+            columns.append(path)
+        else:
+            return None
+    return related, columns
+
+
+@lru_cache(maxsize=None)
+def get_query_plan(serializer_class):
+    """
+    Return the (select_related, only) arguments for a ModelSerializer,
+    or None when its fields can't be mapped onto plain model columns.
+    """
+    serializer = serializer_class()
+    return _plan(serializer, serializer.Meta.model)
+
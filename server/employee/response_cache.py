@@ -0,0 +1,71 @@
+import functools
+import threading
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+from .revisions import revision_stamp
+
+# which CACHES alias holds cached responses; any Django backend works
+# (locmem, file based, redis), size bounds come from its MAX_ENTRIES
+CACHE_ALIAS = getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')
+CACHE_TTL = getattr(settings, 'RESPONSE_CACHE_TTL', 300)
+
+
+class CacheStats:
+    """ Hit/miss counters of this process, for monitoring """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def as_dict(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else None,
+            }
+
+
+response_cache_stats = CacheStats()
+
+
+def response_cache_key(stamp):
+    return f'response:{stamp}'
+
+
+def cached_response(key_func):
+    """
+    Decorate an APIView GET handler so its response data is cached under
+    the revision stamp of key_func(request). Writes bump that revision, so
+    a changed resource is looked up under a new key and stale entries are
+    never served; they just age out of the backend's LRU.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            cache = caches[CACHE_ALIAS]
+            key = response_cache_key(revision_stamp(request, key_func(request)))
+            data = cache.get(key)
+            response_cache_stats.record(data is not None)
+            if data is not None:
+                return Response(data, status=status.HTTP_200_OK)
+            response = handler(view, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(key, response.data, CACHE_TTL)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,88 @@
+import hashlib
+from django.db import transaction
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_headers
+from .models import Revision
+
+ALL_USERS = 'users'
+
+
+def user_key(user_id):
+    return f'user:{user_id}'
+
+
+def bump_users(user_ids):
+    """ Record a change to these users' data (user, profile, leaves) """
+    Revision.bump([user_key(user_id) for user_id in user_ids])
+    bump_all_users()
+
+
+def _bump_all_users():
+    Revision.bump([ALL_USERS])
+
+
+def bump_all_users():
+    """
+    Move ALL_USERS once the current transaction commits. Every write touches
+    that one row: bumped inside the transaction, its lock would serialize
+    all writers until they commit. Readers can't see the change before the
+    commit, so nothing is cached under a stamp that outlives it.
+    """
+    transaction.on_commit(_bump_all_users)
+
+
+def _revision(request, key):
+    # etag and last_modified are computed separately; read the row once
+    revisions = request.__dict__.setdefault('_revisions', {})
+    if key not in revisions:
+        revisions[key] = Revision.objects.filter(key=key).values_list('value', 'updated_at').first() or (0, None)
+    return revisions[key]
+
+
+async def _arevision(request, key):
+    revisions = request.__dict__.setdefault('_revisions', {})
+    if key not in revisions:
+        revisions[key] = await Revision.objects.filter(key=key).values_list('value', 'updated_at').afirst() or (0, None)
+    return revisions[key]
+
+
+def revision_stamp(request, key):
+    """
+    Digest identifying one version of the response to this request: the
+    URL (the same path can render different absolute links per host), the
+    current year that summaries default to, and the revision of key. The
+    bump time is included so a restored database can't reuse old stamps.
+    """
+    return _stamp(request, key, *_revision(request, key))
+
+
+async def arevision_stamp(request, key):
+    """ Async version of revision_stamp, also returning the last change time """
+    value, updated_at = await _arevision(request, key)
+    return _stamp(request, key, value, updated_at), updated_at
+
+
+def _stamp(request, key, value, updated_at):
+    stamp = f'{request.build_absolute_uri()}|{timezone.localdate().year}|{key}|{value}|{updated_at}'
+    return hashlib.blake2b(stamp.encode(), digest_size=12).hexdigest()
+
+
+def conditional_on(key_func):
+    """
+    Decorate an APIView GET handler so it answers If-None-Match /
+    If-Modified-Since with 304 before doing any work. key_func(request)
+    names the Revision the response depends on.
+    """
+    def etag(request, *args, **kwargs):
+        return f'"{revision_stamp(request, key_func(request))}"'
+
+    def last_modified(request, *args, **kwargs):
+        return _revision(request, key_func(request))[1]
+
+    def decorator(handler):
+        handler = method_decorator(condition(etag_func=etag, last_modified_func=last_modified))(handler)
+        return method_decorator(vary_on_headers('Authorization'))(handler)
+
+    return decorator
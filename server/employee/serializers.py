@@ -1,12 +1,20 @@
+from contextlib import contextmanager
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from django.db import IntegrityError, transaction
 from django.utils import timezone
+from .instrumentation import TimedSerializerMixin
 from .models import Profile, LeaveRequest
+from .team_coverage import team_full_day
+from .token_blacklist import FastBlacklistRefreshToken
+from .working_days import working_days
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = FastBlacklistRefreshToken
+
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
@@ -18,7 +26,7 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
 
         return token
     
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True)
     class Meta:
         model = User
@@ -32,7 +40,7 @@ class UserSerializer(serializers.ModelSerializer):
         user.save()
         return user
 
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     
     class Meta:
@@ -40,7 +48,12 @@ class ProfileSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'role', 'casual_leave_balance', 'sick_leave_balance']
         read_only_fields = ['id', 'user']
 
-class LeaveRequestSerializer(serializers.ModelSerializer):
+OVERLAP_ERROR = {
+    "start_date": "You have already taken leave on these dates.",
+    "end_date": "You have already taken leave on these dates."
+}
+
+class LeaveRequestSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     
     class Meta:
@@ -54,12 +67,15 @@ class LeaveRequestSerializer(serializers.ModelSerializer):
     def validate(self, data):
         """
         Custom validation for:
-        1. Ensure start_date and end_date are not in the past.
+        1. Ensure start_date and end_date are not in the past and the leave
+           is at most LeaveRequest.MAX_SPAN_DAYS long.
         2. Check if the user has already taken leave on the applied dates.
-        3. Check if the user has sufficient leave balance for casual/sick leave.
+        3. Check that the user's team isn't already at its absence cap.
+        4. Check if the user has sufficient leave balance for casual/sick leave.
         """
         current_date = timezone.now().date()
-        user = self.context['request'].user
+        # checks apply to the owner of the leave, not to the admin updating it
+        user = self.instance.user if self.instance else self.context['request'].user
         profile = user.profile
 
         start_date = data['start_date'].date()
@@ -72,22 +88,37 @@ class LeaveRequestSerializer(serializers.ModelSerializer):
                 "end_date": "Leave dates cannot be in the past."
             })
 
-        # 2. Check if the user has already taken leave on the applied dates
-        overlapping_leaves = LeaveRequest.objects.filter(
-            user=user,
-            start_date__lte=data['end_date'],
-            end_date__gte=data['start_date'],
-        ).exclude(id=self.instance.id if self.instance else None ).exclude(status='rejected')
-
-        if overlapping_leaves.exists():
+        if (end_date - start_date).days + 1 > LeaveRequest.MAX_SPAN_DAYS:
             raise serializers.ValidationError({
-                "start_date": "You have already taken leave on these dates.",
-                "end_date": "You have already taken leave on these dates."
+                "end_date": f"A leave can't be longer than {LeaveRequest.MAX_SPAN_DAYS} days."
             })
 
-        # 3. Check leave balance for casual and sick leaves
+        # 2. Check if the user has already taken leave on the applied dates
+        if data.get('status') != 'rejected' and LeaveRequest.objects.has_overlap(
+            user, data['start_date'], data['end_date'],
+            exclude_id=self.instance.id if self.instance else None,
+        ):
+            raise serializers.ValidationError(OVERLAP_ERROR)
+
+        # 3. Check the team's cap on members on approved leave at once
+        new_status = data.get('status', self.instance.status if self.instance else 'pending')
+        if new_status != 'rejected' and profile.team_id is not None:
+            full_day = team_full_day(
+                profile.team_id, data['start_date'], data['end_date'],
+                exclude_id=self.instance.id if self.instance else None,
+            )
+            if full_day is not None:
+                raise serializers.ValidationError({
+                    "start_date": f"Too many of the team are already on leave on {full_day.isoformat()}."
+                })
+
+        # 4. Check leave balance for casual and sick leaves, in working days
         leave_type = data['leave_type']
-        no_days = (data['end_date'] - data['start_date']).days + 1
+        no_days = working_days(data['start_date'], data['end_date'])
+        if no_days == 0:
+            raise serializers.ValidationError({
+                "end_date": "Leave must include at least one working day."
+            })
 
         if leave_type == 'casual' and profile.casual_leave_balance < no_days:
             raise serializers.ValidationError({
@@ -102,20 +133,25 @@ class LeaveRequestSerializer(serializers.ModelSerializer):
         return data
 
     def create(self, validated_data):
-        """
-        Automatically calculate no_days when creating a new LeaveRequest.
-        """
-        delta = validated_data['end_date'] - validated_data['start_date']
-        validated_data['no_days'] = delta.days + 1
-        return super().create(validated_data)
+        """ no_days is computed by LeaveRequest.save() """
+        with self._overlap_guard():
+            return super().create(validated_data)
 
     def update(self, instance, validated_data):
+        with self._overlap_guard():
+            return super().update(instance, validated_data)
+
+    @staticmethod
+    @contextmanager
+    def _overlap_guard():
         """
-        Automatically calculate no_days when updating a LeaveRequest.
+        The exclusion constraint on PostgreSQL closes the window between the
+        overlap check in validate() and the write; report it the same way.
         """
-        if 'start_date' in validated_data or 'end_date' in validated_data:
-            start_date = validated_data.get('start_date', instance.start_date)
-            end_date = validated_data.get('end_date', instance.end_date)
-            delta = end_date - start_date
-            validated_data['no_days'] = delta.days + 1
-        return super().update(instance, validated_data)
\ No newline at end of file
+        try:
+            with transaction.atomic():
+                yield
+        except IntegrityError as e:
+            if LeaveRequest.OVERLAP_CONSTRAINT in str(e):
+                raise serializers.ValidationError(OVERLAP_ERROR)
+            raise
\ No newline at end of file
@@ -1,7 +1,11 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from .models import Profile
+from .models import Holiday, LeaveRequest, LeaveSummary, Profile, Revision
+from .revisions import bump_users
+from .user_cache import invalidate_user
+from .working_days import HOLIDAYS_KEY, holiday_calendar
 
 User = get_user_model()
 
@@ -16,8 +20,52 @@ def create_user_profile(sender, instance, created, **kwargs):
         Profile.objects.create(user=instance, role=role)
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
+def save_user_profile(sender, instance, created, **kwargs):
     """
-    Signal to save the Profile whenever the User is saved.
+    Signal to write back the Profile when it was modified through the User.
+    Only a profile already loaded on the instance is looked at, and only its
+    changed fields are saved, so plain User saves (last_login, is_active
+    toggles...) don't read or write the profile table.
     """
-    instance.profile.save()
\ No newline at end of file
+    if created:
+        return
+    profile = instance._state.fields_cache.get('profile')
+    if profile is None:
+        return
+    changed = profile.get_changed_fields()
+    if changed is None:
+        profile.save()
+    elif changed:
+        profile.save(update_fields=changed)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, update_fields=None, **kwargs):
+    """
+    Drop the cached user once the change is committed. last_login alone
+    doesn't matter to anything read from the cache.
+    """
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    bump_users([instance.pk])
+    transaction.on_commit(lambda: invalidate_user(instance.pk, instance.email))
+
+@receiver([post_save, post_delete], sender=Profile)
+def invalidate_cached_profile(sender, instance, **kwargs):
+    bump_users([instance.user_id])
+    transaction.on_commit(lambda: invalidate_user(instance.user_id))
+
+
+@receiver(post_delete, sender=LeaveRequest)
+def remove_leave_from_summary(sender, instance, **kwargs):
+    LeaveSummary.apply_change(instance.get_summary_state(), None)
+
+@receiver([post_save, post_delete], sender=LeaveRequest)
+def bump_leave_owner(sender, instance, **kwargs):
+    bump_users([instance.user_id])
+
+@receiver([post_save, post_delete], sender=Holiday)
+def reload_holidays(sender, instance, **kwargs):
+    """ Other processes see the revision move, this one reloads at once """
+    Revision.bump([HOLIDAYS_KEY])
+    transaction.on_commit(holiday_calendar.reset)
@@ -0,0 +1,73 @@
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import ExtractYear
+from django.utils import timezone
+from rest_framework import serializers
+from .models import LeaveRequest, LeaveSummary
+
+
+def rebuild_leave_summaries(leave_model, summary_model, batch_size=5000):
+    """
+    Recompute every LeaveSummary row from LeaveRequest with one GROUP BY.
+    Takes the model classes; migration 0007 keeps its own copy of this.
+    Returns the number of summary rows written.
+    """
+    totals = {}
+    rows = (
+        leave_model.objects
+        .annotate(year=ExtractYear('start_date'))
+        .values('user_id', 'year', 'leave_type', 'status')
+        .annotate(days=Sum('no_days'))
+        .order_by()
+    )
+    for row in rows:
+        key = (row['user_id'], row['year'], row['leave_type'])
+        totals.setdefault(key, {})[f"{row['status']}_days"] = row['days']
+
+    with transaction.atomic():
+        summary_model.objects.all().delete()
+        summary_model.objects.bulk_create(
+            [
+                summary_model(user_id=user_id, year=year, leave_type=leave_type, **days)
+                for (user_id, year, leave_type), days in totals.items()
+            ],
+            batch_size=batch_size,
+        )
+    return len(totals)
+
+
+def summaries_for(user_ids, year=None):
+    """
+    Summary dicts for the given users and year (default: this year), keyed
+    by user id: {'year': ..., '<leave_type>': {'pending', 'approved', 'rejected'}}.
+    One indexed query whatever the length of the users' leave history.
+    """
+    year = year or timezone.localdate().year
+    return _fold_summaries(user_ids, year, LeaveSummary.objects.filter(user_id__in=user_ids, year=year))
+
+
+async def asummaries_for(user_ids, year=None):
+    """ Async version of summaries_for """
+    year = year or timezone.localdate().year
+    rows = LeaveSummary.objects.filter(user_id__in=user_ids, year=year)
+    return _fold_summaries(user_ids, year, [summary async for summary in rows])
+
+
+def _fold_summaries(user_ids, year, summaries):
+    empty = {'pending': 0, 'approved': 0, 'rejected': 0}
+    result = {
+        user_id: {'year': year, **{leave_type: dict(empty) for leave_type, _ in LeaveRequest.LEAVE_TYPE_CHOICES}}
+        for user_id in user_ids
+    }
+    for summary in summaries:
+        result[summary.user_id][summary.leave_type] = summary.as_dict()
+    return result
+
+
+def parse_year(value):
+    """ ?year= query parameter, None when absent """
+    if not value:
+        return None
+    if not value.isdigit():
+        raise serializers.ValidationError({"year": "Enter a valid year."})
+    return int(value)
@@ -0,0 +1,179 @@
+import math
+import random
+from collections import defaultdict
+from datetime import date, timedelta
+from itertools import accumulate, islice
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from .models import LeaveRequest, LeaveSummary, Profile, Revision
+from .revisions import ALL_USERS
+from .summaries import rebuild_leave_summaries
+from .working_days import day_start, holiday_calendar, working_weekdays
+
+User = get_user_model()
+
+FIRST_NAMES = (
+    'Aisha', 'Ben', 'Chen', 'Diego', 'Elena', 'Farah', 'Gabriel', 'Hana', 'Ivan', 'Jade',
+    'Kofi', 'Lena', 'Mateo', 'Nadia', 'Omar', 'Priya', 'Quinn', 'Rosa', 'Sami', 'Tara',
+)
+LAST_NAMES = (
+    'Adams', 'Baker', 'Costa', 'Dubois', 'Evans', 'Fischer', 'Garcia', 'Haddad', 'Ito', 'Jensen',
+    'Kumar', 'Larsen', 'Moreau', 'Nowak', 'Okafor', 'Patel', 'Rossi', 'Silva', 'Tanaka', 'Weber',
+)
+REASONS = {
+    'casual': ('Family visit', 'Vacation', 'Moving house', 'Wedding', 'Personal errands'),
+    'sick': ('Flu', 'Medical appointment', 'Fever', 'Back pain', 'Dental treatment'),
+    'other': ('Jury duty', 'Training course', 'Bereavement', 'Volunteering'),
+}
+REJECTION_REASONS = ('Team is short-staffed', 'Release week', 'Overlaps with team leave', 'Please reschedule')
+
+LEAVE_TYPE_WEIGHTS = {'casual': 60, 'sick': 30, 'other': 10}
+# chance that the next day is taken too, per leave type (geometric lengths)
+CONTINUE_PROBABILITY = {'casual': 0.55, 'sick': 0.4, 'other': 0.7}
+MAX_DAYS = {'casual': 15, 'sick': 10, 'other': 20}
+# more leave in the summer and around the end of the year
+MONTH_WEIGHTS = (6, 6, 7, 8, 8, 10, 14, 14, 8, 7, 7, 12)
+# long weekends: leaves start on Mondays and Fridays more often
+WEEKDAY_WEIGHTS = (14, 9, 9, 9, 13, 2, 2)
+# (approved, rejected, pending) for leaves that have started / not yet
+PAST_STATUS_WEIGHTS = (82, 12, 6)
+FUTURE_STATUS_WEIGHTS = (38, 7, 55)
+# decisions take hours to days: log-normal around this median
+MEDIAN_DECISION_HOURS = 20
+
+
+class SyntheticData:
+    """
+    Users and leave requests with plausible shapes for load tests: a few
+    employees take much of the leave, leaves start on working days with
+    more of them on Mondays, Fridays, in summer and in December, sick
+    leave is short and filed at the last minute, and past leaves are
+    mostly decided while future ones are mostly pending. A leave that
+    would overlap one of its employee's active (not rejected) leaves of
+    the same build_leaves() call is rejected instead, as the database
+    constraint on PostgreSQL demands, so any number of leaves still fits.
+
+    Rows are written with bulk_create, so nothing goes through save() or
+    the signals: no_days is computed here and summaries and revisions are
+    brought up to date by finish().
+    """
+
+    def __init__(self, seed=0, years=1, prefix='synthetic'):
+        self.rng = random.Random(seed)
+        self.prefix = prefix
+        today = timezone.localdate()
+        self.now = timezone.now()
+        self.today = today
+        workdays = working_weekdays()
+        days, weights = [], []
+        day = date(today.year - years + 1, 1, 1)
+        while day.year <= today.year:
+            if day.weekday() in workdays and holiday_calendar.working_days(day, day):
+                days.append(day)
+                weights.append(MONTH_WEIGHTS[day.month - 1] * WEEKDAY_WEIGHTS[day.weekday()])
+            day += timedelta(days=1)
+        self.days = days
+        self.day_weights = list(accumulate(weights))
+        self.midnights = {}
+
+    def create_users(self, count, admins=0, password='synthetic-password'):
+        """
+        Employees (and admins, like create_superuser.py sets them up) with
+        their profiles. The password is hashed once and shared, hashing it
+        per user would be most of the time spent.
+        """
+        rng = self.rng
+        encoded = make_password(password)
+        first = User.objects.filter(username__startswith=f'{self.prefix}-').count()
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(
+                    username=f'{self.prefix}-{number}', email=f'{self.prefix}-{number}@example.com',
+                    first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES), password=encoded,
+                    is_staff=index < admins, is_superuser=index < admins,
+                )
+                for index, number in enumerate(range(first, first + count))
+            ], batch_size=1000)
+            Profile.objects.bulk_create([
+                Profile(
+                    user=user, role='admin' if user.is_superuser else 'employee',
+                    casual_leave_balance=rng.randint(4, 20), sick_leave_balance=rng.randint(6, 14),
+                )
+                for user in users
+            ], batch_size=1000)
+        return users
+
+    def _length(self, leave_type):
+        # geometric number of days, 1 at least
+        extra = int(math.log(1 - self.rng.random()) / math.log(CONTINUE_PROBABILITY[leave_type]))
+        return min(1 + extra, MAX_DAYS[leave_type])
+
+    def _midnight(self, day):
+        # leaves are midnight aligned; make_aware is slow enough to cache
+        if day not in self.midnights:
+            self.midnights[day] = day_start(day)
+        return self.midnights[day]
+
+    def build_leaves(self, users, count):
+        """ Yield count unsaved LeaveRequests spread over users """
+        rng = self.rng
+        # heavy tailed activity per employee
+        activity = list(accumulate(rng.paretovariate(1.5) for _ in users))
+        # indexes, unsaved users can't be dict keys
+        owners = rng.choices(range(len(users)), cum_weights=activity, k=count)
+        starts = rng.choices(self.days, cum_weights=self.day_weights, k=count)
+        leave_types = rng.choices(list(LEAVE_TYPE_WEIGHTS), weights=list(LEAVE_TYPE_WEIGHTS.values()), k=count)
+        # calendar days covered by each employee's active leaves
+        taken = defaultdict(set)
+
+        for owner, first_day, leave_type in zip(owners, starts, leave_types):
+            user = users[owner]
+            length = self._length(leave_type)
+            days = {first_day + timedelta(days=offset) for offset in range(length)}
+            last_day = first_day + timedelta(days=length - 1)
+            start_date, end_date = self._midnight(first_day), self._midnight(last_day)
+
+            if leave_type == 'sick':
+                lead = timedelta(hours=rng.uniform(0, 36))
+            else:
+                lead = timedelta(days=1 + rng.expovariate(1 / 14), hours=rng.uniform(0, 24))
+            created_at = min(start_date - lead, self.now)
+
+            weights = PAST_STATUS_WEIGHTS if first_day <= self.today else FUTURE_STATUS_WEIGHTS
+            status = rng.choices(('approved', 'rejected', 'pending'), weights=weights)[0]
+            decided_at = latency = None
+            if status != 'pending':
+                latency = timedelta(hours=rng.lognormvariate(math.log(MEDIAN_DECISION_HOURS), 1.0))
+                decided_at = created_at + latency
+                if decided_at > self.now:
+                    status, decided_at, latency = 'pending', None, None
+
+            if status != 'rejected' and not taken[owner].isdisjoint(days):
+                status = 'rejected'
+                if decided_at is None:
+                    decided_at = min(created_at + timedelta(hours=rng.expovariate(1 / MEDIAN_DECISION_HOURS)), self.now)
+                    latency = decided_at - created_at
+            if status != 'rejected':
+                taken[owner] |= days
+
+            yield LeaveRequest(
+                user=user, leave_type=leave_type, start_date=start_date, end_date=end_date,
+                no_days=holiday_calendar.working_days(first_day, last_day),
+                reason=rng.choice(REASONS[leave_type]), status=status,
+                reason_not_approved=rng.choice(REJECTION_REASONS) if status == 'rejected' else None,
+                created_at=created_at, decided_at=decided_at, decision_latency=latency,
+            )
+
+    def create_leaves(self, users, count, batch_size=5000):
+        leaves = self.build_leaves(users, count)
+        while batch := list(islice(leaves, batch_size)):
+            LeaveRequest.objects.bulk_create(batch)
+        return count
+
+    def finish(self):
+        """ Bring summaries and revisions in line with the bulk inserts """
+        with transaction.atomic():
+            rebuild_leave_summaries(LeaveRequest, LeaveSummary)
+            Revision.bump([ALL_USERS])
@@ -0,0 +1,101 @@
+from collections import defaultdict
+from datetime import timedelta
+from django.db import transaction
+from .models import LeaveRequest, Team
+from .working_days import as_date, day_start
+
+
+def first_full_day(intervals, first_day, last_day, limit):
+    """
+    First day of [first_day, last_day] on which at least limit of the
+    (start_day, end_day) intervals overlap, or None. A sweep line over
+    the interval ends clipped to the window: O(k log k) for k intervals,
+    whatever the length of the window.
+    """
+    if limit <= 0:
+        return first_day
+    events = []
+    for start, end in intervals:
+        start, end = max(start, first_day), min(end, last_day)
+        if start <= end:
+            events.append((start, 1))
+            events.append((end + timedelta(days=1), -1))
+    # on the same day, leaves ending go before leaves starting
+    events.sort()
+    absent = 0
+    for day, change in events:
+        absent += change
+        if absent >= limit:
+            return day
+    return None
+
+
+class TeamCoverage:
+    """
+    Approved leaves of a team's members touching a date range, as day
+    intervals by leave id, checked against the team's max_absent. They are
+    read with one range query on the approved end_date index: leaves that
+    ended before the range are never visited, so the cost follows the
+    team's current and upcoming absences rather than its history. A batch
+    can record the approvals it makes with update() and keep checking.
+    """
+
+    def __init__(self, team, start_date, end_date):
+        self.team = team
+        # leaves take whole days: anything on the range's first or last day counts
+        first = day_start(as_date(start_date))
+        after = day_start(as_date(end_date) + timedelta(days=1))
+        rows = (
+            LeaveRequest.objects
+            .filter(status='approved', end_date__gte=first, start_date__lt=after, user__profile__team=team)
+            .values_list('id', 'start_date', 'end_date')
+        )
+        self.intervals = {leave_id: (as_date(start), as_date(end)) for leave_id, start, end in rows}
+
+    def full_day(self, start_date, end_date, exclude_id=None):
+        """ First day of the range with no room for one more absence, or None """
+        intervals = (interval for leave_id, interval in self.intervals.items() if leave_id != exclude_id)
+        return first_full_day(intervals, as_date(start_date), as_date(end_date), self.team.max_absent)
+
+    def update(self, leave):
+        if leave.status == 'approved':
+            self.intervals[leave.id] = (as_date(leave.start_date), as_date(leave.end_date))
+        else:
+            self.intervals.pop(leave.id, None)
+
+    @classmethod
+    def for_leaves(cls, leaves, team_ids):
+        """
+        Coverage of every capped team among the leaves' owners (team_ids
+        maps user id to team id), each spanning all of that team's leaves.
+        The teams are locked, so concurrent approvals for a team queue up.
+        """
+        spans = defaultdict(list)
+        for leave in leaves:
+            team_id = team_ids.get(leave.user_id)
+            if team_id is not None:
+                spans[team_id].append(leave)
+        if not spans:
+            return {}
+        teams = Team.objects.select_for_update().filter(id__in=spans, max_absent__isnull=False)
+        return {
+            team.id: cls(
+                team, min(leave.start_date for leave in spans[team.id]), max(leave.end_date for leave in spans[team.id]),
+            )
+            for team in teams
+        }
+
+
+def team_full_day(team_id, start_date, end_date, exclude_id=None):
+    """
+    First day of [start_date, end_date] on which team_id already has
+    max_absent members on approved leave, or None (also for teams without
+    a cap). Inside a transaction the team is locked until it ends.
+    """
+    teams = Team.objects.filter(id=team_id, max_absent__isnull=False)
+    if transaction.get_connection().in_atomic_block:
+        teams = teams.select_for_update()
+    team = teams.first()
+    if team is None:
+        return None
+    return TeamCoverage(team, start_date, end_date).full_day(start_date, end_date, exclude_id)
@@ -1,3 +1,771 @@
-from django.test import TestCase
+import json
+import threading
+from datetime import date, timedelta
+from unittest import mock, skipUnless
+from asgiref.sync import async_to_sync
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, make_password
+from django.core.cache import caches
+from django.db import IntegrityError, connection
+from django.db.models import F
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from .async_views import AsyncLeaveView, AsyncProfileView
+from .balance_reset import YearlyReset
+from .balances import change_balance
+from .benchmarks import ENDPOINTS, EndpointBenchmark, Fixtures, compare, uncovered_routes
+from . import instrumentation
+from .fast_serializers import get_fast_serializer
+from .instrumentation import metrics_registry
+from .models import BalanceReset, Holiday, LeaveBalanceEntry, LeaveRequest, LeaveSummary, Profile, Revision, Team
+from .password_hashing import HashPool, LoginThrottled, hash_pool
+from .revisions import ALL_USERS, bump_users, user_key
+from .serializers import LeaveRequestSerializer, ProfileSerializer
+from .summaries import rebuild_leave_summaries
+from .synthetic import SyntheticData
+from .team_coverage import first_full_day, team_full_day
+from .working_days import HOLIDAYS_KEY, holiday_calendar, working_days
+from .token_blacklist import FastBlacklistRefreshToken, jti_blacklist, purge_expired_tokens
+
+User = get_user_model()
+
+
+class QueryCountMixin:
+    def assertConstantQueries(self, url, add_rows):
+        """
+        Fetch url once, add more rows with add_rows() and fetch it again:
+        the number of queries must not grow with the number of rows.
+        """
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        # ALL_USERS moves once the writes commit
+        with self.captureOnCommitCallbacks(execute=True):
+            add_rows()
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+
+# the tests below count leave days as calendar days; working days are
+# covered by WorkingDaysTests
+ALL_WEEKDAYS = override_settings(LEAVE_WORKING_WEEKDAYS=range(7))
+
+
+@ALL_WEEKDAYS
+class EmployeeTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='emp', email='emp@example.com', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def day(self, offset):
+        today = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        return today + timedelta(days=offset)
+
+    def make_leave(self, user, offset, days=1, **kwargs):
+        start = self.day(offset)
+        kwargs.setdefault('leave_type', 'casual')
+        kwargs.setdefault('reason', 'test')
+        return LeaveRequest.objects.create(
+            user=user, start_date=start, end_date=start + timedelta(days=days - 1), **kwargs
+        )
+
+
+class LeaveListTests(QueryCountMixin, EmployeeTestCase):
+    def test_list_query_count_is_constant(self):
+        self.make_leave(self.user, 1)
+        self.assertConstantQueries(
+            '/api/employee/leave/',
+            lambda: [self.make_leave(self.user, offset) for offset in range(2, 12)],
+        )
+
+
+class FastSerializerTests(EmployeeTestCase):
+    def assertSameJSON(self, serializer_class, queryset):
+        fast = get_fast_serializer(serializer_class)
+        expected = JSONRenderer().render(serializer_class(queryset.order_by('id'), many=True).data)
+        actual = JSONRenderer().render(fast.serialize(fast.values(queryset.order_by('id'))))
+        self.assertEqual(actual, expected)
+
+    def test_leave_output_matches_model_serializer(self):
+        self.make_leave(self.user, 1, days=3)
+        self.make_leave(self.user, 7, leave_type='sick', status='rejected', reason_not_approved='busy')
+        self.assertSameJSON(LeaveRequestSerializer, LeaveRequest.objects.all())
+        with timezone.override('Asia/Kolkata'):
+            self.assertSameJSON(LeaveRequestSerializer, LeaveRequest.objects.all())
+
+    def test_profile_output_matches_model_serializer(self):
+        User.objects.create_user(username='other', email='other@example.com', first_name='Ann', password='pass12345')
+        self.assertSameJSON(ProfileSerializer, Profile.objects.all())
+
+
+class LeaveOverlapTests(EmployeeTestCase):
+    def post_leave(self, offset, days=1):
+        start = self.day(offset)
+        return self.client.post('/api/employee/leave/', {
+            'leave_type': 'casual',
+            'reason': 'test',
+            'start_date': start.isoformat(),
+            'end_date': (start + timedelta(days=days - 1)).isoformat(),
+        }, format='json')
+
+    def test_overlapping_leave_is_rejected(self):
+        self.assertEqual(self.post_leave(5, days=3).status_code, 201)
+        self.assertEqual(self.post_leave(3, days=3).status_code, 400)
+        self.assertEqual(self.post_leave(7).status_code, 400)
+        self.assertEqual(self.post_leave(8).status_code, 201)
+        self.assertEqual(self.post_leave(2).status_code, 201)
+
+    def test_leave_longer_than_max_span_is_refused(self):
+        start = self.day(1)
+        for days, expected in ((LeaveRequest.MAX_SPAN_DAYS + 1, 400), (LeaveRequest.MAX_SPAN_DAYS, 201)):
+            response = self.client.post('/api/employee/leave/', {
+                'leave_type': 'other', 'reason': 'test', 'start_date': start.isoformat(),
+                'end_date': (start + timedelta(days=days - 1)).isoformat(),
+            }, format='json')
+            self.assertEqual(response.status_code, expected)
+
+    def test_rejected_leave_frees_its_dates(self):
+        self.make_leave(self.user, 5, days=3, status='rejected')
+        self.assertEqual(self.post_leave(5, days=3).status_code, 201)
+
+    def test_has_overlap_seeks_latest_preceding_leave(self):
+        for offset in (1, 10, 20):
+            self.make_leave(self.user, offset, days=3)
+        start = self.day(14)
+        self.assertFalse(LeaveRequest.objects.has_overlap(self.user, start, start + timedelta(days=2)))
+        self.assertTrue(LeaveRequest.objects.has_overlap(self.user, start, start + timedelta(days=6)))
+
+    @skipUnless(connection.vendor != 'postgresql', "PostgreSQL refuses overlapping rows")
+    def test_has_overlap_with_overlapping_rows(self):
+        # a long leave and a short one inside it, as written before the check existed
+        self.make_leave(self.user, 1, days=20)
+        self.make_leave(self.user, 3, days=1)
+        start = self.day(10)
+        self.assertTrue(LeaveRequest.objects.has_overlap(self.user, start, start))
+
+
+class ProfileSignalTests(EmployeeTestCase):
+    def test_user_save_skips_untouched_profile(self):
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            user.save(update_fields=['last_login'])
+
+        user.profile
+        # the user UPDATE and its revision bump
+        with self.assertNumQueries(2):
+            user.save()
+
+    def test_changed_profile_is_written_back(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.profile.sick_leave_balance = 4
+        user.save()
+        self.assertEqual(Profile.objects.get(user=self.user).sick_leave_balance, 4)
+
+
+class UserCacheTests(EmployeeTestCase):
+    def setUp(self):
+        super().setUp()
+        caches['default'].clear()
+        self.client = APIClient()
+        token = self.client.post('/api/employee/token/', {
+            'username': 'emp@example.com', 'password': 'pass12345',
+        }, format='json').data['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_authenticated_requests_skip_user_and_profile_queries(self):
+        self.client.get('/api/employee/profile/')
+        # authentication reads nothing: the queries left are the revision,
+        # the profile (read fresh to match the revision) and the summaries
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/employee/profile/')
+        self.assertEqual(response.data['user']['email'], 'emp@example.com')
+
+    def test_changes_invalidate_the_cache(self):
+        self.client.get('/api/employee/profile/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            change_balance(self.user.id, 'casual', -2, 'adjustment')
+        self.assertEqual(self.client.get('/api/employee/profile/').data['casual_leave_balance'], 8)
+
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.client.get('/api/employee/profile/').status_code, 401)
+
+    def test_email_is_unique_in_the_database(self):
+        with self.assertRaises(IntegrityError):
+            User.objects.bulk_create([User(username='dup', email='emp@example.com')])
+
+
+class TokenBlacklistTests(EmployeeTestCase):
+    def setUp(self):
+        super().setUp()
+        jti_blacklist.reset()
+        self.refresh = str(FastBlacklistRefreshToken.for_user(self.user))
+
+    def refresh_token(self):
+        return self.client.post('/api/employee/token/refresh/', {'refresh': self.refresh}, format='json')
+
+    def test_logged_out_token_cannot_refresh(self):
+        self.assertEqual(self.refresh_token().status_code, 200)
+        self.client.post('/api/employee/logout/', {'refresh': self.refresh}, format='json')
+        self.assertEqual(self.refresh_token().status_code, 401)
+
+    def test_token_blacklisted_elsewhere_is_picked_up_by_sync(self):
+        jti_blacklist.sync()
+        RefreshToken(self.refresh).blacklist()
+        jti_blacklist.sync(force_full=True)
+        self.assertEqual(self.refresh_token().status_code, 401)
+
+    def test_refresh_check_does_not_query_blacklist_between_syncs(self):
+        jti_blacklist.sync()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.refresh_token().status_code, 200)
+        self.assertFalse([q for q in queries.captured_queries if 'token_blacklist' in q['sql']])
+
+    def test_purge_removes_expired_tokens(self):
+        OutstandingToken.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(purge_expired_tokens(batch_size=1), 1)
+        self.assertFalse(OutstandingToken.objects.exists())
+
+
+class LeaveSummaryTests(EmployeeTestCase):
+    def summary(self):
+        return self.client.get('/api/employee/profile/').data['leave_summary']
+
+    def test_summary_follows_leave_changes(self):
+        leave = self.make_leave(self.user, 1, days=3)
+        self.make_leave(self.user, 10, days=2, leave_type='sick', status='approved')
+        self.assertEqual(self.summary()['casual'], {'pending': 3, 'approved': 0, 'rejected': 0})
+
+        leave = LeaveRequest.objects.get(pk=leave.pk)
+        leave.status = 'approved'
+        leave.save()
+        self.assertEqual(self.summary()['casual'], {'pending': 0, 'approved': 3, 'rejected': 0})
+
+        leave.delete()
+        self.assertEqual(self.summary()['casual'], {'pending': 0, 'approved': 0, 'rejected': 0})
+        self.assertEqual(self.summary()['sick']['approved'], 2)
+
+    def test_rebuild_matches_incremental_state(self):
+        for offset in range(1, 20, 4):
+            self.make_leave(self.user, offset, days=2, status=('pending', 'approved', 'rejected')[offset % 3])
+        incremental = sorted(LeaveSummary.objects.values_list('user_id', 'year', 'leave_type', 'pending_days', 'approved_days', 'rejected_days'))
+        rebuild_leave_summaries(LeaveRequest, LeaveSummary)
+        rebuilt = sorted(LeaveSummary.objects.values_list('user_id', 'year', 'leave_type', 'pending_days', 'approved_days', 'rejected_days'))
+        self.assertEqual(incremental, rebuilt)
+
+
+class ConditionalGetTests(EmployeeTestCase):
+    def get(self, url, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(url, **headers)
+
+    def test_unchanged_resources_answer_304(self):
+        self.make_leave(self.user, 1)
+        for url in ('/api/employee/profile/', '/api/employee/leave/'):
+            etag = self.get(url)['ETag']
+            # only the revision lookup runs
+            with self.assertNumQueries(1):
+                response = self.get(url, etag)
+            self.assertEqual(response.status_code, 304)
+
+    def test_writes_change_the_etag(self):
+        url = '/api/employee/leave/'
+        etag = self.get(url)['ETag']
+        leave = self.make_leave(self.user, 1)
+        response = self.get(url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+
+        etag = response['ETag']
+        change_balance(self.user.id, 'casual', -1, 'adjustment', leave)
+        self.assertEqual(self.get('/api/employee/leave/', etag).status_code, 200)
+
+    def test_other_users_changes_keep_the_etag(self):
+        etag = self.get('/api/employee/profile/')['ETag']
+        other = User.objects.create_user(username='other', email='other@example.com', password='pass12345')
+        self.make_leave(other, 1)
+        self.assertEqual(self.get('/api/employee/profile/', etag).status_code, 304)
+        self.assertNotEqual(self.get('/api/employee/profile/?year=2020')['ETag'], etag)
+
+    def test_bump_creates_missing_revisions(self):
+        Revision.objects.all().delete()
+        Revision.bump(['a', 'b'])
+        Revision.bump(['b'])
+        self.assertEqual(Revision.objects.get(key='a').value, 1)
+        self.assertGreater(Revision.objects.get(key='b').value, Revision.objects.get(key='a').value)
+
+    def test_all_users_moves_after_commit(self):
+        def values():
+            stored = dict(Revision.objects.values_list('key', 'value'))
+            return {key: stored.get(key, 0) for key in (ALL_USERS, user_key(self.user.id))}
+
+        before = values()
+        with self.captureOnCommitCallbacks() as callbacks:
+            bump_users([self.user.id])
+        during = values()
+        self.assertEqual(during[ALL_USERS], before[ALL_USERS])
+        self.assertGreater(during[user_key(self.user.id)], before[user_key(self.user.id)])
+        for callback in callbacks:
+            callback()
+        self.assertGreater(values()[ALL_USERS], before[ALL_USERS])
+
+
+class AsyncViewTestMixin:
+    def call_async(self, view, path, user=None, method='get', **kwargs):
+        headers = kwargs.pop('headers', {})
+        if user is not None:
+            headers['Authorization'] = f'Bearer {RefreshToken.for_user(user).access_token}'
+        request = getattr(AsyncRequestFactory(), method)(path, headers=headers, **kwargs)
+        return async_to_sync(view.as_view())(request)
+
+
+class AsyncViewTests(AsyncViewTestMixin, EmployeeTestCase):
+    def setUp(self):
+        super().setUp()
+        caches['default'].clear()
+        self.make_leave(self.user, 1, days=2)
+        self.make_leave(self.user, 5, leave_type='sick', status='approved')
+
+    def test_responses_match_sync_views(self):
+        for view, path in ((AsyncProfileView, '/api/employee/profile/'), (AsyncLeaveView, '/api/employee/leave/')):
+            response = self.call_async(view, path, self.user)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.content, self.client.get(path).content)
+
+    def test_conditional_get(self):
+        etag = self.call_async(AsyncProfileView, '/api/employee/profile/', self.user)['ETag']
+        response = self.call_async(AsyncProfileView, '/api/employee/profile/', self.user, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_profile_follows_writes_of_other_workers(self):
+        path = '/api/employee/profile/'
+        for view in (AsyncProfileView, None):
+            # prime the user cache, then change the profile the way another
+            # process would: the revision moves, this process' cache doesn't
+            etag = self.call_async(AsyncProfileView, path, self.user)['ETag']
+            Profile.objects.filter(user=self.user).update(casual_leave_balance=F('casual_leave_balance') - 3)
+            Revision.bump([user_key(self.user.id)])
+            balance = Profile.objects.get(user=self.user).casual_leave_balance
+
+            if view is None:
+                response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+            else:
+                response = self.call_async(view, path, self.user, headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.content)['casual_leave_balance'], balance)
+
+    def test_authentication_errors_match_sync_views(self):
+        response = self.call_async(AsyncProfileView, '/api/employee/profile/')
+        self.client.force_authenticate(None)
+        expected = self.client.get('/api/employee/profile/')
+        self.assertEqual((response.status_code, response.content), (expected.status_code, expected.content))
+        self.assertEqual(response['WWW-Authenticate'], expected['WWW-Authenticate'])
+
+        response = self.call_async(AsyncProfileView, '/api/employee/profile/', headers={'Authorization': 'Bearer junk'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_writes_fall_back_to_sync_view(self):
+        start = self.day(20)
+        response = self.call_async(AsyncLeaveView, '/api/employee/leave/', self.user, method='post', data={
+            'leave_type': 'casual', 'reason': 'trip',
+            'start_date': start.isoformat(), 'end_date': start.isoformat(),
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(LeaveRequest.objects.filter(user=self.user).count(), 3)
+
+
+class PasswordHashingTests(EmployeeTestCase):
+    def setUp(self):
+        super().setUp()
+        caches['default'].clear()
+        hash_pool.reset_stats()
+
+    def login(self):
+        return self.client.post('/api/employee/token/', {
+            'username': 'emp@example.com', 'password': 'pass12345',
+        }, format='json')
+
+    def test_login_hashes_in_pool(self):
+        self.assertEqual(self.login().status_code, 200)
+        stats = hash_pool.stats()
+        self.assertEqual((stats['hashes'], stats['in_flight']), (1, 0))
+
+    def test_outdated_hash_is_upgraded_on_login(self):
+        User.objects.filter(pk=self.user.pk).update(password=make_password('pass12345', hasher='pbkdf2_sha1'))
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$'))
+        self.assertTrue(self.user.check_password('pass12345'))
+
+    def test_failed_logins_hash_in_pool_only(self):
+        threads = []
+        encode = PBKDF2PasswordHasher.encode
+
+        def record_thread(hasher, *args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return encode(hasher, *args, **kwargs)
+
+        with mock.patch.object(PBKDF2PasswordHasher, 'encode', record_thread):
+            for username, password in (('emp@example.com', 'wrong'), ('nobody@example.com', 'pass12345')):
+                response = self.client.post('/api/employee/token/', {
+                    'username': username, 'password': password,
+                }, format='json')
+                self.assertEqual(response.status_code, 401)
+        self.assertEqual(len(threads), 2)
+        self.assertTrue(all(name.startswith('password-hash') for name in threads), threads)
+        # usernames still log in, for the admin site
+        self.assertEqual(authenticate(username='emp', password='pass12345'), self.user)
+
+    def test_saturated_pool_rejects_logins(self):
+        hash_pool.in_flight = hash_pool.workers + hash_pool.max_queue
+        try:
+            response = self.login()
+        finally:
+            hash_pool.in_flight = 0
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(hash_pool.stats()['rejected'], 1)
+
+    def test_pool_bound(self):
+        pool = HashPool(executor='inline', workers=1, max_queue=0)
+        with self.assertRaises(LoginThrottled):
+            pool.run(pool.run, len, 'nested call finds the pool full')
+
+
+@override_settings(LEAVE_WORKING_WEEKDAYS=(0, 1, 2, 3, 4))
+class WorkingDaysTests(EmployeeTestCase):
+    # a Monday
+    MONDAY = date(2025, 3, 3)
+
+    def setUp(self):
+        super().setUp()
+        holiday_calendar.reset()
+        self.addCleanup(holiday_calendar.reset)
+
+    def add_holiday(self, day):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Holiday.objects.create(date=day, name='holiday')
+
+    def test_weekends_are_skipped(self):
+        monday = self.MONDAY
+        self.assertEqual(working_days(monday, monday + timedelta(days=4)), 5)
+        self.assertEqual(working_days(monday, monday + timedelta(days=6)), 5)
+        self.assertEqual(working_days(monday + timedelta(days=5), monday + timedelta(days=6)), 0)
+        self.assertEqual(working_days(monday + timedelta(days=4), monday + timedelta(days=17)), 10)
+
+    def test_holidays_are_skipped_and_changes_reload_the_cache(self):
+        monday = self.MONDAY
+        self.assertEqual(working_days(monday, monday + timedelta(days=13)), 10)
+        holiday = self.add_holiday(monday + timedelta(days=2))
+        self.add_holiday(monday + timedelta(days=5))  # a Saturday
+        self.assertEqual(working_days(monday, monday + timedelta(days=13)), 9)
+        with self.captureOnCommitCallbacks(execute=True):
+            holiday.delete()
+        self.assertEqual(working_days(monday, monday + timedelta(days=13)), 10)
+
+    def test_changes_from_other_processes_are_picked_up(self):
+        monday = self.MONDAY
+        working_days(monday, monday)
+        Holiday.objects.create(date=monday, name='holiday')
+        holiday_calendar.checked_at -= 3600
+        self.assertEqual(working_days(monday, monday), 0)
+
+    def test_leave_days_and_balance_use_working_days(self):
+        start = self.day(1)
+        while start.weekday() != 0:
+            start += timedelta(days=1)
+        self.add_holiday(start.date() + timedelta(days=1))
+        response = self.client.post('/api/employee/leave/', {
+            'leave_type': 'casual', 'reason': 'trip',
+            'start_date': start.isoformat(), 'end_date': (start + timedelta(days=6)).isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['no_days'], 4)
+
+        saturday = start + timedelta(days=12)
+        response = self.client.post('/api/employee/leave/', {
+            'leave_type': 'casual', 'reason': 'weekend',
+            'start_date': saturday.isoformat(), 'end_date': (saturday + timedelta(days=1)).isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class SyntheticDataTests(TestCase):
+    def test_users_and_leaves(self):
+        data = SyntheticData(seed=1, prefix='gen')
+        users = data.create_users(20, admins=2)
+        data.create_leaves(users[2:], 300, batch_size=100)
+        data.finish()
+
+        self.assertEqual(User.objects.filter(username__startswith='gen-').count(), 20)
+        self.assertEqual(Profile.objects.filter(user__username__startswith='gen-', role='admin').count(), 2)
+        self.assertTrue(User.objects.get(username='gen-0').check_password('synthetic-password'))
+
+        leaves = LeaveRequest.objects.all()
+        self.assertEqual(leaves.count(), 300)
+        self.assertFalse(leaves.filter(user__in=users[:2]).exists())
+        for leave in leaves:
+            self.assertLess(leave.start_date.weekday(), 5)
+            self.assertEqual(leave.no_days, working_days(leave.start_date, leave.end_date))
+            self.assertEqual(leave.decided_at is None, leave.status == 'pending')
+        for leave in leaves.exclude(status='rejected'):
+            self.assertFalse(
+                leaves.exclude(status='rejected').exclude(id=leave.id).filter(
+                    user=leave.user_id, start_date__lte=leave.end_date, end_date__gte=leave.start_date,
+                ).exists()
+            )
+        summary_days = sum(summary.approved_days + summary.pending_days + summary.rejected_days
+                           for summary in LeaveSummary.objects.all())
+        self.assertEqual(summary_days, sum(leave.no_days for leave in leaves))
+
+    def test_seed_makes_it_repeatable(self):
+        def sample(seed):
+            data = SyntheticData(seed=seed)
+            return [
+                (leave.user.username, leave.start_date, leave.end_date, leave.leave_type, leave.status)
+                for leave in data.build_leaves([User(username=f'u{i}') for i in range(5)], 50)
+            ]
+        self.assertEqual(sample(3), sample(3))
+        self.assertNotEqual(sample(3), sample(4))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], USER_IMPORT_HASH_WORKERS=1)
+class EndpointBenchmarkTests(TestCase):
+    def test_every_route_is_benchmarked(self):
+        self.assertEqual(uncovered_routes(), [])
+
+    def test_every_endpoint_answers_as_expected(self):
+        benchmark = EndpointBenchmark(Fixtures(), requests=2, warmup=0, memory_requests=1)
+        for endpoint in ENDPOINTS:
+            result = benchmark.run(endpoint)
+            self.assertEqual(result['errors'], 0, f"{endpoint.name} answered {result['status']}")
+            self.assertGreater(result['peak_kb'], 0)
+        # requests are rolled back
+        self.assertFalse(User.objects.filter(username='bench-created').exists())
+        self.assertEqual(LeaveRequest.objects.get().status, 'pending')
+
+    def test_compare(self):
+        before = {'p50_ms': 10.0, 'p95_ms': 20.0, 'queries': 3, 'peak_kb': 100.0, 'errors': 0, 'requests': 10}
+        self.assertEqual(compare({'a': before}, {'a': dict(before, p50_ms=12.0, peak_kb=150.0)}), [])
+        self.assertEqual(compare({'a': before}, {'a': dict(before, p50_ms=14.0)}), ['a: p50 10.0 -> 14.0 ms'])
+        self.assertEqual(compare({'a': before}, {'a': dict(before, queries=4)}), ['a: 3 -> 4 queries'])
+        self.assertEqual(compare({}, {'a': dict(before, errors=2)}), ['a: 2 of 10 requests failed'])
+
+
+class InstrumentationTests(EmployeeTestCase):
+    def setUp(self):
+        super().setUp()
+        metrics_registry.reset()
+
+    def test_server_timing_header(self):
+        self.make_leave(self.user, 1)
+        response = self.client.get('/api/employee/leave/')
+        timing = dict(part.strip().split(';', 1) for part in response['Server-Timing'].split(','))
+        self.assertEqual(set(timing), {'db', 'serialize', 'render', 'total'})
+        self.assertIn('desc="2 queries"', timing['db'])
+
+    def test_metrics_endpoint(self):
+        self.client.get('/api/employee/profile/')
+        self.client.get('/api/employee/profile/')
+        self.client.get('/no-such-page/')
+
+        with override_settings(DEBUG=True):
+            text = self.client.get('/metrics').content.decode()
+        self.assertIn('http_responses_total{route="api/employee/profile/",method="GET",status="200"} 2', text)
+        self.assertIn('http_responses_total{route="<unmatched>",method="GET",status="404"} 1', text)
+        self.assertIn('http_request_queries_bucket{route="api/employee/profile/",method="GET",le="3"} 2', text)
+        self.assertIn('http_request_duration_seconds_count{route="api/employee/profile/",method="GET"} 2', text)
+        self.assertIn('http_response_size_bytes_bucket{route="api/employee/profile/",method="GET",le="+Inf"} 2', text)
+
+        # no token configured: closed unless DEBUG is on
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        with mock.patch.object(instrumentation, 'METRICS_TOKEN', 'secret'):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+
+    def test_slow_requests_are_logged_with_the_worst_query(self):
+        self.make_leave(self.user, 1)
+        with mock.patch.object(instrumentation, 'SLOW_REQUEST_THRESHOLD', 0), \
+                self.assertLogs('employee.slow_requests', 'WARNING') as logs:
+            self.client.get('/api/employee/leave/')
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual((entry['route'], entry['status'], entry['queries']), ('api/employee/leave/', 200, 2))
+        self.assertIn('SELECT', entry['worst_query']['sql'])
+        self.assertGreater(entry['response_bytes'], 0)
+
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher', 'django.contrib.auth.hashers.MD5PasswordHasher',
+    ])
+    def test_slow_request_log_leaves_out_query_parameters(self):
+        # an outdated hash is upgraded on login: the new one is written to auth_user
+        User.objects.filter(pk=self.user.pk).update(password=make_password('pass12345', hasher='md5'))
+        caches['default'].clear()
+        with mock.patch.object(instrumentation, 'SLOW_REQUEST_THRESHOLD', 0), \
+                self.assertLogs('employee.slow_requests', 'WARNING') as logs:
+            response = APIClient().post('/api/employee/token/', {'username': 'emp@example.com', 'password': 'pass12345'})
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_'))
+        for record in logs.records:
+            self.assertNotIn(self.user.password, record.getMessage())
+            self.assertNotIn('emp@example.com', record.getMessage())
+            self.assertNotIn('params', json.loads(record.getMessage())['worst_query'])
+
+    def test_streamed_responses_are_recorded_once_sent(self):
+        admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='pass12345')
+        self.client.force_authenticate(admin)
+        self.make_leave(self.user, 1)
+        response = self.client.get('/api/manager/leaves/export/jsonl/')
+        self.assertNotIn('api/manager/leaves/export/<str:fmt>/', metrics_registry.expose())
+        size = len(b''.join(response.streaming_content))
+        self.assertIn(
+            'http_response_size_bytes_sum{route="api/manager/leaves/export/<str:fmt>/",method="GET"} ' + str(size),
+            metrics_registry.expose(),
+        )
+
+
+class TeamCoverageTests(EmployeeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.team = Team.objects.create(name='support', max_absent=2)
+        self.members = [
+            User.objects.create_user(username=f'member{i}', email=f'member{i}@example.com')
+            for i in range(3)
+        ]
+        Profile.objects.filter(user__in=[self.user, *self.members]).update(team=self.team)
+        self.user.refresh_from_db()
+
+    def request_leave(self, offset, days=1):
+        start = self.day(offset)
+        return self.client.post('/api/employee/leave/', {
+            'leave_type': 'casual', 'reason': 'trip',
+            'start_date': start.isoformat(), 'end_date': (start + timedelta(days=days - 1)).isoformat(),
+        }, format='json')
+
+    def test_sweep_line(self):
+        day = date(2025, 3, 3)
+        spans = [(day, day + timedelta(days=2)), (day + timedelta(days=3), day + timedelta(days=4))]
+        # back to back leaves never overlap
+        self.assertIsNone(first_full_day(spans, day, day + timedelta(days=9), 2))
+        spans.append((day + timedelta(days=4), day + timedelta(days=8)))
+        self.assertEqual(first_full_day(spans, day, day + timedelta(days=9), 2), day + timedelta(days=4))
+        # only the window counts
+        self.assertIsNone(first_full_day(spans, day + timedelta(days=5), day + timedelta(days=9), 2))
+        self.assertEqual(first_full_day([], day, day, 0), day)
+
+    def test_requests_beyond_the_cap_are_rejected(self):
+        self.make_leave(self.members[0], 3, days=3, status='approved')
+        self.make_leave(self.members[1], 5, days=3, status='approved')
+        self.make_leave(self.members[2], 4, status='pending')
+
+        self.assertEqual(self.request_leave(1, days=4).status_code, 201)
+        response = self.request_leave(5, days=2)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(self.day(5).date().isoformat(), response.data['start_date'][0])
+        self.assertEqual(self.request_leave(8).status_code, 201)
+
+    def test_no_cap_without_a_team_or_a_limit(self):
+        self.make_leave(self.members[0], 3, status='approved')
+        self.make_leave(self.members[1], 3, status='approved')
+        Team.objects.filter(pk=self.team.pk).update(max_absent=None)
+        self.assertEqual(self.request_leave(3).status_code, 201)
+        Profile.objects.filter(user=self.user).update(team=None)
+        self.user.refresh_from_db()
+        caches['default'].clear()
+        self.assertEqual(self.request_leave(4).status_code, 201)
+
+    def test_query_count_does_not_depend_on_team_size(self):
+        start, end = self.day(3), self.day(4)
+        self.make_leave(self.members[0], 3, status='approved')
+        with CaptureQueriesContext(connection) as small:
+            self.assertIsNone(team_full_day(self.team.id, start, end))
+        for i in range(30):
+            member = User.objects.create_user(username=f'extra{i}', email=f'extra{i}@example.com')
+            Profile.objects.filter(user=member).update(team=self.team)
+            self.make_leave(member, 3 - i, days=i + 1, status='approved' if i % 2 else 'rejected')
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(team_full_day(self.team.id, start, end), start.date())
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+
+@override_settings(LEAVE_ALLOWANCES={'casual': 10, 'sick': 10}, LEAVE_CARRY_FORWARD={'casual': 5, 'sick': 0})
+class BalanceResetTests(EmployeeTestCase):
+    def setUp(self):
+        super().setUp()
+        others = [User.objects.create_user(username=f'emp{i}', email=f'emp{i}@example.com') for i in range(3)]
+        self.users = [self.user, *others]
+        for user, casual, sick in zip(self.users, (7, 3, 0, 5), (4, 0, 10, 10)):
+            Profile.objects.filter(user=user).update(casual_leave_balance=casual, sick_leave_balance=sick)
+
+    def balances(self):
+        return list(
+            Profile.objects.filter(user__in=self.users).order_by('user_id')
+            .values_list('casual_leave_balance', 'sick_leave_balance')
+        )
+
+    def test_allowance_plus_capped_carry_forward(self):
+        YearlyReset(2030, chunk_size=3).run()
+        self.assertEqual(self.balances(), [(15, 10), (13, 10), (10, 10), (15, 10)])
+        entries = LeaveBalanceEntry.objects.filter(user=self.user, reason='reset').order_by('leave_type')
+        self.assertEqual([(e.leave_type, e.delta, e.balance_after) for e in entries], [('casual', 8, 15), ('sick', 6, 10)])
+        # sick balance of the last two users didn't move: no entry
+        self.assertEqual(LeaveBalanceEntry.objects.count(), 6)
+
+    def test_dry_run_changes_nothing(self):
+        preview = YearlyReset(2030).preview()
+        self.assertEqual(preview['profiles'], 4)
+        self.assertEqual(preview['leave_types']['casual'], {'before': 15, 'after': 53, 'forfeited': 2})
+        self.assertEqual(preview['leave_types']['sick'], {'before': 24, 'after': 40, 'forfeited': 24})
+        self.assertEqual(self.balances(), [(7, 4), (3, 0), (0, 10), (5, 10)])
+        self.assertFalse(BalanceReset.objects.exists())
+
+    def test_interrupted_run_resumes_and_a_year_is_reset_once(self):
+        reset = YearlyReset(2030, chunk_size=3)
+        BalanceReset.objects.create(year=2030)
+        reset._chunk(actor=None)
+        self.assertEqual(reset.progress().profiles, 3)
+        last_key = f'user:{self.users[-1].id}'
+        revision = Revision.objects.filter(key=last_key).values_list('value', flat=True).first() or 0
+
+        progress = YearlyReset(2030, chunk_size=3).run()
+        self.assertEqual(progress.profiles, 4)
+        self.assertIsNotNone(progress.finished_at)
+        self.assertGreater(Revision.objects.get(key=last_key).value, revision)
+        YearlyReset(2030).run()
+        self.assertEqual(self.balances(), [(15, 10), (13, 10), (10, 10), (15, 10)])
+        self.assertEqual(LeaveBalanceEntry.objects.filter(reason='reset').count(), 6)
+
+    def test_chunk_queries_do_not_grow_with_chunk_size(self):
+        # every user has a revision row from here on
+        YearlyReset(2030).run()
+        BalanceReset.objects.bulk_create([BalanceReset(year=2031), BalanceReset(year=2032)])
+        Profile.objects.update(casual_leave_balance=1)
+        with CaptureQueriesContext(connection) as small:
+            YearlyReset(2031, chunk_size=1)._chunk(actor=None)
+        with CaptureQueriesContext(connection) as large:
+            YearlyReset(2032, chunk_size=4)._chunk(actor=None)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+
+@skipUnless(connection.vendor == 'sqlite', "SQLite production settings")
+class SqliteSettingsTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_connections_use_the_production_profile(self):
+        # the test database lives in memory, so journal_mode can't be WAL here
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 20000)
+        self.assertEqual(self.pragma('cache_size'), -64 * 1024)
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
 
-# Create your tests here.
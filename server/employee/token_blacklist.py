@@ -0,0 +1,117 @@
+import heapq
+import threading
+import time
+from django.conf import settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+# seconds between incremental syncs with the blacklist table; a token
+# blacklisted by another process can be refreshed for at most this long
+SYNC_INTERVAL = getattr(settings, 'TOKEN_BLACKLIST_SYNC_INTERVAL', 1)
+# full reload, catching rows whose ids were committed out of order
+FULL_SYNC_INTERVAL = getattr(settings, 'TOKEN_BLACKLIST_FULL_SYNC_INTERVAL', 300)
+# incremental syncs re-read this many ids below the highest one seen
+SYNC_ID_OVERLAP = 100
+
+
+class JtiBlacklist:
+    """
+    In-process copy of the unexpired part of the token blacklist: a dict of
+    jti -> expiry plus a heap ordered by expiry. Entries are dropped once
+    their token expires, since the JWT expiry check rejects those anyway.
+    Syncing reads only rows added since the last sync, so neither lookups
+    nor syncs get slower as the blacklist table grows.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.expiries = {}
+        self.heap = []
+        self.last_id = 0
+        self.synced_at = None
+        self.full_synced_at = None
+
+    def _add(self, jti, expires_at):
+        if jti in self.expiries:
+            return
+        self.expiries[jti] = expires_at
+        heapq.heappush(self.heap, (expires_at, jti))
+
+    def _prune(self, now):
+        while self.heap and self.heap[0][0] <= now:
+            _, jti = heapq.heappop(self.heap)
+            self.expiries.pop(jti, None)
+
+    def sync(self, force_full=False):
+        now = time.monotonic()
+        with self.lock:
+            full = force_full or self.full_synced_at is None or now - self.full_synced_at >= FULL_SYNC_INTERVAL
+            if not full and now - self.synced_at < SYNC_INTERVAL:
+                return
+            if full:
+                self.reset()
+            rows = (
+                BlacklistedToken.objects
+                .filter(id__gt=max(0, self.last_id - SYNC_ID_OVERLAP), token__expires_at__gt=timezone.now())
+                .order_by('id')
+                .values_list('id', 'token__jti', 'token__expires_at')
+            )
+            for row_id, jti, expires_at in rows:
+                self._add(jti, expires_at.timestamp())
+                self.last_id = max(self.last_id, row_id)
+            self._prune(time.time())
+            self.synced_at = now
+            if full:
+                self.full_synced_at = now
+
+    def add(self, jti, expires_at):
+        with self.lock:
+            self._add(jti, expires_at)
+
+    def __contains__(self, jti):
+        self.sync()
+        return jti in self.expiries
+
+
+jti_blacklist = JtiBlacklist()
+
+
+class FastBlacklistRefreshToken(RefreshToken):
+    """ RefreshToken checking the in-process blacklist instead of querying it """
+
+    def check_blacklist(self):
+        if self.payload[api_settings.JTI_CLAIM] in jti_blacklist:
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        result = super().blacklist()
+        jti_blacklist.add(self.payload[api_settings.JTI_CLAIM], self.payload['exp'])
+        return result
+
+
+class FastBlacklistTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = FastBlacklistRefreshToken
+
+
+def purge_expired_tokens(batch_size=10000):
+    """
+    Delete outstanding (and, by cascade, blacklisted) tokens that are past
+    their expiry, in batches so no single statement holds locks for long.
+    Returns the number of outstanding tokens removed.
+    """
+    removed = 0
+    now = timezone.now()
+    while True:
+        ids = list(OutstandingToken.objects.filter(expires_at__lte=now).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return removed
+        OutstandingToken.objects.filter(id__in=ids).delete()
+        removed += len(ids)
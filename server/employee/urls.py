@@ -1,18 +1,26 @@
+from django.conf import settings
 from django.urls import path
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
 from .serializers import CustomTokenObtainPairSerializer
-from .views import ProfileView,LogoutView,LeaveView
+from .token_blacklist import FastBlacklistTokenRefreshSerializer
+from .views import ProfileView,LogoutView,LeaveView,CalendarView
+from .async_views import AsyncProfileView, AsyncLeaveView
+
+# async versions of the hot read endpoints when served over ASGI
+profile_view = (AsyncProfileView if settings.ASYNC_VIEWS else ProfileView).as_view()
+leave_view = (AsyncLeaveView if settings.ASYNC_VIEWS else LeaveView).as_view()
 
 urlpatterns = [
     # JWT Authentication URLs
     path('token/', TokenObtainPairView.as_view(serializer_class=CustomTokenObtainPairSerializer), name='token_obtain_pair'),
     # path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-    path('profile/', ProfileView.as_view(), name='profile'),
-    path('leave/', LeaveView.as_view(), name='leave_view'),
+    path('token/refresh/', TokenRefreshView.as_view(serializer_class=FastBlacklistTokenRefreshSerializer), name='token_refresh'),
+    path('profile/', profile_view, name='profile'),
+    path('leave/', leave_view, name='leave_view'),
+    path('calendar/', CalendarView.as_view(), name='leave_calendar'),
     
     path('logout/', LogoutView.as_view(), name='logout'),
 ]
\ No newline at end of file
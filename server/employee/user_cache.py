@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+
+User = get_user_model()
+
+# which CACHES alias to use; locmem is per process, so deployments with
+# several workers should point this at a shared backend (redis, memcached)
+CACHE_ALIAS = getattr(settings, 'USER_CACHE_ALIAS', 'default')
+CACHE_TTL = getattr(settings, 'USER_CACHE_TTL', 60)
+MISSING = 'missing'
+
+
+def _user_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def _email_key(email):
+    return f'auth:email:{email}'
+
+
+def get_cached_user(user_id):
+    """
+    Return the user with its profile attached, or None if there is no such
+    user. Cached for USER_CACHE_TTL seconds and dropped when the user or
+    profile changes.
+    """
+    cache = caches[CACHE_ALIAS]
+    key = _user_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = User.objects.select_related('profile').filter(pk=user_id).first()
+        cache.set(key, user or MISSING, CACHE_TTL)
+    return None if user == MISSING else user
+
+
+async def aget_cached_user(user_id):
+    """ Async version of get_cached_user for the async views """
+    cache = caches[CACHE_ALIAS]
+    key = _user_key(user_id)
+    user = await cache.aget(key)
+    if user is None:
+        user = await User.objects.select_related('profile').filter(pk=user_id).afirst()
+        await cache.aset(key, user or MISSING, CACHE_TTL)
+    return None if user == MISSING else user
+
+
+def get_cached_user_by_email(email):
+    """ Same as get_cached_user, looked up by email for the email login backend """
+    cache = caches[CACHE_ALIAS]
+    user_id = cache.get(_email_key(email))
+    if user_id is None:
+        user_id = User.objects.filter(email=email).values_list('pk', flat=True).first()
+        if user_id is None:
+            # not cached: an account created for this email must be found at once
+            return None
+        cache.set(_email_key(email), user_id, CACHE_TTL)
+    user = get_cached_user(user_id)
+    if user is None or user.email != email:
+        cache.delete(_email_key(email))
+        return None
+    return user
+
+
+def invalidate_user(user_id, email=None):
+    cache = caches[CACHE_ALIAS]
+    keys = [_user_key(user_id)]
+    if email:
+        keys.append(_email_key(email))
+    cache.delete_many(keys)
+
+
+def invalidate_users(user_ids):
+    """ For queryset updates that bypass the model signals """
+    caches[CACHE_ALIAS].delete_many([_user_key(user_id) for user_id in user_ids])
@@ -0,0 +1,147 @@
+import codecs
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from rest_framework import serializers
+from .models import Profile
+from .password_hashing import init_worker
+from .revisions import bump_all_users
+
+User = get_user_model()
+
+FORMATS = ('csv', 'jsonl')
+
+
+class UserImportRowSerializer(serializers.Serializer):
+    """ Per-row checks; uniqueness is checked once per batch instead """
+    username = serializers.CharField(max_length=150)
+    email = serializers.EmailField(max_length=254)
+    password = serializers.CharField()
+    first_name = serializers.CharField(max_length=150, required=False, allow_blank=True, default='')
+    last_name = serializers.CharField(max_length=150, required=False, allow_blank=True, default='')
+
+
+def iter_rows(stream, fmt):
+    """
+    Yield dicts from a binary CSV or JSONL stream, one line at a time. A
+    UTF-8 byte order mark (spreadsheets' "CSV UTF-8") is dropped.
+    """
+    lines = codecs.iterdecode(stream, 'utf-8-sig')
+    if fmt == 'csv':
+        yield from csv.DictReader(lines)
+        return
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield row if isinstance(row, dict) else {'__invalid__': line}
+
+
+class UserImporter:
+    """
+    Create users from a stream of rows in batches. Passwords are hashed in
+    a process pool, users and profiles are inserted with bulk_create (which
+    sends no post_save signals, so profiles are built here) and each batch
+    is committed on its own. iter_events() yields progress and error dicts
+    as it goes, so both the API and the command can stream them.
+    """
+
+    def __init__(self, batch_size=500, workers=None):
+        self.batch_size = batch_size
+        self.workers = getattr(settings, 'USER_IMPORT_HASH_WORKERS', os.cpu_count()) if workers is None else workers
+
+    @classmethod
+    def for_request(cls):
+        """
+        Importer for an upload to the API: its hashing processes run beside
+        the web workers, so they are capped at USER_IMPORT_API_HASH_WORKERS
+        (2 by default). The management command uses every core.
+        """
+        workers = getattr(settings, 'USER_IMPORT_HASH_WORKERS', os.cpu_count())
+        return cls(workers=min(workers, getattr(settings, 'USER_IMPORT_API_HASH_WORKERS', 2)))
+
+    def iter_events(self, rows):
+        processed = created = failed = 0
+        pool = ProcessPoolExecutor(self.workers, initializer=init_worker) if self.workers > 1 else None
+        try:
+            rows = enumerate(rows, start=1)
+            while True:
+                batch = list(islice(rows, self.batch_size))
+                if not batch:
+                    break
+                errors, new_users = self._import_batch(batch, pool)
+                for line, row_errors in errors:
+                    yield {'event': 'error', 'row': line, 'errors': row_errors}
+                processed += len(batch)
+                created += new_users
+                failed += len(errors)
+                yield {'event': 'progress', 'processed': processed, 'created': created, 'failed': failed}
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        yield {'event': 'done', 'processed': processed, 'created': created, 'failed': failed}
+
+    def _hash_passwords(self, passwords, pool):
+        if pool is None:
+            return [make_password(password) for password in passwords]
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+    def _import_batch(self, batch, pool):
+        errors, valid = [], []
+        for line, row in batch:
+            if '__invalid__' in row:
+                errors.append((line, {'non_field_errors': ['Row is not a JSON object.']}))
+                continue
+            serializer = UserImportRowSerializer(data=row)
+            if serializer.is_valid():
+                valid.append((line, serializer.validated_data))
+            else:
+                errors.append((line, serializer.errors))
+
+        # uniqueness against the batch itself and the database, one query each
+        usernames = {data['username'] for _, data in valid}
+        emails = {data['email'] for _, data in valid} | {data['email'].lower() for _, data in valid}
+        taken_usernames = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        taken_emails = {email.lower() for email in User.objects.filter(email__in=emails).values_list('email', flat=True)}
+        accepted = []
+        for line, data in valid:
+            row_errors = {}
+            if data['username'] in taken_usernames:
+                row_errors['username'] = ['A user with that username already exists.']
+            if data['email'].lower() in taken_emails:
+                row_errors['email'] = ['A user with that email already exists.']
+            if row_errors:
+                errors.append((line, row_errors))
+                continue
+            taken_usernames.add(data['username'])
+            taken_emails.add(data['email'].lower())
+            accepted.append(data)
+
+        if accepted:
+            hashes = self._hash_passwords([data['password'] for data in accepted], pool)
+            with transaction.atomic():
+                users = User.objects.bulk_create([
+                    User(
+                        username=data['username'], email=data['email'], password=password,
+                        first_name=data['first_name'], last_name=data['last_name'],
+                    )
+                    for data, password in zip(accepted, hashes)
+                ])
+                Profile.objects.bulk_create([
+                    Profile(user=user, role='employee') for user in users
+                ])
+                bump_all_users()
+
+        errors.sort(key=lambda error: error[0])
+        return errors, len(accepted)
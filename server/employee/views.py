@@ -1,18 +1,28 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from .serializers import ProfileSerializer, LeaveRequestSerializer, UserSerializer
-from .models import LeaveRequest
+from .models import LeaveRequest, Profile
+from .fast_serializers import get_fast_serializer
+from .leave_calendar import calendar_response_data
+from .revisions import conditional_on, user_key
+from .summaries import parse_year, summaries_for
+from .token_blacklist import FastBlacklistRefreshToken
 
 class ProfileView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_on(lambda request: user_key(request.user.id))
     def get(self, request):
-        profile = request.user.profile
+        # read fresh, like the revision behind the ETag: the cached user's
+        # profile may be older than a write made by another worker
+        profile = Profile.objects.select_related('user').get(user_id=request.user.id)
         serializer = ProfileSerializer(profile)
-        return Response(serializer.data)
+        data = serializer.data
+        year = parse_year(request.query_params.get('year'))
+        data['leave_summary'] = summaries_for([request.user.id], year)[request.user.id]
+        return Response(data)
 
         
 class LeaveView(APIView):
@@ -25,10 +35,19 @@ class LeaveView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @conditional_on(lambda request: user_key(request.user.id))
     def get(self, request):
-        leaves = LeaveRequest.objects.filter(user=request.user)
-        serializer = LeaveRequestSerializer(leaves, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        serializer = get_fast_serializer(LeaveRequestSerializer)
+        leaves = serializer.values(LeaveRequest.objects.filter(user=request.user))
+        return Response(serializer.serialize(leaves), status=status.HTTP_200_OK)
+
+class CalendarView(APIView):
+    """ The user's leaves and per-day counts for one month (?month=YYYY-MM) """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        data = calendar_response_data(LeaveRequest.objects.filter(user=request.user), request.query_params)
+        return Response(data, status=status.HTTP_200_OK)
 
 class LogoutView(APIView):
     permission_classes = [IsAuthenticated]
@@ -40,7 +59,7 @@ class LogoutView(APIView):
             if not refresh_token:
                 return Response({"error": "Refresh token is required."}, status=status.HTTP_400_BAD_REQUEST)
 
-            token = RefreshToken(refresh_token)
+            token = FastBlacklistRefreshToken(refresh_token)
             token.blacklist()  # Blacklist the refresh token
             return Response({"message": "Successfully logged out."}, status=status.HTTP_205_RESET_CONTENT)
         except Exception as e:
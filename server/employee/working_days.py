@@ -0,0 +1,88 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, time as datetime_time
+from django.conf import settings
+from django.utils import timezone
+
+# Revision key bumped whenever a holiday is added, changed or removed
+HOLIDAYS_KEY = 'holidays'
+# seconds between checks for holiday changes made by other processes
+CHECK_INTERVAL = getattr(settings, 'HOLIDAY_CACHE_CHECK_INTERVAL', 5)
+
+
+def working_weekdays():
+    """ Weekdays (Monday is 0) that count as working days """
+    return frozenset(getattr(settings, 'LEAVE_WORKING_WEEKDAYS', (0, 1, 2, 3, 4)))
+
+
+def as_date(value):
+    """ The local calendar date of a leave bound, which may be a datetime """
+    if isinstance(value, datetime):
+        return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return value
+
+
+def day_start(day):
+    """ Aware datetime for the start of day in the current timezone """
+    return timezone.make_aware(datetime.combine(day, datetime_time.min))
+
+
+class HolidayCalendar:
+    """
+    Holidays kept in memory as one sorted array of date ordinals per
+    weekday, so counting the holidays in a range is a pair of bisections
+    per working weekday instead of a walk over the days. The arrays are
+    reloaded when the 'holidays' Revision moves: at once for changes made
+    in this process, within CHECK_INTERVAL seconds for other processes.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.by_weekday = None
+        self.revision = None
+        self.checked_at = None
+
+    def _holidays(self):
+        now = time.monotonic()
+        if self.by_weekday is not None and now - self.checked_at < CHECK_INTERVAL:
+            return self.by_weekday
+        # models imports this module
+        from .models import Holiday, Revision
+        with self.lock:
+            revision = Revision.objects.filter(key=HOLIDAYS_KEY).values_list('value', flat=True).first() or 0
+            if self.by_weekday is None or revision != self.revision:
+                by_weekday = [[] for _ in range(7)]
+                for day in Holiday.objects.order_by('date').values_list('date', flat=True):
+                    by_weekday[day.weekday()].append(day.toordinal())
+                self.by_weekday = by_weekday
+                self.revision = revision
+            self.checked_at = now
+        return self.by_weekday
+
+    def working_days(self, start, end):
+        """ Working days from start to end inclusive: weekdays that aren't holidays """
+        first, last = as_date(start).toordinal(), as_date(end).toordinal()
+        if last < first:
+            return 0
+        weekdays = working_weekdays()
+        full_weeks, rest = divmod(last - first + 1, 7)
+        # date.fromordinal(n).weekday() == (n - 1) % 7
+        first_weekday = (first - 1) % 7
+        count = full_weeks * len(weekdays) + sum(
+            1 for offset in range(rest) if (first_weekday + offset) % 7 in weekdays
+        )
+        holidays = self._holidays()
+        for weekday in weekdays:
+            count -= bisect_right(holidays[weekday], last) - bisect_left(holidays[weekday], first)
+        return count
+
+
+holiday_calendar = HolidayCalendar()
+
+
+def working_days(start, end):
+    return holiday_calendar.working_days(start, end)
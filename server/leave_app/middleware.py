@@ -0,0 +1,61 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+from employee.instrumentation import finish_request, start_request
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware is sync only, so under ASGI Django would run it and
+    everything inside it (the other middleware and every view) through
+    sync_to_async on one shared thread. This version stays async and only
+    hands static file hits to a thread.
+    """
+    async_capable = True
+
+    def __init__(self, get_response, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    def static_file(self, path):
+        return self.find_file(path) if self.autorefresh else self.files.get(path)
+
+    async def __acall__(self, request):
+        if request.path_info.startswith(self.static_prefix):
+            static_file = await sync_to_async(self.static_file, thread_sensitive=False)(request.path_info)
+            if static_file is not None:
+                return await sync_to_async(self.serve, thread_sensitive=False)(static_file, request)
+        return await self.get_response(request)
+
+
+class InstrumentationMiddleware:
+    """
+    Per-request query count, SQL, serializer and render time and response
+    size (see employee.instrumentation): sent back in a Server-Timing
+    header, added to the Prometheus histograms and logged with the worst
+    query when the request is slow. Put it first so it times the rest.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics = start_request()
+        return finish_request(request, self.get_response(request), metrics)
+
+    async def __acall__(self, request):
+        metrics = start_request()
+        return finish_request(request, await self.get_response(request), metrics)
@@ -55,9 +55,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'leave_app.middleware.InstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'leave_app.middleware.AsyncWhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     # 'django.middleware.csrf.CsrfViewMiddleware',
@@ -101,14 +102,119 @@ DATABASES = {
 db_from_env = dj_database_url.config(default=os.environ.get('DATABASE_URL'), conn_max_age=600)
 DATABASES['default'].update(db_from_env)
 
+# SQLite in production (no DATABASE_URL, or a sqlite:// one): WAL lets reads
+# go on during a write, writers wait up to SQLITE_BUSY_TIMEOUT seconds for
+# the lock instead of failing with "database is locked", and transactions
+# take the write lock when they begin (BEGIN IMMEDIATE), so a transaction
+# that read first can't deadlock upgrading to a write. synchronous=NORMAL is
+# durable in WAL mode except for the last commits on power loss.
+# SQLITE_TUNING=0 leaves SQLite's defaults.
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3' and \
+        os.getenv('SQLITE_TUNING', 'true').lower() in ('1', 'true'):
+    DATABASES['default'].setdefault('OPTIONS', {}).update({
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': float(os.getenv('SQLITE_BUSY_TIMEOUT', 20)),
+        'init_command': ';'.join((
+            'PRAGMA journal_mode=WAL',
+            'PRAGMA synchronous=NORMAL',
+            f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))}",
+            # negative: in KiB rather than pages
+            f"PRAGMA cache_size=-{int(os.getenv('SQLITE_CACHE_KB', 64 * 1024))}",
+            'PRAGMA temp_store=MEMORY',
+        )),
+    })
+    # the pragmas are set once per connection rather than once per request
+    DATABASES['default'].setdefault('CONN_MAX_AGE', 600)
+
 # AUTH_USER_MODEL = 'accounts.User'
 
+# email or username logins; no ModelBackend, it would hash in the request
+# thread, outside the password hashing pool
 AUTHENTICATION_BACKENDS = [
     'employee.coustomEmailbackend.EmailBackend',
-    'django.contrib.auth.backends.ModelBackend',
 ]
 
 
+# Process-local by default. Any Django cache backend can be swapped in, e.g.
+# 'django.core.cache.backends.filebased.FileBasedCache' with a LOCATION
+# directory, or 'django.core.cache.backends.redis.RedisCache' with a URL;
+# MAX_ENTRIES bounds the size, least recently used entries go first
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+        'OPTIONS': {'MAX_ENTRIES': 500},
+    },
+}
+
+# Users (with their profile) looked up by the JWT and email backends are
+# cached for a short time; point USER_CACHE_ALIAS at a shared cache when
+# running several workers so invalidations reach all of them
+USER_CACHE_ALIAS = 'default'
+USER_CACHE_TTL = 60
+
+# Serve the hot read endpoints with the async views (employee.async_views);
+# leave_app/asgi.py turns this on, WSGI deployments keep the sync views
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', '').lower() in ('1', 'true')
+
+# Manager listings are cached per revision (see employee.response_cache)
+RESPONSE_CACHE_ALIAS = 'responses'
+RESPONSE_CACHE_TTL = 300
+
+
+# The first hasher is used for new passwords; logins with a password stored
+# by any other one re-hash it transparently. e.g. PASSWORD_HASHER=
+# django.contrib.auth.hashers.Argon2PasswordHasher (needs argon2-cffi)
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+if os.getenv('PASSWORD_HASHER'):
+    PASSWORD_HASHERS = [os.getenv('PASSWORD_HASHER')] + [
+        hasher for hasher in PASSWORD_HASHERS if hasher != os.getenv('PASSWORD_HASHER')
+    ]
+
+# Login password checks run in a bounded pool (employee.password_hashing);
+# once PASSWORD_HASH_MAX_QUEUE checks are waiting, logins get a 429
+PASSWORD_HASH_EXECUTOR = os.getenv('PASSWORD_HASH_EXECUTOR', 'thread')
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 0)) or None
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv('PASSWORD_HASH_MAX_QUEUE', 8))
+
+# Every request is timed (employee.instrumentation): queries, SQL, serializer
+# and render time go into a Server-Timing header and histograms served at
+# /metrics (behind METRICS_TOKEN; without one, only when DEBUG is on),
+# requests slower than SLOW_REQUEST_THRESHOLD seconds are logged to
+# 'employee.slow_requests'
+INSTRUMENTATION_SERVER_TIMING = os.getenv('INSTRUMENTATION_SERVER_TIMING', 'true').lower() in ('1', 'true')
+SLOW_REQUEST_THRESHOLD = float(os.getenv('SLOW_REQUEST_THRESHOLD', 0.5))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Leave status notifications are queued in the outbox table with the status
+# change and sent by `manage.py send_notifications`; failed sends are retried
+# after OUTBOX_RETRY_DELAY seconds, doubling, up to OUTBOX_MAX_ATTEMPTS times
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', '').lower() in ('1', 'true')
+EMAIL_TIMEOUT = 10
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'webmaster@localhost')
+OUTBOX_RETRY_DELAY = int(os.getenv('OUTBOX_RETRY_DELAY', 60))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 5))
+
+# `manage.py reset_balances` opens each year: every profile gets these days
+# per leave type plus its unused days up to the carry-forward limit
+LEAVE_ALLOWANCES = {'casual': 10, 'sick': 10}
+LEAVE_CARRY_FORWARD = {'casual': 5, 'sick': 0}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -155,11 +261,15 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'employee.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'employee.instrumentation.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10
 }
@@ -180,6 +290,12 @@ SIMPLE_JWT = {
     'TOKEN_TYPE_CLAIM': 'token_type',
 }
 
+# Refresh tokens are checked against an in-process copy of the blacklist
+# (employee.token_blacklist), re-synced with the table at most this often.
+# Expired tokens are removed by `manage.py purge_tokens`.
+TOKEN_BLACKLIST_SYNC_INTERVAL = 1
+TOKEN_BLACKLIST_FULL_SYNC_INTERVAL = 300
+
 CSRF_USE_SESSIONS = False
 
 CORS_ALLOW_HEADERS = [
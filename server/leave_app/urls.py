@@ -21,6 +21,7 @@ from django.conf.urls.static import static
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+from employee.instrumentation import metrics_view
 
 schema_view = get_schema_view(
    openapi.Info(
@@ -38,6 +39,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/employee/', include('employee.urls')),
     path('api/manager/', include('manager.urls')),
+    path('metrics', metrics_view, name='metrics'),
     
     # API Documentation
     path('swagger<format>/', schema_view.without_ui(cache_timeout=0), name='schema-json'),
@@ -0,0 +1,152 @@
+import calendar
+from collections import Counter
+from datetime import date, timedelta
+from django.db.models import Avg, Count, Max, Q, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from employee.models import LeaveRequest
+from .filters import filter_leaves
+
+STATUSES = [status for status, _ in LeaveRequest.STATUS_CHOICES]
+# upper bounds (exclusive) of the approval latency histogram
+LATENCY_BUCKETS = (
+    ('under_1_day', timedelta(days=1)),
+    ('1_to_3_days', timedelta(days=3)),
+    ('3_to_7_days', timedelta(days=7)),
+    ('over_7_days', None),
+)
+
+
+def _rate(rejected, approved):
+    decided = rejected + approved
+    return round(rejected / decided, 4) if decided else None
+
+
+def _hours(duration):
+    return None if duration is None else round(duration.total_seconds() / 3600, 2)
+
+
+def report_window(params):
+    """ (date_from, date_to) from the query string, this calendar year by default """
+    params = dict(params)
+    today = timezone.localdate()
+    params.setdefault('date_from', date(today.year, 1, 1).isoformat())
+    params.setdefault('date_to', date(today.year, 12, 31).isoformat())
+    return params
+
+
+class LeaveReport:
+    """
+    Absenteeism, rejection and approval latency figures for the leaves
+    overlapping a date window. Every figure is one GROUP BY in the database,
+    so the work in Python depends on the number of distinct groups, not on
+    the number of leaves: absent days per month and weekday are spread from
+    the distinct (start, end) spans of approved leaves, with a count of
+    leaves per span.
+    """
+
+    def __init__(self, params, top=50):
+        params = report_window(params)
+        self.queryset = filter_leaves(LeaveRequest.objects.all(), params)
+        self.date_from = parse_date(params['date_from'])
+        self.date_to = parse_date(params['date_to'])
+        self.top = top
+
+    def as_dict(self):
+        by_type = self.by_leave_type()
+        totals = {
+            'requests': {status: sum(row['requests'][status] for row in by_type.values()) for status in STATUSES},
+            'days': {status: sum(row['days'][status] for row in by_type.values()) for status in STATUSES},
+        }
+        totals['rejection_rate'] = _rate(totals['requests']['rejected'], totals['requests']['approved'])
+        by_month, by_weekday = self.absent_days()
+        return {
+            'window': {'date_from': self.date_from.isoformat(), 'date_to': self.date_to.isoformat()},
+            'totals': totals,
+            'by_leave_type': by_type,
+            'absent_days_by_month': by_month,
+            'absent_days_by_weekday': by_weekday,
+            'top_employees': self.top_employees(),
+            'approval_latency': self.approval_latency(),
+        }
+
+    def by_leave_type(self):
+        result = {
+            leave_type: {'requests': dict.fromkeys(STATUSES, 0), 'days': dict.fromkeys(STATUSES, 0)}
+            for leave_type, _ in LeaveRequest.LEAVE_TYPE_CHOICES
+        }
+        rows = (
+            self.queryset.order_by().values('leave_type', 'status')
+            .annotate(requests=Count('id'), days=Sum('no_days'))
+        )
+        for row in rows:
+            result[row['leave_type']]['requests'][row['status']] = row['requests']
+            result[row['leave_type']]['days'][row['status']] = row['days']
+        for row in result.values():
+            row['rejection_rate'] = _rate(row['requests']['rejected'], row['requests']['approved'])
+        return result
+
+    def absent_days(self):
+        """ Approved days of leave inside the window per month and per weekday """
+        # grouped on the raw columns, dates are taken in Python: leaves are
+        # midnight aligned, so this gives as few groups as truncating in SQL
+        # without a date conversion per row
+        spans = (
+            self.queryset.filter(status='approved').order_by()
+            .values('start_date', 'end_date')
+            .annotate(leaves=Count('id'))
+        )
+        by_month, by_weekday = Counter(), Counter()
+        for span in spans:
+            day = max(timezone.localtime(span['start_date']).date(), self.date_from)
+            last = min(timezone.localtime(span['end_date']).date(), self.date_to)
+            while day <= last:
+                by_month[f'{day.year}-{day.month:02d}'] += span['leaves']
+                by_weekday[day.weekday()] += span['leaves']
+                day += timedelta(days=1)
+        return (
+            dict(sorted(by_month.items())),
+            {calendar.day_name[weekday]: by_weekday[weekday] for weekday in range(7)},
+        )
+
+    def top_employees(self):
+        """ Employees with the most approved days, with their rejection rates """
+        rows = (
+            self.queryset.order_by().values('user_id', 'user__email')
+            .annotate(
+                requests=Count('id'),
+                approved=Count('id', filter=Q(status='approved')),
+                rejected=Count('id', filter=Q(status='rejected')),
+                approved_days=Sum('no_days', filter=Q(status='approved'), default=0),
+            )
+            .order_by('-approved_days', 'user_id')[:self.top]
+        )
+        return [
+            {
+                'user': row['user_id'], 'email': row['user__email'], 'requests': row['requests'],
+                'approved_days': row['approved_days'], 'rejection_rate': _rate(row['rejected'], row['approved']),
+            }
+            for row in rows
+        ]
+
+    def approval_latency(self):
+        """ Time from request to approval or rejection, for leaves that record both """
+        buckets, lower = {}, None
+        for name, upper in LATENCY_BUCKETS:
+            condition = Q()
+            if lower is not None:
+                condition &= Q(decision_latency__gte=lower)
+            if upper is not None:
+                condition &= Q(decision_latency__lt=upper)
+            buckets[name] = Count('id', filter=condition)
+            lower = upper
+        row = (
+            self.queryset.filter(status__in=['approved', 'rejected'], decision_latency__isnull=False)
+            .aggregate(decided=Count('id'), avg=Avg('decision_latency'), max=Max('decision_latency'), **buckets)
+        )
+        return {
+            'decided': row['decided'],
+            'avg_hours': _hours(row['avg']),
+            'max_hours': _hours(row['max']),
+            'buckets': {name: row[name] for name, _ in LATENCY_BUCKETS},
+        }
@@ -0,0 +1,45 @@
+from asgiref.sync import sync_to_async
+from rest_framework.request import Request
+from employee.async_views import AsyncAPIView
+from employee.fast_serializers import get_fast_serializer
+from employee.models import LeaveRequest, Profile
+from employee.revisions import ALL_USERS
+from employee.serializers import LeaveRequestSerializer, ProfileSerializer
+from employee.summaries import asummaries_for, parse_year
+from .filters import filter_leaves
+from .pagination import LeaveCursorPagination
+
+
+class AsyncAllUsersView(AsyncAPIView):
+    admin_only = True
+    cache_responses = True
+
+    def revision_key(self, request):
+        return ALL_USERS
+
+    async def get(self, request):
+        serializer = get_fast_serializer(ProfileSerializer)
+        rows = serializer.values(Profile.objects.filter(user__is_superuser=False))
+        users = serializer.serialize([row async for row in rows])
+        summaries = await asummaries_for([row['user']['id'] for row in users], parse_year(request.GET.get('year')))
+        for row in users:
+            row['leave_summary'] = summaries[row['user']['id']]
+        return users
+
+
+class AsyncLeaveView(AsyncAPIView):
+    admin_only = True
+    cache_responses = True
+    pagination_class = LeaveCursorPagination
+
+    def revision_key(self, request):
+        return ALL_USERS
+
+    async def get(self, request):
+        serializer = get_fast_serializer(LeaveRequestSerializer)
+        request = Request(request)
+        leaves = filter_leaves(serializer.values(LeaveRequest.objects.all()), request.query_params)
+        paginator = self.pagination_class()
+        # the paginator evaluates the page itself, with the sync ORM
+        page = await sync_to_async(paginator.paginate_queryset)(leaves, request, view=self)
+        return paginator.get_paginated_response(serializer.serialize(page)).data
@@ -0,0 +1,168 @@
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Case, F, When
+from employee.balances import BALANCE_FIELDS, deducted_days, status_change_delta
+from employee.models import LeaveBalanceEntry, LeaveRequest, LeaveSummary, Profile
+from employee.outbox import notify_status_changes
+from employee.revisions import bump_users
+from employee.team_coverage import TeamCoverage
+from employee.user_cache import invalidate_users
+
+
+def active_intervals(leaves):
+    """
+    {user id: {leave id: (start, end)}} of the active leaves of the owners
+    of leaves, over the span of all of them, read with one range query. Any
+    of leaves may be rejected and then revived by a batch, which keeps this
+    current as it changes statuses, so a revival is checked against earlier
+    items too.
+    """
+    if not leaves:
+        return {}
+    intervals = {leave.user_id: {} for leave in leaves}
+    rows = (
+        LeaveRequest.objects.active()
+        .filter(
+            user_id__in=intervals,
+            start_date__lte=max(leave.end_date for leave in leaves),
+            end_date__gte=min(leave.start_date for leave in leaves),
+        )
+        .values_list('id', 'user_id', 'start_date', 'end_date')
+    )
+    for leave_id, user_id, start, end in rows:
+        intervals[user_id][leave_id] = (start, end)
+    return intervals
+
+
+def apply_bulk_status(items, actor=None):
+    """
+    Apply many status changes in one transaction with set-based statements:
+    one locking SELECT for the leaves and one for the affected profiles, one
+    ledger read for what approved leaves had deducted, one range query for
+    the active leaves revived ones would collide with, one UPDATE per
+    distinct (status, reason_not_approved) pair, a single CASE UPDATE for
+    all balance deltas, one bulk INSERT into the ledger and one
+    LeaveSummary UPDATE per affected (user, year, leave type). Teams with
+    an absence cap add one locking SELECT and one range query per team, and
+    the employees' notifications go into the outbox with one INSERT.
+
+    items is a list of dicts with id, status and optional reason_not_approved.
+    Returns one result dict per item, in the same order. Items that fail
+    (unknown id, overlap, team cap, insufficient balance) are reported and skipped,
+    the rest are still applied.
+    """
+    results = [{'id': item['id'], 'status': item['status']} for item in items]
+
+    with transaction.atomic():
+        leaves = LeaveRequest.objects.select_for_update().in_bulk([item['id'] for item in items])
+
+        user_ids = {leave.user_id for leave in leaves.values()}
+        balances = {
+            row['user_id']: row
+            for row in Profile.objects.select_for_update().filter(user_id__in=user_ids)
+            .values('user_id', 'team_id', *BALANCE_FIELDS.values())
+        }
+        # reversals give back what the ledger says was deducted
+        deducted = deducted_days([leave.id for leave in leaves.values() if leave.status == 'approved'])
+        active = active_intervals(list(leaves.values()))
+        coverages = TeamCoverage.for_leaves(
+            leaves.values(), {user_id: row['team_id'] for user_id, row in balances.items()},
+        )
+
+        changed = {}
+        deltas = defaultdict(int)
+        summary_deltas = defaultdict(lambda: defaultdict(int))
+        entries = []
+        for item, result in zip(items, results):
+            leave = leaves.get(item['id'])
+            if leave is None:
+                result['error'] = "Leave request not found."
+                continue
+
+            new_status = item['status']
+            reason_not_approved = item.get('reason_not_approved', leave.reason_not_approved)
+            if leave.status == new_status and leave.reason_not_approved == reason_not_approved:
+                result['result'] = 'unchanged'
+                continue
+
+            if leave.status == 'rejected' and new_status != 'rejected' and any(
+                start <= leave.end_date and end >= leave.start_date
+                for leave_id, (start, end) in active[leave.user_id].items() if leave_id != leave.id
+            ):
+                result['error'] = "Employee already has leave on these dates."
+                continue
+
+            coverage = coverages.get(balances[leave.user_id]['team_id'])
+            if coverage is not None and new_status == 'approved' and leave.status != 'approved':
+                full_day = coverage.full_day(leave.start_date, leave.end_date)
+                if full_day is not None:
+                    result['error'] = f"Too many of the team are already on leave on {full_day.isoformat()}."
+                    continue
+
+            delta, reason = status_change_delta(leave, leave.status, new_status, deducted.get(leave.id))
+            field = BALANCE_FIELDS.get(leave.leave_type)
+            if delta and field:
+                balance = balances[leave.user_id][field] + delta
+                if balance < 0:
+                    result['error'] = f"Insufficient {leave.leave_type} leave balance."
+                    continue
+                # a later item for the same leave settles against this one
+                if reason == 'approval':
+                    deducted[leave.id] = -delta
+                else:
+                    deducted.pop(leave.id, None)
+                balances[leave.user_id][field] = balance
+                deltas[(leave.user_id, field)] += delta
+                entries.append(LeaveBalanceEntry(
+                    user_id=leave.user_id, leave=leave, leave_type=leave.leave_type, delta=delta,
+                    balance_after=balance, reason=reason, created_by=actor,
+                ))
+
+            user_id, year, leave_type, old_status, no_days = leave.get_summary_state()
+            summary_deltas[(user_id, year, leave_type)][old_status] -= no_days
+            summary_deltas[(user_id, year, leave_type)][new_status] += no_days
+
+            # a later item for the same leave sees this one's outcome
+            status_changed = leave.status != new_status or changed.get(leave.id, (None, None, False))[2]
+            leave.status = new_status
+            leave.reason_not_approved = reason_not_approved
+            if coverage is not None:
+                coverage.update(leave)
+            if new_status == 'rejected':
+                active[leave.user_id].pop(leave.id, None)
+            else:
+                active[leave.user_id][leave.id] = (leave.start_date, leave.end_date)
+            changed[leave.id] = (new_status, reason_not_approved, status_changed)
+            result['result'] = 'updated'
+
+        grouped = defaultdict(list)
+        for leave_id, key in changed.items():
+            grouped[key].append(leave_id)
+        for (new_status, reason_not_approved, status_changed), ids in grouped.items():
+            decision = LeaveRequest.decision_fields(new_status) if status_changed else {}
+            LeaveRequest.objects.filter(id__in=ids).update(
+                status=new_status, reason_not_approved=reason_not_approved, **decision,
+            )
+
+        LeaveSummary.apply_deltas(summary_deltas)
+        if changed:
+            bump_users({leaves[leave_id].user_id for leave_id in changed})
+            notify_status_changes([
+                leaves[leave_id] for leave_id, (_, _, status_changed) in changed.items() if status_changed
+            ])
+
+        if deltas:
+            changes = {
+                field: Case(
+                    *[When(user_id=user_id, then=F(field) + delta)
+                      for (user_id, delta_field), delta in deltas.items() if delta_field == field],
+                    default=F(field),
+                )
+                for field in {field for _, field in deltas}
+            }
+            changed_users = {user_id for user_id, _ in deltas}
+            Profile.objects.filter(user_id__in=changed_users).update(**changes)
+            LeaveBalanceEntry.objects.bulk_create(entries)
+            transaction.on_commit(lambda: invalidate_users(changed_users))
+
+    return results
@@ -0,0 +1,76 @@
+import csv
+import json
+from itertools import islice
+from employee.fast_serializers import get_fast_serializer
+from employee.serializers import LeaveRequestSerializer
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+CONTENT_TYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+# spreadsheets run a cell starting with one of these as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class _Echo:
+    """ File-like object whose write() hands the line back to csv.writer's caller """
+
+    def write(self, value):
+        return value
+
+
+def _flatten(data, prefix=''):
+    """ Nested serializer output as flat 'user.email'-style columns for CSV """
+    flat = {}
+    for name, value in data.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f'{prefix}{name}.'))
+        else:
+            flat[f'{prefix}{name}'] = value
+    return flat
+
+
+def _neutralize(value):
+    """ Text cell with a leading quote if a spreadsheet would evaluate it """
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _columns(steps, prefix=''):
+    columns = []
+    for name, path, field, nested in steps:
+        if nested is not None:
+            columns.extend(_columns(nested, f'{prefix}{name}.'))
+        else:
+            columns.append(f'{prefix}{name}')
+    return columns
+
+
+def iter_leave_rows(queryset, chunk_size=2000):
+    """
+    Serialized leaves (same shape as the admin listing) ordered like the
+    feed. Rows are read through a server-side cursor where the database
+    has one and serialized chunk by chunk, so memory use doesn't depend
+    on how many rows are exported.
+    """
+    serializer = get_fast_serializer(LeaveRequestSerializer)
+    rows = serializer.values(queryset.order_by('start_date', 'id')).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield from serializer.serialize(chunk)
+
+
+def iter_export(queryset, fmt, chunk_size=2000):
+    """ Yield the export of queryset as CSV or JSONL text, one line at a time """
+    rows = iter_leave_rows(queryset, chunk_size)
+    if fmt == 'jsonl':
+        for row in rows:
+            yield json.dumps(row) + '\n'
+        return
+
+    columns = _columns(get_fast_serializer(LeaveRequestSerializer).steps)
+    writer = csv.DictWriter(_Echo(), fieldnames=columns)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow({name: _neutralize(value) for name, value in _flatten(row).items()})
@@ -0,0 +1,53 @@
+from datetime import timedelta
+from django.utils.dateparse import parse_date
+from rest_framework import serializers
+from employee.working_days import day_start
+from employee.models import LeaveRequest
+
+
+def _parse_date_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    parsed = parse_date(value)
+    if parsed is None:
+        raise serializers.ValidationError({name: "Enter a valid date in YYYY-MM-DD format."})
+    return parsed
+
+
+def filter_leaves(queryset, params):
+    """
+    Apply the admin listing filters taken from the query string:
+    status, leave_type, user (id) and a date_from/date_to window.
+    A leave matches the window when any of its days fall inside it.
+    """
+    leave_status = params.get('status')
+    if leave_status:
+        if leave_status not in dict(LeaveRequest.STATUS_CHOICES):
+            raise serializers.ValidationError({"status": "Invalid status."})
+        queryset = queryset.filter(status=leave_status)
+
+    leave_type = params.get('leave_type')
+    if leave_type:
+        if leave_type not in dict(LeaveRequest.LEAVE_TYPE_CHOICES):
+            raise serializers.ValidationError({"leave_type": "Invalid leave type."})
+        queryset = queryset.filter(leave_type=leave_type)
+
+    user_id = params.get('user')
+    if user_id:
+        if not user_id.isdigit():
+            raise serializers.ValidationError({"user": "User must be an id."})
+        queryset = queryset.filter(user_id=int(user_id))
+
+    date_from = _parse_date_param(params, 'date_from')
+    date_to = _parse_date_param(params, 'date_to')
+    if date_from and date_to and date_from > date_to:
+        raise serializers.ValidationError({"date_to": "date_to cannot be before date_from."})
+    # compare against datetime bounds rather than __date so the
+    # (…, start_date, id) indexes stay usable
+    if date_from:
+        queryset = queryset.filter(end_date__gte=day_start(date_from))
+    if date_to:
+        queryset = queryset.filter(start_date__lt=day_start(date_to + timedelta(days=1)))
+
+    return queryset
@@ -0,0 +1,9 @@
+from rest_framework.pagination import CursorPagination
+
+
+class LeaveCursorPagination(CursorPagination):
+    """ keyset pagination for the admin leave feed, ordered by (start_date, id) """
+    ordering = ('start_date', 'id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
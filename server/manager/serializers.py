@@ -0,0 +1,12 @@
+from rest_framework import serializers
+from employee.models import LeaveRequest
+
+
+class LeaveStatusItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=LeaveRequest.STATUS_CHOICES)
+    reason_not_approved = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+
+
+class BulkLeaveStatusSerializer(serializers.Serializer):
+    items = LeaveStatusItemSerializer(many=True, allow_empty=False, max_length=1000)
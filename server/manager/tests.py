@@ -1,3 +1,710 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework.exceptions import ValidationError
+from employee.balances import change_balance
+from employee.response_cache import response_cache_stats
+from employee.models import Holiday, LeaveBalanceEntry, LeaveRequest, LeaveSummary, OutboxMessage, Profile, Team
+from employee.outbox import MAX_ATTEMPTS, deliver_batch
+from employee.working_days import holiday_calendar
+from employee.user_import import UserImporter
+from employee.tests import ALL_WEEKDAYS, AsyncViewTestMixin, QueryCountMixin
+from .async_views import AsyncAllUsersView, AsyncLeaveView
 
-# Create your tests here.
+User = get_user_model()
+
+
+@ALL_WEEKDAYS
+class ManagerTestCase(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='pass12345')
+        self.employee = User.objects.create_user(username='emp', email='emp@example.com', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        caches['default'].clear()
+        caches['responses'].clear()
+        response_cache_stats.reset()
+
+    def make_leave(self, user, offset, days=1, **kwargs):
+        start = timezone.now() + timedelta(days=offset)
+        kwargs.setdefault('leave_type', 'casual')
+        kwargs.setdefault('reason', 'test')
+        return LeaveRequest.objects.create(
+            user=user, start_date=start, end_date=start + timedelta(days=days - 1), **kwargs
+        )
+
+
+class LeaveFeedTests(QueryCountMixin, ManagerTestCase):
+    def test_cursor_pages_cover_every_leave_in_order(self):
+        leaves = [self.make_leave(self.employee, offset) for offset in range(7)]
+
+        seen = []
+        response = self.client.get('/api/manager/leaves/', {'page_size': 3})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen.extend(row['id'] for row in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+
+        self.assertEqual(seen, [leave.id for leave in leaves])
+
+    def test_filters(self):
+        pending = self.make_leave(self.employee, 1)
+        self.make_leave(self.employee, 5, status='approved')
+        sick = self.make_leave(self.admin, 10, leave_type='sick')
+
+        response = self.client.get('/api/manager/leaves/', {'status': 'pending', 'user': self.employee.id})
+        self.assertEqual([row['id'] for row in response.data['results']], [pending.id])
+
+        response = self.client.get('/api/manager/leaves/', {'leave_type': 'sick'})
+        self.assertEqual([row['id'] for row in response.data['results']], [sick.id])
+
+        window_start = (timezone.now() + timedelta(days=9)).date()
+        response = self.client.get('/api/manager/leaves/', {'date_from': window_start.isoformat()})
+        self.assertEqual([row['id'] for row in response.data['results']], [sick.id])
+
+    def test_query_count_is_constant(self):
+        self.make_leave(self.employee, 1)
+        self.assertConstantQueries(
+            '/api/manager/leaves/',
+            lambda: [self.make_leave(self.employee, offset) for offset in range(2, 12)],
+        )
+
+    def test_invalid_filter_is_rejected(self):
+        response = self.client.get('/api/manager/leaves/', {'date_from': 'not-a-date'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(self.employee)
+        response = self.client.get('/api/manager/leaves/')
+        self.assertEqual(response.status_code, 403)
+
+
+class AllUsersTests(QueryCountMixin, ManagerTestCase):
+    def test_query_count_is_constant(self):
+        self.assertConstantQueries(
+            '/api/manager/all-users/',
+            lambda: [
+                User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='pass12345')
+                for i in range(10)
+            ],
+        )
+
+    def test_etag_follows_bulk_changes(self):
+        leave = self.make_leave(self.employee, 2)
+        url = '/api/manager/all-users/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/manager/leaves/bulk-status/', {
+                'items': [{'id': leave.id, 'status': 'approved'}],
+            }, format='json')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['leave_summary']['casual']['approved'], 1)
+
+
+class LeaveStatusTests(ManagerTestCase):
+    def set_status(self, leave, new_status):
+        leave.refresh_from_db()
+        return self.client.put(f'/api/manager/leave/{leave.id}/status/', {
+            'leave_type': leave.leave_type,
+            'start_date': leave.start_date.isoformat(),
+            'end_date': leave.end_date.isoformat(),
+            'status': new_status,
+        }, format='json')
+
+    def test_approval_and_reversal_are_recorded_in_ledger(self):
+        leave = self.make_leave(self.employee, 2, days=3)
+
+        self.assertEqual(self.set_status(leave, 'approved').status_code, 200)
+        self.employee.profile.refresh_from_db()
+        self.assertEqual(self.employee.profile.casual_leave_balance, 7)
+
+        self.assertEqual(self.set_status(leave, 'rejected').status_code, 200)
+        self.employee.profile.refresh_from_db()
+        self.assertEqual(self.employee.profile.casual_leave_balance, 10)
+
+        entries = LeaveBalanceEntry.objects.filter(user=self.employee).order_by('id')
+        self.assertEqual(
+            [(e.reason, e.delta, e.balance_after) for e in entries],
+            [('approval', -3, 7), ('reversal', 3, 10)],
+        )
+        self.assertEqual(entries[0].created_by, self.admin)
+
+    def test_repeated_approval_deducts_once(self):
+        leave = self.make_leave(self.employee, 2, days=2)
+        self.set_status(leave, 'approved')
+        self.set_status(leave, 'approved')
+        self.employee.profile.refresh_from_db()
+        self.assertEqual(self.employee.profile.casual_leave_balance, 8)
+
+    def add_holiday_in(self, leave):
+        with self.captureOnCommitCallbacks(execute=True):
+            Holiday.objects.create(date=timezone.localdate(leave.start_date) + timedelta(days=1), name='holiday')
+        self.addCleanup(holiday_calendar.reset)
+
+    def test_reversal_refunds_what_was_deducted(self):
+        leave = self.make_leave(self.employee, 2, days=4)
+        self.set_status(leave, 'approved')
+        # the calendar changes after the approval: the leave keeps its length
+        self.add_holiday_in(leave)
+        self.assertEqual(self.set_status(leave, 'rejected').status_code, 200)
+        leave.refresh_from_db()
+        self.assertEqual(leave.no_days, 4)
+        self.employee.profile.refresh_from_db()
+        self.assertEqual(self.employee.profile.casual_leave_balance, 10)
+
+    def test_legacy_approved_leave_is_refunded_in_full_either_way(self):
+        # approved before the ledger: 7 days deducted, no entries
+        legacy = [self.make_leave(self.employee, offset, days=7, status='approved') for offset in (2, 12)]
+        Profile.objects.filter(user=self.employee).update(casual_leave_balance=10 + 7)
+        self.add_holiday_in(legacy[0])
+        self.add_holiday_in(legacy[1])
+
+        self.set_status(legacy[0], 'rejected')
+        self.client.post('/api/manager/leaves/bulk-status/', {'items': [
+            {'id': legacy[1].id, 'status': 'rejected'},
+        ]}, format='json')
+
+        self.assertEqual([leave.no_days for leave in LeaveRequest.objects.order_by('id')], [7, 7])
+        self.employee.profile.refresh_from_db()
+        self.assertEqual(self.employee.profile.casual_leave_balance, 10 + 7 + 14)
+
+    def test_bulk_reversal_after_approval_in_the_same_batch(self):
+        leave = self.make_leave(self.employee, 2, days=3)
+        self.client.post('/api/manager/leaves/bulk-status/', {'items': [
+            {'id': leave.id, 'status': 'approved'}, {'id': leave.id, 'status': 'rejected'},
+        ]}, format='json')
+        self.employee.profile.refresh_from_db()
+        self.assertEqual(self.employee.profile.casual_leave_balance, 10)
+
+    def test_overdraw_is_refused(self):
+        leave = self.make_leave(self.employee, 2, days=2, leave_type='sick')
+        Profile.objects.filter(user=self.employee).update(sick_leave_balance=1)
+        with self.assertRaises(ValidationError):
+            change_balance(self.employee.id, 'sick', -leave.no_days, 'approval', leave)
+        self.assertFalse(LeaveBalanceEntry.objects.exists())
+
+
+class LeaveBulkStatusTests(ManagerTestCase):
+    url = '/api/manager/leaves/bulk-status/'
+
+    def test_bulk_update_with_per_item_results(self):
+        first = self.make_leave(self.employee, 2, days=3)
+        second = self.make_leave(self.employee, 10, days=4, leave_type='sick')
+        third = self.make_leave(self.admin, 2, days=2)
+
+        response = self.client.post(self.url, {'items': [
+            {'id': first.id, 'status': 'approved'},
+            {'id': second.id, 'status': 'rejected', 'reason_not_approved': 'busy'},
+            {'id': third.id, 'status': 'approved'},
+            {'id': 999999, 'status': 'approved'},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row.get('result', row.get('error')) for row in response.data['results']],
+            ['updated', 'updated', 'updated', 'Leave request not found.'],
+        )
+        second.refresh_from_db()
+        self.assertEqual((second.status, second.reason_not_approved), ('rejected', 'busy'))
+        self.employee.profile.refresh_from_db()
+        self.assertEqual(self.employee.profile.casual_leave_balance, 7)
+        self.admin.profile.refresh_from_db()
+        self.assertEqual(self.admin.profile.casual_leave_balance, 8)
+        self.assertEqual(LeaveBalanceEntry.objects.count(), 2)
+        summary = LeaveSummary.objects.get(user=self.employee, leave_type='sick')
+        self.assertEqual((summary.pending_days, summary.rejected_days), (0, 4))
+
+    def test_insufficient_balance_only_fails_that_item(self):
+        Profile.objects.filter(user=self.employee).update(casual_leave_balance=4)
+        first = self.make_leave(self.employee, 2, days=3)
+        second = self.make_leave(self.employee, 10, days=3)
+
+        response = self.client.post(self.url, {'items': [
+            {'id': first.id, 'status': 'approved'},
+            {'id': second.id, 'status': 'approved'},
+        ]}, format='json')
+
+        self.assertEqual(response.data['results'][1]['error'], 'Insufficient casual leave balance.')
+        second.refresh_from_db()
+        self.assertEqual(second.status, 'pending')
+        self.employee.profile.refresh_from_db()
+        self.assertEqual(self.employee.profile.casual_leave_balance, 1)
+
+    def test_revivals_are_checked_against_each_other(self):
+        first = self.make_leave(self.employee, 2, days=3, status='rejected')
+        second = self.make_leave(self.employee, 3, days=3, status='rejected')
+        third = self.make_leave(self.employee, 4, status='pending')
+
+        response = self.client.post(self.url, {'items': [
+            {'id': first.id, 'status': 'pending'},
+            {'id': second.id, 'status': 'approved'},
+            # rejecting a leave frees its dates for the next items
+            {'id': first.id, 'status': 'rejected'},
+            {'id': third.id, 'status': 'rejected'},
+            {'id': second.id, 'status': 'approved'},
+        ]}, format='json')
+
+        self.assertEqual(
+            [row.get('result', row.get('error')) for row in response.data['results']],
+            ['updated', 'Employee already has leave on these dates.', 'updated', 'updated', 'updated'],
+        )
+        self.assertEqual(list(LeaveRequest.objects.active().values_list('id', flat=True)), [second.id])
+
+    def test_leave_rejected_and_revived_in_one_batch(self):
+        leave = self.make_leave(self.employee, 2, days=3, status='approved')
+        other = self.make_leave(self.admin, 2, days=3, status='pending')
+        clash = self.make_leave(self.employee, 3, status='rejected')
+
+        response = self.client.post(self.url, {'items': [
+            {'id': leave.id, 'status': 'rejected'},
+            {'id': other.id, 'status': 'rejected'},
+            {'id': clash.id, 'status': 'pending'},
+            {'id': leave.id, 'status': 'approved'},
+            {'id': other.id, 'status': 'approved'},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row.get('result', row.get('error')) for row in response.data['results']],
+            ['updated', 'updated', 'updated', 'Employee already has leave on these dates.', 'updated'],
+        )
+        self.assertEqual(
+            sorted(LeaveRequest.objects.active().values_list('id', flat=True)), sorted([other.id, clash.id]),
+        )
+
+    def test_revival_query_count_does_not_grow_with_batch_size(self):
+        def run(leaves):
+            return self.client.post(self.url, {'items': [
+                {'id': leave.id, 'status': 'pending'} for leave in leaves
+            ]}, format='json')
+
+        leave = self.make_leave(self.employee, 2, status='rejected')
+        with CaptureQueriesContext(connection) as small:
+            run([leave])
+        leaves = [self.make_leave(self.employee, offset, status='rejected') for offset in range(3, 9)]
+        with CaptureQueriesContext(connection) as large:
+            run(leaves)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        def run(leaves):
+            return self.client.post(self.url, {'items': [
+                {'id': leave.id, 'status': 'approved'} for leave in leaves
+            ]}, format='json')
+
+        leave = self.make_leave(self.employee, 2)
+        with CaptureQueriesContext(connection) as small:
+            run([leave])
+        leaves = [self.make_leave(self.employee, offset) for offset in range(3, 9)]
+        with CaptureQueriesContext(connection) as large:
+            run(leaves)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+
+class TeamCapTests(ManagerTestCase):
+    def setUp(self):
+        super().setUp()
+        team = Team.objects.create(name='support', max_absent=1)
+        self.colleague = User.objects.create_user(username='col', email='col@example.com')
+        Profile.objects.filter(user__in=[self.employee, self.colleague]).update(team=team)
+
+    def test_approval_beyond_the_cap_is_refused(self):
+        first = self.make_leave(self.employee, 2, days=3)
+        second = self.make_leave(self.colleague, 4, days=2)
+        self.assertEqual(LeaveStatusTests.set_status(self, first, 'approved').status_code, 200)
+
+        response = LeaveStatusTests.set_status(self, second, 'approved')
+        self.assertEqual(response.status_code, 400)
+        second.refresh_from_db()
+        self.assertEqual(second.status, 'pending')
+        # re-approving or rejecting doesn't need room
+        self.assertEqual(LeaveStatusTests.set_status(self, first, 'approved').status_code, 200)
+        self.assertEqual(LeaveStatusTests.set_status(self, second, 'rejected').status_code, 200)
+
+    def test_bulk_approval_counts_earlier_items(self):
+        first = self.make_leave(self.employee, 2, days=3, status='approved')
+        second = self.make_leave(self.colleague, 4, days=2)
+        third = self.make_leave(self.colleague, 10)
+
+        response = self.client.post('/api/manager/leaves/bulk-status/', {'items': [
+            {'id': second.id, 'status': 'approved'},
+            {'id': first.id, 'status': 'rejected'},
+            {'id': second.id, 'status': 'approved'},
+            {'id': third.id, 'status': 'approved'},
+        ]}, format='json')
+
+        results = response.data['results']
+        self.assertIn('Too many of the team', results[0]['error'])
+        self.assertEqual([row.get('result') for row in results[1:]], ['updated', 'updated', 'updated'])
+        self.assertEqual(
+            list(LeaveRequest.objects.filter(id__in=[first.id, second.id, third.id]).order_by('id').values_list('status', flat=True)),
+            ['rejected', 'approved', 'approved'],
+        )
+
+
+class BrokenEmailBackend(BaseEmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionRefusedError("smtp down")
+
+
+class LeaseCheckingEmailBackend(BaseEmailBackend):
+    """ Notes the open atomic blocks and the leases of due messages at send time """
+    seen = []
+
+    def send_messages(self, messages):
+        leased = not OutboxMessage.objects.filter(status='pending', next_attempt_at__lte=timezone.now()).exists()
+        self.seen.append((len(connection.atomic_blocks), leased))
+        return len(messages)
+
+
+class OutboxTests(ManagerTestCase):
+    def test_status_change_is_queued_not_sent(self):
+        leave = self.make_leave(self.employee, 2, days=2)
+        LeaveStatusTests.set_status(self, leave, 'approved')
+        # settling it again is not news
+        LeaveStatusTests.set_status(self, leave, 'approved')
+
+        self.assertEqual(len(mail.outbox), 0)
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.user, message.leave, message.status), (self.employee, leave, 'pending'))
+
+        call_command('send_notifications', stdout=io.StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['emp@example.com'])
+        self.assertIn('approved', mail.outbox[0].subject)
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('sent', 1))
+
+    def test_refused_change_queues_nothing(self):
+        leave = self.make_leave(self.employee, 2, days=20)
+        self.assertEqual(LeaveStatusTests.set_status(self, leave, 'approved').status_code, 400)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_bulk_change_queues_one_message_per_leave(self):
+        leaves = [self.make_leave(self.employee, offset) for offset in (2, 4)]
+        self.client.post('/api/manager/leaves/bulk-status/', {'items': [
+            {'id': leaves[0].id, 'status': 'approved'},
+            {'id': leaves[1].id, 'status': 'rejected', 'reason_not_approved': 'busy'},
+        ]}, format='json')
+        self.assertEqual(
+            sorted(OutboxMessage.objects.values_list('leave_id', flat=True)), [leave.id for leave in leaves],
+        )
+        self.assertIn('Reason: busy', OutboxMessage.objects.get(leave=leaves[1]).body)
+
+    @override_settings(EMAIL_BACKEND='manager.tests.BrokenEmailBackend')
+    def test_failed_delivery_is_retried_with_backoff(self):
+        leave = self.make_leave(self.employee, 2, status='approved')
+        message = OutboxMessage.objects.create(user=self.employee, leave=leave, subject='s', body='b')
+
+        self.assertEqual(deliver_batch(), (0, 1))
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('pending', 1))
+        self.assertIn('smtp down', message.last_error)
+        first_delay = message.next_attempt_at - timezone.now()
+        # not due yet
+        self.assertEqual(deliver_batch(), (0, 0))
+
+        for attempt in range(2, MAX_ATTEMPTS + 1):
+            OutboxMessage.objects.filter(id=message.id).update(next_attempt_at=timezone.now())
+            deliver_batch()
+            message.refresh_from_db()
+            if attempt == 2:
+                self.assertGreater(message.next_attempt_at - timezone.now(), first_delay)
+        self.assertEqual((message.status, message.attempts), ('failed', MAX_ATTEMPTS))
+
+    @override_settings(EMAIL_BACKEND='manager.tests.LeaseCheckingEmailBackend')
+    def test_mail_is_sent_outside_the_claiming_transaction(self):
+        leave = self.make_leave(self.employee, 2, status='approved')
+        message = OutboxMessage.objects.create(user=self.employee, leave=leave, subject='s', body='b')
+        LeaseCheckingEmailBackend.seen = []
+
+        self.assertEqual(deliver_batch(), (1, 0))
+        # only the test case's own atomic blocks were open, the claim was done
+        self.assertEqual(LeaseCheckingEmailBackend.seen, [(len(connection.atomic_blocks), True)])
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('sent', 1))
+
+
+@override_settings(USER_IMPORT_HASH_WORKERS=1)
+class UserImportTests(ManagerTestCase):
+    def test_import_streams_progress_and_row_errors(self):
+        rows = [
+            {'username': 'ann', 'email': 'ann@example.com', 'password': 'pass12345', 'first_name': 'Ann'},
+            {'username': 'emp', 'email': 'new@example.com', 'password': 'pass12345'},
+            {'username': 'bob', 'email': 'not-an-email', 'password': 'pass12345'},
+            {'username': 'bob', 'email': 'bob@example.com', 'password': 'pass12345'},
+        ]
+        upload = SimpleUploadedFile('staff.jsonl', '\n'.join(json.dumps(row) for row in rows).encode())
+
+        response = self.client.post('/api/manager/users/import/', {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, 200)
+        events = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([event['row'] for event in events if event['event'] == 'error'], [2, 3])
+        self.assertEqual(events[-1], {'event': 'done', 'processed': 4, 'created': 2, 'failed': 2})
+
+        ann = User.objects.get(username='ann')
+        self.assertTrue(ann.check_password('pass12345'))
+        self.assertEqual(ann.profile.role, 'employee')
+        self.assertTrue(Profile.objects.filter(user__username='bob').exists())
+
+    def test_csv_import(self):
+        upload = SimpleUploadedFile('staff.csv', b'username,email,password\ncat,cat@example.com,pass12345\n')
+        response = self.client.post('/api/manager/users/import/', {'file': upload}, format='multipart')
+        b''.join(response.streaming_content)
+        self.assertTrue(User.objects.filter(username='cat', profile__isnull=False).exists())
+
+    def test_csv_with_byte_order_mark(self):
+        upload = SimpleUploadedFile('staff.csv', '\ufeffusername,email,password\neve,eve@example.com,pass12345\n'.encode())
+        response = self.client.post('/api/manager/users/import/', {'file': upload}, format='multipart')
+        events = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(events[-1], {'event': 'done', 'processed': 1, 'created': 1, 'failed': 0})
+
+    def test_api_imports_hash_in_a_small_pool(self):
+        with override_settings(USER_IMPORT_HASH_WORKERS=16):
+            self.assertEqual(UserImporter.for_request().workers, 2)
+            self.assertEqual(UserImporter().workers, 16)
+        with override_settings(USER_IMPORT_HASH_WORKERS=16, USER_IMPORT_API_HASH_WORKERS=4):
+            self.assertEqual(UserImporter.for_request().workers, 4)
+
+    def test_format_field_overrides_the_extension(self):
+        upload = SimpleUploadedFile('staff.txt', b'username,email,password\ndan,dan@example.com,pass12345\n')
+        response = self.client.post('/api/manager/users/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+
+        upload.seek(0)
+        response = self.client.post(
+            '/api/manager/users/import/', {'file': upload, 'file_format': 'csv'}, format='multipart',
+        )
+        self.assertEqual(response.status_code, 200)
+        b''.join(response.streaming_content)
+        self.assertTrue(User.objects.filter(username='dan').exists())
+
+
+class CalendarTests(ManagerTestCase):
+    def test_month_occupancy(self):
+        tz_now = timezone.localtime()
+        first = tz_now.replace(year=2031, month=3, day=1, hour=0, minute=0, second=0, microsecond=0)
+        spanning = LeaveRequest.objects.create(
+            user=self.employee, leave_type='casual', reason='x', status='approved',
+            start_date=first - timedelta(days=2), end_date=first + timedelta(days=1),
+        )
+        inside = LeaveRequest.objects.create(
+            user=self.admin, leave_type='sick', reason='x', status='approved',
+            start_date=first + timedelta(days=1), end_date=first + timedelta(days=3),
+        )
+        LeaveRequest.objects.create(
+            user=self.admin, leave_type='sick', reason='x', status='pending',
+            start_date=first + timedelta(days=10), end_date=first + timedelta(days=10),
+        )
+        LeaveRequest.objects.create(
+            user=self.admin, leave_type='sick', reason='x', status='approved',
+            start_date=first + timedelta(days=40), end_date=first + timedelta(days=41),
+        )
+
+        response = self.client.get('/api/manager/calendar/', {'month': '2031-03'})
+
+        self.assertEqual(response.status_code, 200)
+        days = response.data['days']
+        self.assertEqual(len(days), 31)
+        self.assertEqual(days[0], {'date': '2031-03-01', 'count': 1, 'leave_ids': [spanning.id]})
+        self.assertEqual(days[1]['leave_ids'], [spanning.id, inside.id])
+        self.assertEqual(days[3]['count'], 1)
+        self.assertEqual(days[10]['count'], 0)
+        self.assertEqual([leave['id'] for leave in response.data['leaves']], [spanning.id, inside.id])
+
+    def test_longest_leave_reaching_the_month_is_shown(self):
+        first = timezone.localtime().replace(year=2031, month=3, day=1, hour=0, minute=0, second=0, microsecond=0)
+        longest = LeaveRequest.objects.create(
+            user=self.employee, leave_type='other', reason='x', status='approved',
+            start_date=first - timedelta(days=LeaveRequest.MAX_SPAN_DAYS - 1), end_date=first,
+        )
+
+        response = self.client.get('/api/manager/calendar/', {'month': '2031-03'})
+
+        self.assertEqual(response.data['days'][0]['leave_ids'], [longest.id])
+
+    def test_employee_calendar_only_shows_own_leaves(self):
+        self.make_leave(self.admin, 1, status='approved')
+        mine = self.make_leave(self.employee, 1, status='approved')
+        self.client.force_authenticate(self.employee)
+        month = (timezone.localtime() + timedelta(days=1)).strftime('%Y-%m')
+
+        response = self.client.get('/api/employee/calendar/', {'month': month})
+
+        self.assertEqual([leave['id'] for leave in response.data['leaves']], [mine.id])
+
+    def test_invalid_month(self):
+        self.assertEqual(self.client.get('/api/manager/calendar/', {'month': '2031-13'}).status_code, 400)
+
+
+class ResponseCacheTests(ManagerTestCase):
+    def test_repeated_reads_are_served_from_cache(self):
+        self.make_leave(self.employee, 1)
+        for url in ('/api/manager/all-users/', '/api/manager/leaves/'):
+            first = self.client.get(url)
+            # only the revision lookup runs
+            with self.assertNumQueries(1):
+                second = self.client.get(url)
+            self.assertEqual(first.content, second.content)
+        self.assertEqual(self.client.get('/api/manager/cache-stats/').data, {'hits': 2, 'misses': 2, 'hit_ratio': 0.5})
+
+    def test_writes_invalidate_cached_listings(self):
+        leave = self.make_leave(self.employee, 1)
+        self.client.get('/api/manager/leaves/')
+        self.client.get('/api/manager/all-users/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(f'/api/manager/leave/{leave.id}/status/', {
+                'leave_type': leave.leave_type, 'status': 'approved',
+                'start_date': leave.start_date.isoformat(), 'end_date': leave.end_date.isoformat(),
+            }, format='json')
+        response = self.client.get('/api/manager/leaves/')
+        self.assertEqual(response.data['results'][0]['status'], 'approved')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(f'/api/manager/users/{self.employee.id}/status/')
+        response = self.client.get('/api/manager/all-users/')
+        self.assertFalse(response.data[0]['user']['is_active'])
+
+        self.client.force_authenticate(self.employee)
+        self.client.post('/api/employee/leave/', {
+            'leave_type': 'sick', 'reason': 'flu',
+            'start_date': (timezone.now() + timedelta(days=20)).isoformat(),
+            'end_date': (timezone.now() + timedelta(days=20)).isoformat(),
+        }, format='json')
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(len(self.client.get('/api/manager/leaves/').data['results']), 2)
+
+
+class AsyncViewTests(AsyncViewTestMixin, ManagerTestCase):
+    def test_responses_match_sync_views(self):
+        for offset in range(5):
+            self.make_leave(self.employee, offset * 2)
+        for view, path in (
+            (AsyncAllUsersView, '/api/manager/all-users/'),
+            (AsyncLeaveView, '/api/manager/leaves/?page_size=2&status=pending'),
+        ):
+            response = self.call_async(view, path, self.admin)
+            self.assertEqual(response.status_code, 200)
+            caches['responses'].clear()
+            self.assertEqual(response.content, self.client.get(path).content)
+
+    def test_requires_admin(self):
+        response = self.call_async(AsyncAllUsersView, '/api/manager/all-users/', self.employee)
+        self.assertEqual(response.status_code, 403)
+
+    def test_invalid_filter_is_rejected(self):
+        response = self.call_async(AsyncLeaveView, '/api/manager/leaves/?date_from=bad', self.admin)
+        self.assertEqual(response.status_code, 400)
+
+
+class LeaveExportTests(ManagerTestCase):
+    def export(self, fmt, **params):
+        response = self.client.get(f'/api/manager/leaves/export/{fmt}/', params)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_jsonl_matches_listing(self):
+        for offset in range(3):
+            self.make_leave(self.employee, offset * 2)
+        self.make_leave(self.admin, 1, leave_type='sick')
+        lines = self.export('jsonl', leave_type='casual').splitlines()
+        listing = self.client.get('/api/manager/leaves/', {'leave_type': 'casual'}).data['results']
+        self.assertEqual([json.loads(line) for line in lines], json.loads(json.dumps(listing)))
+
+    def test_csv_flattens_nested_user(self):
+        leave = self.make_leave(self.employee, 1)
+        rows = list(csv.DictReader(io.StringIO(self.export('csv'))))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual((rows[0]['id'], rows[0]['user.email']), (str(leave.id), 'emp@example.com'))
+
+    def test_csv_cells_are_not_formulas(self):
+        self.employee.first_name = '=HYPERLINK("http://example.com")'
+        self.employee.save()
+        self.make_leave(self.employee, 1, reason='@SUM(A1:A9)')
+        self.make_leave(self.employee, 3, reason='-1+2')
+        rows = list(csv.DictReader(io.StringIO(self.export('csv'))))
+        self.assertEqual(rows[0]['user.first_name'], '\'=HYPERLINK("http://example.com")')
+        self.assertEqual([row['reason'] for row in rows], ["'@SUM(A1:A9)", "'-1+2"])
+        # JSON isn't opened by spreadsheets: left as it is
+        self.assertEqual(json.loads(self.export('jsonl').splitlines()[0])['reason'], '@SUM(A1:A9)')
+
+    def test_invalid_requests_are_rejected_before_streaming(self):
+        self.assertEqual(self.client.get('/api/manager/leaves/export/xml/').status_code, 400)
+        self.assertEqual(self.client.get('/api/manager/leaves/export/csv/', {'status': 'nope'}).status_code, 400)
+
+
+class LeaveReportTests(ManagerTestCase):
+    def at(self, day, hour=0):
+        return timezone.make_aware(datetime(2025, 3, day, hour))
+
+    def add_leave(self, user, first, last, **kwargs):
+        kwargs.setdefault('leave_type', 'casual')
+        return LeaveRequest.objects.create(
+            user=user, start_date=self.at(first), end_date=self.at(last), reason='test', **kwargs
+        )
+
+    def report(self, **params):
+        params.setdefault('date_from', '2025-03-01')
+        params.setdefault('date_to', '2025-03-31')
+        response = self.client.get('/api/manager/reports/leaves/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_report(self):
+        # Mon 3 - Wed 5 March, twice; Fri 28 March - Tue 1 April (clipped to March)
+        self.add_leave(self.employee, 3, 5, status='approved')
+        self.add_leave(self.admin, 3, 5, status='approved')
+        self.add_leave(self.employee, 28, 31, status='approved', leave_type='sick')
+        self.add_leave(self.employee, 10, 10, status='rejected')
+        self.add_leave(self.employee, 12, 12)
+        LeaveRequest.objects.exclude(status='pending').update(
+            created_at=self.at(1), decided_at=self.at(2, 12), decision_latency=timedelta(hours=36),
+        )
+
+        report = self.report()
+        self.assertEqual(report['totals']['requests'], {'pending': 1, 'approved': 3, 'rejected': 1})
+        self.assertEqual(report['by_leave_type']['casual']['rejection_rate'], 0.3333)
+        self.assertEqual(report['absent_days_by_month'], {'2025-03': 10})
+        self.assertEqual(report['absent_days_by_weekday']['Monday'], 3)
+        self.assertEqual(report['absent_days_by_weekday']['Wednesday'], 2)
+        self.assertEqual(report['top_employees'][0], {
+            'user': self.employee.id, 'email': 'emp@example.com', 'requests': 4,
+            'approved_days': 7, 'rejection_rate': 0.3333,
+        })
+        self.assertEqual(report['approval_latency']['avg_hours'], 36)
+        self.assertEqual(report['approval_latency']['buckets']['1_to_3_days'], 4)
+
+    def test_decisions_are_timestamped(self):
+        leave = self.add_leave(self.employee, 3, 3)
+        self.assertIsNotNone(leave.created_at)
+        self.assertIsNone(leave.decided_at)
+        self.client.post('/api/manager/leaves/bulk-status/', {
+            'items': [{'id': leave.id, 'status': 'approved'}],
+        }, format='json')
+        leave.refresh_from_db()
+        self.assertEqual(leave.decision_latency, leave.decided_at - leave.created_at)
+
+    def test_report_follows_writes(self):
+        self.assertEqual(self.report()['totals']['requests']['approved'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_leave(self.employee, 3, 3, status='approved')
+        self.assertEqual(self.report()['totals']['requests']['approved'], 1)
@@ -1,12 +1,25 @@
+from django.conf import settings
 from django.urls import path
-from .views import AllUsersView,UserStatusView,UserView,LeaveView,LeaveStatusView
+from .views import AllUsersView,UserStatusView,UserView,UserImportView,LeaveView,LeaveStatusView,LeaveBulkStatusView,CalendarView,CacheStatsView,LoginStatsView,LeaveExportView,LeaveReportView
+from .async_views import AsyncAllUsersView, AsyncLeaveView
+
+# async versions of the hot read endpoints when served over ASGI
+all_users_view = (AsyncAllUsersView if settings.ASYNC_VIEWS else AllUsersView).as_view()
+leave_view = (AsyncLeaveView if settings.ASYNC_VIEWS else LeaveView).as_view()
 
 urlpatterns = [
-    path('all-users/', AllUsersView.as_view(), name='all_users'),
+    path('all-users/', all_users_view, name='all_users'),
     path('users/<int:pk>/status/', UserStatusView.as_view(), name='user_status'),
     path('users/create/', UserView.as_view(), name='user_vie'),
-    path('leaves/', LeaveView.as_view(), name='all_leaves'),
+    path('users/import/', UserImportView.as_view(), name='user_import'),
+    path('leaves/', leave_view, name='all_leaves'),
+    path('leaves/export/<str:fmt>/', LeaveExportView.as_view(), name='leave_export'),
     path('leave/<int:pk>/status/', LeaveStatusView.as_view(), name='leave_status'),
+    path('calendar/', CalendarView.as_view(), name='leave_calendar'),
+    path('reports/leaves/', LeaveReportView.as_view(), name='leave_report'),
+    path('leaves/bulk-status/', LeaveBulkStatusView.as_view(), name='leave_bulk_status'),
+    path('cache-stats/', CacheStatsView.as_view(), name='cache_stats'),
+    path('login-stats/', LoginStatsView.as_view(), name='login_stats'),
     
     
 ]
\ No newline at end of file
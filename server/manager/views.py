@@ -1,22 +1,45 @@
+import json
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from employee.models import Profile, LeaveRequest
 from employee.serializers import UserSerializer,ProfileSerializer,LeaveRequestSerializer
+from employee.balances import apply_status_change
+from employee.fast_serializers import get_fast_serializer
+from employee.leave_calendar import calendar_response_data
+from employee.outbox import notify_status_changes
+from employee.password_hashing import hash_pool
+from employee.response_cache import cached_response, response_cache_stats
+from employee.revisions import ALL_USERS, conditional_on
+from employee.summaries import parse_year, summaries_for
+from employee.user_import import FORMATS, UserImporter, iter_rows
+from .analytics import LeaveReport
+from .bulk_status import apply_bulk_status
+from .export import CONTENT_TYPES, EXPORT_FORMATS, iter_export
+from .filters import filter_leaves
+from .pagination import LeaveCursorPagination
+from .serializers import BulkLeaveStatusSerializer
 
 User = get_user_model()
 
 class AllUsersView(APIView):
     permission_classes = [IsAdminUser]
     
+    @conditional_on(lambda request: ALL_USERS)
+    @cached_response(lambda request: ALL_USERS)
     def get(self, request):
-        users = Profile.objects.filter(user__is_superuser=False)
-        serializer = ProfileSerializer(users, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        serializer = get_fast_serializer(ProfileSerializer)
+        users = serializer.serialize(serializer.values(Profile.objects.filter(user__is_superuser=False)))
+        summaries = summaries_for([row['user']['id'] for row in users], parse_year(request.query_params.get('year')))
+        for row in users:
+            row['leave_summary'] = summaries[row['user']['id']]
+        return Response(users, status=status.HTTP_200_OK)
     
 class UserStatusView(APIView):
     permission_classes = [IsAdminUser]
@@ -36,46 +59,129 @@ class UserView(APIView):
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class UserImportView(APIView):
+    """
+    Bulk create employees from an uploaded CSV or JSONL file (field "file").
+    The format comes from the file name's extension unless the form field
+    "file_format" names it (?format= is DRF's renderer override). Progress
+    and per-row errors are streamed back as JSON lines while the import runs.
+    """
+    permission_classes = [IsAdminUser]
+    
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"file": "A CSV or JSONL file is required."}, status=status.HTTP_400_BAD_REQUEST)
+        
+        fmt = request.data.get('file_format') or upload.name.rsplit('.', 1)[-1].lower()
+        if fmt not in FORMATS:
+            return Response({"file_format": f"Use one of: {', '.join(FORMATS)}."}, status=status.HTTP_400_BAD_REQUEST)
+        
+        events = UserImporter.for_request().iter_events(iter_rows(upload, fmt))
+        return StreamingHttpResponse(
+            (json.dumps(event) + '\n' for event in events),
+            content_type='application/x-ndjson',
+        )
             
 class LeaveView(APIView):
-    persmission_classes = [IsAdminUser]
+    permission_classes = [IsAdminUser]
+    pagination_class = LeaveCursorPagination
     
+    @conditional_on(lambda request: ALL_USERS)
+    @cached_response(lambda request: ALL_USERS)
     def get(self, request):
-        leaves = LeaveRequest.objects.all()
-        serializer = LeaveRequestSerializer(leaves, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        serializer = get_fast_serializer(LeaveRequestSerializer)
+        leaves = filter_leaves(serializer.values(LeaveRequest.objects.all()), request.query_params)
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(leaves, request, view=self)
+        return paginator.get_paginated_response(serializer.serialize(page))
+    
+class LeaveExportView(APIView):
+    """
+    Stream every leave matching the listing filters as CSV or JSONL
+    (leaves/export/csv/, leaves/export/jsonl/), without pagination.
+    """
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request, fmt):
+        if fmt not in EXPORT_FORMATS:
+            return Response({"format": f"Use one of: {', '.join(EXPORT_FORMATS)}."}, status=status.HTTP_400_BAD_REQUEST)
+        # validate the filters before the response starts streaming
+        leaves = filter_leaves(LeaveRequest.objects.all(), request.query_params)
+        response = StreamingHttpResponse(iter_export(leaves, fmt), content_type=CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = f'attachment; filename="leaves.{fmt}"'
+        return response
+    
+class LeaveReportView(APIView):
+    """
+    Absenteeism by month, weekday, leave type and employee, rejection rates
+    and approval latency for the leaves in a date window (date_from/date_to,
+    this year by default), optionally narrowed by leave_type or user.
+    """
+    permission_classes = [IsAdminUser]
+    
+    @conditional_on(lambda request: ALL_USERS)
+    @cached_response(lambda request: ALL_USERS)
+    def get(self, request):
+        params = {name: request.query_params.get(name) for name in ('leave_type', 'user', 'date_from', 'date_to')}
+        report = LeaveReport({name: value for name, value in params.items() if value})
+        return Response(report.as_dict(), status=status.HTTP_200_OK)
+    
+class CalendarView(APIView):
+    """ Everyone's leaves and per-day counts for one month (?month=YYYY-MM) """
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        data = calendar_response_data(LeaveRequest.objects.all(), request.query_params)
+        return Response(data, status=status.HTTP_200_OK)
     
 class LeaveStatusView(APIView):
     permission_classes = [IsAdminUser]
     
     def put(self, request, pk):
-        leave = get_object_or_404(LeaveRequest, id=pk)
-        previous_status = leave.status
-        
-        serializer = LeaveRequestSerializer(instance=leave, data=request.data, partial=True, context={'request': request})
-        if serializer.is_valid():
-            updated_leave = serializer.save()
-            
-            if previous_status != 'approved' and updated_leave.status == 'approved':
-                user_profile = updated_leave.user.profile
-                
-                if updated_leave.leave_type == 'sick':
-                    user_profile.sick_leave_balance -= updated_leave.no_days
-                elif updated_leave.leave_type == 'casual':
-                    user_profile.casual_leave_balance -= updated_leave.no_days
-                
-                user_profile.save()
+        with transaction.atomic():
+            # lock the leave so two admins can't settle the same transition twice
+            leave = get_object_or_404(LeaveRequest.objects.select_for_update(), id=pk)
+            previous_status = leave.status
             
-            elif previous_status == 'approved' and updated_leave.status != 'approved':
-                user_profile = updated_leave.user.profile
-                
-                if updated_leave.leave_type == 'sick':
-                    user_profile.sick_leave_balance += updated_leave.no_days
-                elif updated_leave.leave_type == 'casual':
-                    user_profile.casual_leave_balance += updated_leave.no_days
-                    
-                user_profile.save()
+            serializer = LeaveRequestSerializer(instance=leave, data=request.data, partial=True, context={'request': request})
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
             
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            updated_leave = serializer.save()
+            apply_status_change(updated_leave, previous_status, actor=request.user)
+            # delivered by `manage.py send_notifications`, not while the admin waits
+            if updated_leave.status != previous_status:
+                notify_status_changes([updated_leave])
+        
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class CacheStatsView(APIView):
+    """ Response cache hit/miss counters of the worker answering """
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        return Response(response_cache_stats.as_dict(), status=status.HTTP_200_OK)
+
+
+class LoginStatsView(APIView):
+    """ Password hashing pool timings and saturation of the worker answering """
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        return Response(hash_pool.stats(), status=status.HTTP_200_OK)
+
+
+class LeaveBulkStatusView(APIView):
+    permission_classes = [IsAdminUser]
+    
+    def post(self, request):
+        serializer = BulkLeaveStatusSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        results = apply_bulk_status(serializer.validated_data['items'], actor=request.user)
+        return Response({"results": results}, status=status.HTTP_200_OK)